@@ -4,15 +4,11 @@ from flask_cors import CORS
 from flask_session import Session
 from flask_sqlalchemy import SQLAlchemy
 import os
+import click
 from datetime import timedelta
 from config import config
 from database import db
-from models.payroll import Payslip
 import json
-from models.dashboard import DashboardWidget, DashboardLayout
-from models.department_table import DepartmentTable, TableRow
-from sqlalchemy import func
-from routes.dashboard_widgets import dashboard_widgets_bp
 from routes.billing import billing_bp
 # Import des routes
 from routes.auth import auth_bp
@@ -25,10 +21,14 @@ from routes.department_managers import dept_managers_bp
 from routes.employee_requests import employee_requests_bp
 from routes.payroll import payroll_bp
 from routes.chat import chat_bp, init_socketio
+from utils.widget_engine import widget_engine
+from utils.dashboard_rollups import RollupWorker
+from utils.company_counters import track_company_counters
 from routes.tickets import tickets_bp
 from routes.projects import projects_bp
 from utils.project_scheduler import register_scheduler_routes
-from routes.dashboard_custom import dashboard_custom_bp
+from utils.mining_service import MiningService, BlockSealer
+from utils.transaction_ingestor import TransactionIngestor
 
 
 
@@ -37,6 +37,10 @@ def get_blockchain():
     from models.blockchain import Blockchain
     return current_app.extensions.get('blockchain')
 
+def get_mining_service():
+    """Retourne le service de minage en arrière-plan"""
+    return current_app.extensions.get('blockchain_miner')
+
 def create_app(config_name='development'):
     """Factory pour créer l'application Flask"""
     app = Flask(__name__, 
@@ -50,18 +54,54 @@ def create_app(config_name='development'):
     db.init_app(app)
     CORS(app, supports_credentials=True)
     Session(app)
+    widget_engine.init_app(app)
+    track_company_counters()
     
     # Initialiser la blockchain après la création de l'app
     with app.app_context():
         from models.blockchain import Blockchain
-        blockchain = Blockchain(difficulty=4)
-        if len(blockchain.chain) == 0:
-            blockchain.create_genesis_block()
+        from models.blockchain_store import BlockchainStore
+        
+        # Ledger persistant partagé par les workers ; les blocs sont lus à la demande
+        store = BlockchainStore(app.config.get('BLOCKCHAIN_DATA_DIR', 'blockchain_data'))
+        blockchain = Blockchain(
+            difficulty=app.config.get('BLOCKCHAIN_DIFFICULTY', 4),
+            store=store,
+            max_block_transactions=app.config.get('BLOCKCHAIN_MAX_BLOCK_TRANSACTIONS')
+        )
         
         # Stocker blockchain dans les extensions de l'app
         if not hasattr(app, 'extensions'):
             app.extensions = {}
         app.extensions['blockchain'] = blockchain
+        
+        # La preuve de travail tourne dans un pool de processus, jamais dans un worker HTTP
+        app.extensions['blockchain_miner'] = MiningService(
+            app,
+            blockchain,
+            max_workers=app.config.get('BLOCKCHAIN_MINING_WORKERS', 2)
+        )
+        
+        # Transactions d'audit ingérées par lots hors du chemin des requêtes
+        app.extensions['blockchain_ingestor'] = TransactionIngestor(
+            blockchain,
+            batch_size=app.config.get('BLOCKCHAIN_INGEST_BATCH_SIZE', 500),
+            queue_size=app.config.get('BLOCKCHAIN_INGEST_QUEUE_SIZE', 10000),
+            max_pending=app.config.get('BLOCKCHAIN_MAX_PENDING', 50000),
+            mining_service=app.extensions['blockchain_miner'],
+            capacity_timeout=app.config.get('BLOCKCHAIN_INGEST_CAPACITY_TIMEOUT', 30)
+        )
+        
+        # Scellement des transactions en attente par taille et par ancienneté
+        sealer = BlockSealer(
+            blockchain,
+            app.extensions['blockchain_miner'],
+            seal_size=app.config.get('BLOCKCHAIN_SEAL_SIZE', 500),
+            seal_interval=app.config.get('BLOCKCHAIN_SEAL_INTERVAL', 60)
+        )
+        app.extensions['blockchain_sealer'] = sealer
+        if app.config.get('BLOCKCHAIN_AUTO_SEAL', True):
+            sealer.start()
     
     # Enregistrer les blueprints
     app.register_blueprint(auth_bp)
@@ -76,8 +116,6 @@ def create_app(config_name='development'):
     app.register_blueprint(chat_bp)
     app.register_blueprint(tickets_bp)
     app.register_blueprint(projects_bp)
-    app.register_blueprint(dashboard_custom_bp)
-    app.register_blueprint(dashboard_widgets_bp)
     app.register_blueprint(billing_bp)
 
     register_scheduler_routes(app)
@@ -89,6 +127,12 @@ def create_app(config_name='development'):
     with app.app_context():
         db.create_all()
     
+    # Agrégats quotidiens du dashboard, recalculés hors du chemin des requêtes
+    rollups = RollupWorker(app, interval=app.config.get('DASHBOARD_ROLLUP_INTERVAL', 60))
+    app.extensions['dashboard_rollups'] = rollups
+    if app.config.get('DASHBOARD_ROLLUP_AUTO', True):
+        rollups.start()
+    
     # Route principale
     @app.route('/')
     def index():
@@ -143,329 +187,6 @@ def create_app(config_name='development'):
         
         return render_template('billing.html', user=user)
     
-    @app.route('/company/stats/<int:company_id>')
-    def company_stats(company_id):
-        """Statistiques détaillées de l'entreprise"""
-        if 'user_id' not in session:
-            return jsonify({'error': 'Non authentifié'}), 401
-        
-        from models.user import User
-        from models.company import Company, Department
-        from models.department_table import DepartmentTable
-        from sqlalchemy import func
-        
-        user = User.query.get(session['user_id'])
-        
-        # Vérifier les permissions
-        if not user.is_admin and user.company_id != company_id:
-            return jsonify({'error': 'Accès non autorisé'}), 403
-        
-        try:
-            company = Company.query.get_or_404(company_id)
-            
-            # Statistiques de base
-            departments_count = Department.query.filter_by(
-                company_id=company_id,
-                is_active=True
-            ).count()
-            
-            users_count = User.query.filter_by(
-                company_id=company_id,
-                is_active=True
-            ).count()
-            
-            tables_count = db.session.query(func.count(DepartmentTable.id)).join(
-                Department
-            ).filter(
-                Department.company_id == company_id,
-                DepartmentTable.is_active == True
-            ).scalar() or 0
-            
-            # Compter les entrées totales dans toutes les tables
-            from models.department_table import TableRow
-            total_entries = db.session.query(func.count(TableRow.id)).join(
-                DepartmentTable
-            ).join(
-                Department
-            ).filter(
-                Department.company_id == company_id,
-                TableRow.is_active == True
-            ).scalar() or 0
-            
-            # Activité quotidienne des 7 derniers jours
-            from datetime import datetime, timedelta
-            seven_days_ago = datetime.utcnow() - timedelta(days=7)
-            
-            daily_activity = []
-            day_names = ['Lun', 'Mar', 'Mer', 'Jeu', 'Ven', 'Sam', 'Dim']
-            
-            for i in range(7):
-                day = seven_days_ago + timedelta(days=i)
-                day_start = day.replace(hour=0, minute=0, second=0, microsecond=0)
-                day_end = day_start + timedelta(days=1)
-                
-                entries = db.session.query(func.count(TableRow.id)).join(
-                    DepartmentTable
-                ).join(
-                    Department
-                ).filter(
-                    Department.company_id == company_id,
-                    TableRow.created_at >= day_start,
-                    TableRow.created_at < day_end
-                ).scalar() or 0
-                
-                active_users = db.session.query(func.count(func.distinct(TableRow.created_by_id))).join(
-                    DepartmentTable
-                ).join(
-                    Department
-                ).filter(
-                    Department.company_id == company_id,
-                    TableRow.created_at >= day_start,
-                    TableRow.created_at < day_end
-                ).scalar() or 0
-                
-                daily_activity.append({
-                    'day_name': day_names[day.weekday()],
-                    'entries': entries,
-                    'active_users': active_users
-                })
-            
-            # Statistiques par département
-            departments = Department.query.filter_by(
-                company_id=company_id,
-                is_active=True
-            ).all()
-            
-            departments_data = []
-            for dept in departments:
-                entries_count = db.session.query(func.count(TableRow.id)).join(
-                    DepartmentTable
-                ).filter(
-                    DepartmentTable.department_id == dept.id,
-                    TableRow.is_active == True
-                ).scalar() or 0
-                
-                departments_data.append({
-                    'id': dept.id,
-                    'name': dept.name,
-                    'entries_count': entries_count,
-                    'users_count': len(dept.employees)
-                })
-            
-            # Distribution des rôles
-            role_distribution = {}
-            roles = db.session.query(
-                User.role,
-                func.count(User.id).label('count')
-            ).filter(
-                User.company_id == company_id,
-                User.is_active == True
-            ).group_by(User.role).all()
-            
-            for role, count in roles:
-                role_distribution[role] = count
-            
-            return jsonify({
-                'success': True,
-                'stats': {
-                    'departments_count': departments_count,
-                    'users_count': users_count,
-                    'tables_count': tables_count,
-                    'total_entries': total_entries,
-                    'daily_activity': daily_activity,
-                    'departments': departments_data,
-                    'role_distribution': role_distribution
-                }
-            })
-            
-        except Exception as e:
-            print(f"Erreur lors du chargement des stats: {str(e)}")
-            return jsonify({
-                'success': False,
-                'error': str(e)
-            }), 500
-
-
-    # Routes pour les widgets personnalisés (garder celles du dashboard_custom.py)
-
-    @app.route('/api/dashboard/widgets/list', methods=['GET'])
-    def list_user_widgets():
-        """Liste des widgets personnalisés de l'utilisateur"""
-        if 'user_id' not in session:
-            return jsonify({'error': 'Non authentifié'}), 401
-        
-        from models.user import User
-        from models.dashboard import DashboardWidget
-        
-        user = User.query.get(session['user_id'])
-        
-        widgets = DashboardWidget.query.filter_by(
-            user_id=user.id,
-            is_active=True
-        ).order_by(DashboardWidget.position_order).all()
-        
-        return jsonify({
-            'success': True,
-            'widgets': [w.to_dict() for w in widgets]
-        })
-
-
-    @app.route('/api/dashboard/widgets/create', methods=['POST'])
-    def create_widget():
-        """Créer un nouveau widget personnalisé"""
-        if 'user_id' not in session:
-            return jsonify({'error': 'Non authentifié'}), 401
-        
-        from models.user import User
-        from models.dashboard import DashboardWidget
-        import json
-        
-        user = User.query.get(session['user_id'])
-        data = request.json
-        
-        widget = DashboardWidget(
-            user_id=user.id,
-            title=data.get('title'),
-            widget_type=data.get('widget_type'),
-            chart_type=data.get('chart_type', 'bar'),
-            data_source=data.get('data_source'),
-            department_id=data.get('department_id'),
-            filters=json.dumps(data.get('filters', {})),
-            size=data.get('size', 'medium'),
-            position_order=data.get('position_order', 0)
-        )
-        
-        db.session.add(widget)
-        db.session.commit()
-        
-        return jsonify({
-            'success': True,
-            'widget': widget.to_dict()
-        })
-
-
-    @app.route('/api/dashboard/widgets/<int:widget_id>/data', methods=['GET'])
-    def get_widget_data(widget_id):
-        """Récupérer les données d'un widget"""
-        if 'user_id' not in session:
-            return jsonify({'error': 'Non authentifié'}), 401
-        
-        from models.user import User
-        from models.dashboard import DashboardWidget
-        
-        user = User.query.get(session['user_id'])
-        widget = DashboardWidget.query.get_or_404(widget_id)
-        
-        if widget.user_id != user.id:
-            return jsonify({'error': 'Non autorisé'}), 403
-        
-        # Générer les données selon le type de widget
-        # (utiliser la logique de dashboard_custom.py)
-        data = generate_widget_data(widget, user)
-        
-        return jsonify({
-            'success': True,
-            'data': data
-        })
-
-
-    def generate_widget_data(widget, user):
-        """Génère les données pour un widget selon son type"""
-        import json
-        from datetime import datetime, timedelta
-        from sqlalchemy import func
-        
-        filters = json.loads(widget.filters) if widget.filters else {}
-        date_range = filters.get('date_range', 'week')
-        
-        # Calculer les dates
-        end_date = datetime.utcnow()
-        if date_range == 'today':
-            start_date = end_date.replace(hour=0, minute=0, second=0)
-        elif date_range == 'week':
-            start_date = end_date - timedelta(days=7)
-        elif date_range == 'month':
-            start_date = end_date - timedelta(days=30)
-        elif date_range == 'quarter':
-            start_date = end_date - timedelta(days=90)
-        elif date_range == 'year':
-            start_date = end_date - timedelta(days=365)
-        else:
-            start_date = end_date - timedelta(days=7)
-        
-        data_source = widget.data_source
-        
-        # Exemple pour les employés
-        if data_source == 'employees':
-            from models.user import User
-            
-            if widget.widget_type == 'count':
-                count = User.query.filter(
-                    User.company_id == user.company_id,
-                    User.is_active == True,
-                    User.created_at >= start_date
-                ).count()
-                
-                return {
-                    'value': count,
-                    'label': 'Employés',
-                    'type': 'single'
-                }
-            
-            elif widget.widget_type == 'distribution':
-                roles = db.session.query(
-                    User.role,
-                    func.count(User.id).label('count')
-                ).filter(
-                    User.company_id == user.company_id,
-                    User.is_active == True
-                ).group_by(User.role).all()
-                
-                role_labels = {
-                    'admin': 'Administrateurs',
-                    'directeur_rh': 'Directeurs RH',
-                    'department_manager': 'Managers',
-                    'employee': 'Employés',
-                    'technician': 'Techniciens'
-                }
-                
-                return {
-                    'labels': [role_labels.get(r.role, r.role) for r in roles],
-                    'datasets': [{
-                        'label': 'Distribution des rôles',
-                        'data': [r.count for r in roles]
-                    }],
-                    'type': 'chart'
-                }
-        
-        # Retour par défaut
-        return {
-            'labels': [],
-            'datasets': [],
-            'type': 'chart'
-        }
-
-
-    @app.route('/api/dashboard/widgets/<int:widget_id>/delete', methods=['DELETE'])
-    def delete_widget(widget_id):
-        """Supprimer un widget"""
-        if 'user_id' not in session:
-            return jsonify({'error': 'Non authentifié'}), 401
-        
-        from models.user import User
-        from models.dashboard import DashboardWidget
-        
-        user = User.query.get(session['user_id'])
-        widget = DashboardWidget.query.get_or_404(widget_id)
-        
-        if widget.user_id != user.id:
-            return jsonify({'error': 'Non autorisé'}), 403
-        
-        db.session.delete(widget)
-        db.session.commit()
-        
-        return jsonify({'success': True})
-        
     @app.route('/departments')
     def departments_page():
         """Page de gestion des départements"""
@@ -729,70 +450,248 @@ def create_app(config_name='development'):
     
     @app.route('/api/blockchain/chain', methods=['GET'])
     def get_chain():
-        """Récupérer toute la chaîne"""
+        """
+        Récupérer toute la chaîne ({'chain', 'length'}, émise en flux), une page
+        (?cursor=<index du premier bloc>&limit=, avec next_cursor/has_more) ou un flux
+        NDJSON (?format=ndjson) : un bloc par ligne, depuis le curseur jusqu'à la tête.
+        """
+        from flask import jsonify, Response, stream_with_context
+        blockchain = get_blockchain()
+        if not blockchain:
+            return jsonify({'error': 'Blockchain non disponible'}), 500
+        
+        cursor = max(request.args.get('cursor', 0, type=int), 0)
+        
+        if request.args.get('format') == 'ndjson':
+            blocks = blockchain.iter_chain(cursor)
+            
+            def generate():
+                for block in blocks:
+                    yield json.dumps(block, sort_keys=True) + '\n'
+            
+            return Response(
+                stream_with_context(generate()),
+                mimetype='application/x-ndjson',
+                headers={'X-Chain-Length': str(len(blockchain.chain))}
+            )
+        
+        if 'cursor' not in request.args and 'limit' not in request.args:
+            # Contrat historique : toute la chaîne, sérialisée bloc par bloc
+            blocks = blockchain.iter_chain()
+            
+            def generate_chain():
+                yield '{"chain": ['
+                length = 0
+                for block in blocks:
+                    yield (',' if length else '') + json.dumps(block, sort_keys=True)
+                    length += 1
+                yield '], "length": %d}' % length
+            
+            return Response(stream_with_context(generate_chain()), mimetype='application/json')
+        
+        limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+        chain = list(blockchain.iter_chain(cursor, cursor + limit))
+        length = len(blockchain.chain)
+        next_cursor = cursor + len(chain)
+        
+        return jsonify({
+            'chain': chain,
+            'length': length,
+            'cursor': cursor,
+            'next_cursor': next_cursor if next_cursor < length else None,
+            'has_more': next_cursor < length
+        })
+    
+    @app.route('/api/blockchain/headers', methods=['GET'])
+    def get_chain_headers():
+        """Hauteur, hash de tête et en-têtes de blocs (synchronisation par delta)"""
         from flask import jsonify
         blockchain = get_blockchain()
-        if blockchain:
+        if not blockchain:
+            return jsonify({'error': 'Blockchain non disponible'}), 500
+        
+        blockchain.refresh()
+        latest_block = blockchain.get_latest_block()
+        response = {
+            'height': len(blockchain.chain),
+            'tip_hash': latest_block['hash'] if latest_block else None
+        }
+        
+        start = request.args.get('start', type=int)
+        if start is not None:
+            limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+            response['headers'] = blockchain.get_headers(max(start, 0), limit)
+        
+        return jsonify(response)
+    
+    @app.route('/api/blockchain/blocks/since', methods=['GET'])
+    def get_blocks_since():
+        """Blocs postérieurs à la hauteur ?height= dont le dernier bloc a le hash ?hash="""
+        from flask import jsonify
+        blockchain = get_blockchain()
+        if not blockchain:
+            return jsonify({'error': 'Blockchain non disponible'}), 500
+        
+        height = request.args.get('height', type=int)
+        block_hash = request.args.get('hash')
+        if height is None or not block_hash:
+            return jsonify({'error': 'height et hash requis'}), 400
+        
+        limit = min(max(request.args.get('limit', 100, type=int), 1), 500)
+        blocks, fork = blockchain.get_blocks_since(height, block_hash, limit)
+        
+        if fork:
+            # Le pair doit retomber sur une synchronisation complète
             return jsonify({
-                'chain': blockchain.get_chain(),
-                'length': len(blockchain.chain)
-            })
-        return jsonify({'error': 'Blockchain non disponible'}), 500
+                'fork': True,
+                'height': len(blockchain.chain),
+                'error': 'Chaîne divergente'
+            }), 409
+        
+        next_height = height + len(blocks)
+        return jsonify({
+            'fork': False,
+            'blocks': blocks,
+            'height': len(blockchain.chain),
+            'next_height': next_height,
+            'has_more': next_height < len(blockchain.chain)
+        })
     
     @app.route('/api/blockchain/mine', methods=['POST'])
     def mine_block():
-        """Miner les transactions en attente"""
+        """Planifier le minage des transactions en attente (réponse immédiate avec un job)"""
         from flask import jsonify
         if 'user_id' not in session:
             return jsonify({'error': 'Authentication required'}), 401
         
         blockchain = get_blockchain()
-        if not blockchain:
+        miner = get_mining_service()
+        if not blockchain or not miner:
             return jsonify({'error': 'Blockchain non disponible'}), 500
         
-        miner_address = f"user_{session['user_id']}"
-        success = blockchain.mine_pending_transactions(miner_address)
-        
-        if success:
-            return jsonify({
-                'success': True,
-                'message': 'Bloc miné avec succès',
-                'block': blockchain.get_latest_block()
-            })
-        else:
+        if not blockchain.pending_transactions:
             return jsonify({
                 'success': False,
                 'message': 'Aucune transaction en attente'
             })
+        
+        miner_address = f"user_{session['user_id']}"
+        job = miner.submit(miner_address)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Minage planifié',
+            'job_id': job['id'],
+            'job': job,
+            'status_url': url_for('mining_job_status', job_id=job['id'])
+        }), 202
+    
+    @app.route('/api/blockchain/mine/<job_id>', methods=['GET'])
+    def mining_job_status(job_id):
+        """Statut d'un job de minage"""
+        from flask import jsonify
+        if 'user_id' not in session:
+            return jsonify({'error': 'Authentication required'}), 401
+        
+        miner = get_mining_service()
+        if not miner:
+            return jsonify({'error': 'Blockchain non disponible'}), 500
+        
+        job = miner.get_job(job_id)
+        if not job:
+            return jsonify({'error': 'Job de minage introuvable'}), 404
+        
+        response = {'success': True, 'job': job}
+        if job['status'] == 'completed':
+            response['block'] = get_blockchain().chain[job['block_index']]
+        
+        return jsonify(response)
     
     @app.route('/api/blockchain/validate', methods=['GET'])
     def validate_chain():
-        """Valider l'intégrité de la blockchain"""
+        """Valider l'intégrité de la blockchain (incrémental, ou audit complet avec ?mode=full)"""
         from flask import jsonify
         blockchain = get_blockchain()
-        if blockchain:
-            is_valid = blockchain.is_chain_valid()
+        if not blockchain:
+            return jsonify({'error': 'Blockchain non disponible'}), 500
+        
+        if request.args.get('mode') == 'full':
+            # Audit complet depuis le genesis, exécuté en arrière-plan
+            audit = blockchain.start_full_audit()
             return jsonify({
-                'is_valid': is_valid,
-                'message': 'Blockchain valide' if is_valid else 'Blockchain corrompue'
-            })
-        return jsonify({'error': 'Blockchain non disponible'}), 500
+                'success': True,
+                'message': 'Audit complet lancé',
+                'audit': audit,
+                'status_url': url_for('blockchain_audit_status')
+            }), 202
+        
+        is_valid = blockchain.validate_incremental()
+        return jsonify({
+            'is_valid': is_valid,
+            'verified_height': blockchain.verified_height,
+            'message': 'Blockchain valide' if is_valid else 'Blockchain corrompue'
+        })
+    
+    @app.route('/api/blockchain/validate/audit', methods=['GET'])
+    def blockchain_audit_status():
+        """État du dernier audit complet de la blockchain"""
+        from flask import jsonify
+        blockchain = get_blockchain()
+        if not blockchain:
+            return jsonify({'error': 'Blockchain non disponible'}), 500
+        
+        return jsonify({
+            'success': True,
+            'audit': blockchain.get_audit_status()
+        })
     
     @app.route('/api/blockchain/history/<entity_type>/<int:entity_id>', methods=['GET'])
     def get_history(entity_type, entity_id):
-        """Récupérer l'historique d'une entité"""
+        """Récupérer l'historique d'une entité (paginé, filtrable par période)"""
         from flask import jsonify
+        from datetime import datetime, time
         if 'user_id' not in session:
             return jsonify({'error': 'Authentication required'}), 401
         
         blockchain = get_blockchain()
-        if blockchain:
-            history = blockchain.get_transaction_history(entity_type, str(entity_id))
-            return jsonify({
-                'success': True,
-                'history': history
-            })
-        return jsonify({'error': 'Blockchain non disponible'}), 500
+        if not blockchain:
+            return jsonify({'error': 'Blockchain non disponible'}), 500
+        
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 50, type=int), 1), 500)
+        
+        # Période optionnelle (ISO 8601) sur l'horodatage des blocs
+        try:
+            since = request.args.get('since')
+            until_arg = request.args.get('until')
+            since = datetime.fromisoformat(since) if since else None
+            until = datetime.fromisoformat(until_arg) if until_arg else None
+        except ValueError:
+            return jsonify({'error': 'Format de date invalide (ISO 8601 attendu)'}), 400
+        
+        # Date seule (AAAA-MM-JJ) : la journée entière est incluse, pas seulement minuit
+        if until is not None and len(until_arg) == 10:
+            until = datetime.combine(until.date(), time.max)
+        
+        history, total = blockchain.query_transaction_history(
+            entity_type,
+            str(entity_id),
+            since=since,
+            until=until,
+            offset=(page - 1) * per_page,
+            limit=per_page
+        )
+        
+        return jsonify({
+            'success': True,
+            'history': history,
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total': total,
+                'pages': (total + per_page - 1) // per_page
+            }
+        })
     
     # Gestionnaire d'erreurs
     @app.errorhandler(404)
@@ -859,6 +758,62 @@ def create_app(config_name='development'):
         db.create_all()
         print('Base de données initialisée!')
     
+    @app.cli.command()
+    def benchmark_hashing():
+        """Mesurer le débit de hachage de la preuve de travail (avant/après moteur incrémental)"""
+        from models.blockchain import benchmark_block_hashing
+        
+        for transactions_count in (1, 50, 500):
+            result = benchmark_block_hashing(transactions_count=transactions_count)
+            print(f"{result['transactions']:>4} transactions : "
+                  f"{result['full_serialization_hashes_per_sec']:>10,} h/s (JSON complet) -> "
+                  f"{result['incremental_hashes_per_sec']:>10,} h/s (incrémental), "
+                  f"x{result['speedup']}")
+    
+    @app.cli.command()
+    def rebuild_unique_index():
+        """Reconstruire l'index des valeurs uniques des tables de départements"""
+        from models.department_table import DepartmentTable, TableColumn
+        from models.department_table import rebuild_unique_index as rebuild_table_index
+        
+        tables = DepartmentTable.query.filter(
+            DepartmentTable.columns.any(TableColumn.is_unique.is_(True))
+        ).all()
+        duplicates_count = 0
+        for table in tables:
+            duplicates = rebuild_table_index(table)
+            db.session.commit()
+            print(f'{table.display_name} (table {table.id}): index reconstruit, {len(duplicates)} doublon(s) non indexé(s)')
+            for duplicate in duplicates:
+                print(f"  colonne {duplicate['column']}: ligne {duplicate['row_id']} en double "
+                      f"de la ligne {duplicate['indexed_row_id']} ({duplicate['value']})")
+            duplicates_count += len(duplicates)
+        
+        # Code de sortie non nul : les doublons doivent être corrigés à la main
+        if duplicates_count:
+            raise click.ClickException(f'{duplicates_count} doublon(s) à corriger avant de rendre ces colonnes uniques')
+    
+    @app.cli.command()
+    def backfill_row_values():
+        """Générer les valeurs typées des lignes des tables de départements (table_row_values)"""
+        from models.department_table import DepartmentTable, backfill_typed_values
+        
+        for table in DepartmentTable.query.order_by(DepartmentTable.id).all():
+            processed = backfill_typed_values(table)
+            print(f'{table.display_name}: {processed} ligne(s) traitée(s)')
+    
+    @app.cli.command()
+    @click.option('--days', default=365, help='Nombre de jours à recalculer (jusqu\'à aujourd\'hui)')
+    def backfill_dashboard_rollups(days):
+        """Recalculer les agrégats quotidiens du dashboard (tickets, embauches, présences, paie)"""
+        from datetime import datetime
+        from utils.dashboard_rollups import backfill
+        
+        last_day = datetime.utcnow().date()
+        first_day = last_day - timedelta(days=days)
+        for source, start, end, rows in backfill(first_day, last_day):
+            print(f'{source}: {start} -> {end}, {rows} agrégat(s)')
+        
     @app.cli.command()
     def create_admin():
         """Créer un utilisateur admin via CLI"""
@@ -22,6 +22,25 @@ class Config:
     BLOCKCHAIN_DIFFICULTY = 4
     BLOCKCHAIN_SYNC_INTERVAL = 300  # 5 minutes
     BLOCKCHAIN_PORT = 5001
+    BLOCKCHAIN_PEER_SECRET = os.environ.get('BLOCKCHAIN_PEER_SECRET')  # Signature des blocs échangés entre nœuds
+    BLOCKCHAIN_MINING_WORKERS = 2  # Processus dédiés à la preuve de travail
+    BLOCKCHAIN_DATA_DIR = os.environ.get('BLOCKCHAIN_DATA_DIR') or 'blockchain_data'  # Ledger persistant
+    BLOCKCHAIN_INGEST_BATCH_SIZE = 500  # Transactions d'audit ajoutées par lot
+    BLOCKCHAIN_INGEST_QUEUE_SIZE = 10000  # File d'ingestion bornée (contre-pression)
+    BLOCKCHAIN_MAX_PENDING = 50000  # Transactions en attente de minage avant suspension de l'ingestion
+    BLOCKCHAIN_INGEST_CAPACITY_TIMEOUT = 30  # Attente maximale d'un minage avant rejet du lot (secondes)
+    BLOCKCHAIN_AUTO_SEAL = True  # Scellement automatique des transactions en attente
+    BLOCKCHAIN_SEAL_SIZE = 500  # Un bloc dès N transactions en attente
+    BLOCKCHAIN_SEAL_INTERVAL = 60  # ... ou dès qu'une transaction attend depuis T secondes
+    BLOCKCHAIN_MAX_BLOCK_TRANSACTIONS = 1000  # Taille maximale d'un bloc
+
+    # Statistiques
+    COMPANY_STATS_CACHE_TTL = 30  # Secondes de cache de /company/stats (0 : désactivé)
+    COMPANY_COUNTERS_MAX_AGE = 3600  # Recomptage complet des compteurs d'en-tête au-delà (secondes, 0 : jamais)
+    DASHBOARD_BATCH_WORKERS = 4  # Sources de widgets calculées en parallèle par /api/dashboard/widgets/data (0 : séquentiel)
+    DASHBOARD_ROLLUP_AUTO = True  # Recalcul en arrière-plan des agrégats quotidiens du dashboard
+    DASHBOARD_ROLLUP_INTERVAL = 60  # Secondes entre deux recalculs des jours modifiés
+    DASHBOARD_PUSH_DEBOUNCE = 1.0  # Secondes de regroupement des commits avant l'envoi des widgets modifiés
     
     # Sécurité des mots de passe
     PASSWORD_MIN_LENGTH = 8
@@ -60,6 +79,9 @@ class TestConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///test_flowrp.db'
     WTF_CSRF_ENABLED = False
+    BLOCKCHAIN_DATA_DIR = 'test_blockchain_data'
+    BLOCKCHAIN_AUTO_SEAL = False
+    DASHBOARD_ROLLUP_AUTO = False
 
 
 config = {
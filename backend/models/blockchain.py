@@ -1,18 +1,104 @@
 # models/blockchain.py
 """Modèles Blockchain - Version corrigée sans erreurs"""
 from datetime import datetime
+import bisect
 import hashlib
 import json
+import threading
+import time
+from models.blockchain_store import PersistentChain
+
+
+class BlockHasher:
+    """
+    Moteur de hachage incrémental d'un bloc.
+    Le bloc est sérialisé une seule fois en préfixe/suffixe autour du nonce ; chaque essai
+    copie un sha256 pré-alimenté avec le préfixe. Les hashes sont identiques octet pour octet
+    à ceux de Blockchain.hash_block.
+    """
+    
+    NONCE_MARKER = '__flowerp_nonce__'
+    
+    def __init__(self, block):
+        fields = {key: value for key, value in block.items() if key != 'hash'}
+        fields['nonce'] = self.NONCE_MARKER
+        
+        serialized = json.dumps(fields, sort_keys=True)
+        parts = serialized.split(json.dumps(self.NONCE_MARKER))
+        if len(parts) != 2:
+            raise ValueError("Impossible d'isoler le nonce dans la sérialisation du bloc")
+        
+        self._prefix_hash = hashlib.sha256(parts[0].encode())
+        self._suffix = parts[1].encode()
+    
+    def hash(self, nonce):
+        """Hash du bloc pour un nonce donné"""
+        sha = self._prefix_hash.copy()
+        sha.update(str(nonce).encode())
+        sha.update(self._suffix)
+        return sha.hexdigest()
+    
+    def scan(self, start, count, difficulty):
+        """
+        Teste les nonces [start, start + count) et retourne (nonce, hash) pour le premier
+        qui satisfait la difficulté, ou None.
+        """
+        # Comparaison sur le digest binaire : difficulty zéros hexadécimaux
+        zero_bytes = bytes(difficulty // 2)
+        full_bytes = difficulty // 2
+        half_byte = difficulty % 2
+        
+        prefix_copy = self._prefix_hash.copy
+        suffix = self._suffix
+        
+        for nonce in range(start, start + count):
+            sha = prefix_copy()
+            sha.update(str(nonce).encode())
+            sha.update(suffix)
+            digest = sha.digest()
+            if digest[:full_bytes] == zero_bytes and (not half_byte or digest[full_bytes] < 16):
+                return nonce, digest.hex()
+        
+        return None
+
 
 class Blockchain:
     """Classe Blockchain complète et corrigée"""
     
-    def __init__(self, difficulty=4):
-        self.chain = []
-        self.pending_transactions = []
+    def __init__(self, difficulty=4, store=None, max_block_transactions=None):
+        """
+        Args:
+            difficulty: Nombre de zéros hexadécimaux exigés en tête du hash
+            store: BlockchainStore optionnel ; sans store la chaîne reste en mémoire
+            max_block_transactions: Nombre maximum de transactions par bloc (None : illimité)
+        """
+        self.store = store
+        self.max_block_transactions = max_block_transactions
+        if store is not None:
+            # Chargement paresseux : seul l'index des offsets est lu au démarrage
+            self.chain = PersistentChain(store)
+            self.pending_transactions = self._load_pending_transactions()
+        else:
+            self.chain = []
+            self.pending_transactions = []
         self.difficulty = difficulty
         self.nodes = set()
-        self.create_genesis_block()
+        self._lock = threading.RLock()
+        self._reset_entity_index()
+        self._reset_checkpoint()
+        self._load_checkpoint()
+        self.audit = {}
+        if len(self.chain) == 0:
+            self.create_genesis_block()
+    
+    def _load_pending_transactions(self):
+        """Relit le journal des transactions en attente, sans celles déjà minées"""
+        transactions = self.store.load_pending()
+        if transactions and len(self.chain) > 0:
+            # Le journal est réécrit après chaque bloc : seul le dernier bloc peut le précéder
+            mined_ids = {tx.get('id') for tx in self.chain[-1].get('transactions', [])}
+            transactions = [tx for tx in transactions if tx.get('id') not in mined_ids]
+        return transactions
     
     def create_genesis_block(self):
         """Crée le bloc genesis"""
@@ -30,77 +116,311 @@ class Blockchain:
         genesis_block['hash'] = self.hash_block(genesis_block)
         self.chain.append(genesis_block)
     
-    def hash_block(self, block):
+    # Nombre de nonces testés par lot lors de la preuve de travail
+    NONCE_BATCH_SIZE = 50000
+    
+    @staticmethod
+    def hash_block(block):
         """Calcule le hash d'un bloc"""
         block_string = json.dumps(block, sort_keys=True).encode()
         return hashlib.sha256(block_string).hexdigest()
     
+    @staticmethod
+    def compute_block_hash(block):
+        """Hash d'un bloc tel que calculé lors du minage (sans son champ 'hash')"""
+        return Blockchain.hash_block({
+            key: value for key, value in block.items() if key != 'hash'
+        })
+    
     def add_transaction(self, transaction):
         """Ajoute une transaction à la liste d'attente"""
         transaction['timestamp'] = datetime.utcnow().isoformat()
-        transaction['id'] = hashlib.sha256(
-            json.dumps(transaction, sort_keys=True).encode()
-        ).hexdigest()
-        self.pending_transactions.append(transaction)
+        return self.add_transactions([transaction])
+    
+    def add_transactions(self, transactions):
+        """
+        Ajoute un lot de transactions (horodatage conservé s'il est fourni).
+        Les ids sont calculés hors verrou ; un seul ajout au journal pour tout le lot.
+        """
+        for transaction in transactions:
+            transaction.setdefault('timestamp', datetime.utcnow().isoformat())
+            transaction['id'] = hashlib.sha256(
+                json.dumps(transaction, sort_keys=True).encode()
+            ).hexdigest()
+        
+        with self._lock:
+            self.pending_transactions.extend(transactions)
+            if self.store is not None:
+                self.store.append_pending(transactions)
         return True
     
     def mine_pending_transactions(self, miner_address):
-        """Mine les transactions en attente"""
-        if not self.pending_transactions:
+        """Mine les transactions en attente (de façon synchrone)"""
+        new_block = self.prepare_block(miner_address)
+        if new_block is None:
             return False
         
-        # Créer un nouveau bloc avec les transactions en attente
-        previous_block = self.chain[-1]
-        new_block = {
-            'index': len(self.chain),
-            'timestamp': datetime.utcnow().isoformat(),
-            'transactions': self.pending_transactions.copy(),
-            'previous_hash': previous_block['hash'],
-            'nonce': 0,
-            'miner': miner_address
-        }
-        
         # Proof of Work
         new_block['hash'] = self.proof_of_work(new_block)
         
-        # Ajouter le bloc à la chaîne
-        self.chain.append(new_block)
-        
-        # Réinitialiser les transactions en attente
-        self.pending_transactions = []
+        # Ajouter le bloc à la chaîne et retirer les transactions incluses
+        return self.append_mined_block(new_block)
+    
+    def prepare_block(self, miner_address):
+        """
+        Construit un bloc candidat à partir des transactions en attente, sans preuve de travail.
+        Le bloc reprend au plus max_block_transactions transactions, les plus anciennes d'abord.
+        """
+        with self._lock:
+            self.refresh()
+            if not self.pending_transactions:
+                return None
+            
+            previous_block = self.chain[-1]
+            return {
+                'index': len(self.chain),
+                'timestamp': datetime.utcnow().isoformat(),
+                'transactions': self.pending_transactions[:self.max_block_transactions],
+                'previous_hash': previous_block['hash'],
+                'nonce': 0,
+                'miner': miner_address
+            }
+    
+    def append_mined_block(self, block):
+        """
+        Ajoute un bloc miné (éventuellement dans un autre processus) au bout de la chaîne.
+        Refuse le bloc si la chaîne a avancé entre-temps.
+        """
+        with self._lock:
+            previous_block = self.chain[-1]
+            if block['index'] != len(self.chain):
+                return False
+            if not self._is_valid_successor(block, previous_block):
+                return False
+            
+            if self.store is not None:
+                # Écriture durable (un fsync) ; échoue si un autre worker a écrit ce bloc
+                if not self.store.append_block(block):
+                    return False
+            else:
+                self.chain.append(block)
+            
+            # Ne retirer que les transactions incluses : d'autres ont pu arriver pendant le minage
+            self._discard_mined_transactions([block])
+            
+            # Bloc vérifié ci-dessus : le point de contrôle avance sans revalidation
+            # (le genesis n'est jamais revalidé : une hauteur 0 équivaut à 1)
+            if self.chain_valid and max(self.verified_height, 1) == block['index']:
+                self._set_checkpoint(block['index'] + 1)
+            
+            # Index des entités : mis à jour seulement s'il est déjà construit et à jour
+            if self._indexed_height == block['index']:
+                self._index_block(block)
+                self._indexed_height += 1
         
         return True
     
+    def _discard_mined_transactions(self, blocks):
+        """Retire de la liste d'attente les transactions présentes dans les blocs donnés"""
+        mined_ids = {tx.get('id') for block in blocks for tx in block.get('transactions', [])}
+        remaining = [
+            tx for tx in self.pending_transactions
+            if tx.get('id') not in mined_ids
+        ]
+        if len(remaining) != len(self.pending_transactions):
+            self.pending_transactions = remaining
+        # Le journal est partagé : il peut contenir les transactions minées d'un autre worker
+        if self.store is not None and mined_ids:
+            self.store.discard_pending(mined_ids)
+    
+    def get_pending_age(self):
+        """Ancienneté en secondes de la plus vieille transaction en attente (0 si aucune)"""
+        with self._lock:
+            if not self.pending_transactions:
+                return 0
+            oldest = self.pending_transactions[0].get('timestamp')
+        try:
+            return max((datetime.utcnow() - datetime.fromisoformat(oldest)).total_seconds(), 0)
+        except (TypeError, ValueError):
+            return 0
+    
+    def refresh(self):
+        """Intègre les blocs écrits sur disque par d'autres workers"""
+        if self.store is None:
+            return []
+        
+        with self._lock:
+            generation = self.store.generation
+            new_blocks = self.store.refresh()
+            if new_blocks:
+                self._discard_mined_transactions(new_blocks)
+            if self.store.generation != generation:
+                # Chaîne remplacée par un autre worker : index, point de contrôle et attente à reprendre
+                pending_ids = {tx.get('id') for tx in self.pending_transactions}
+                if pending_ids:
+                    self._discard_mined_transactions([{'transactions': [
+                        tx for block in self.store.iter_blocks()
+                        for tx in block.get('transactions', []) if tx.get('id') in pending_ids
+                    ]}])
+                self._reset_entity_index()
+                self._reset_checkpoint()
+                self._load_checkpoint()
+            return new_blocks
+    
     def proof_of_work(self, block):
         """Effectue la preuve de travail"""
-        block['nonce'] = 0
-        computed_hash = self.hash_block(block)
-        
-        while not computed_hash.startswith('0' * self.difficulty):
-            block['nonce'] += 1
-            computed_hash = self.hash_block(block)
+        return self.compute_proof_of_work(block, self.difficulty)
+    
+    @staticmethod
+    def compute_proof_of_work(block, difficulty):
+        """Cherche le nonce du bloc ; utilisable hors de l'instance (pool de processus)"""
+        hasher = BlockHasher(block)
+        start = 0
         
-        return computed_hash
+        while True:
+            result = hasher.scan(start, Blockchain.NONCE_BATCH_SIZE, difficulty)
+            if result:
+                block['nonce'], computed_hash = result
+                return computed_hash
+            start += Blockchain.NONCE_BATCH_SIZE
     
     def is_chain_valid(self):
-        """Vérifie si la chaîne est valide"""
-        for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i-1]
+        """Vérifie si la chaîne est valide (audit complet depuis le genesis)"""
+        return self._find_invalid_block(1, len(self.chain)) is None
+    
+    def _find_invalid_block(self, start, stop, previous_block=None):
+        """
+        Valide les blocs [start, stop) et retourne l'index du premier bloc invalide, ou None.
+        previous_block évite de relire le bloc start - 1 s'il est déjà connu.
+        """
+        if start >= stop:
+            return None
+        if previous_block is None:
+            previous_block = self.chain[start - 1]
+        
+        for current_block in self._iter_blocks(start, stop):
+            if not self._is_valid_successor(current_block, previous_block):
+                return current_block['index']
+            previous_block = current_block
+        
+        return None
+    
+    def _is_valid_successor(self, block, previous_block):
+        """Vérifie un bloc par rapport à son prédécesseur"""
+        # Vérifier le hash du bloc actuel (calculé sans le champ 'hash' lui-même)
+        if block['hash'] != self.compute_block_hash(block):
+            return False
+        
+        # Vérifier le lien avec le bloc précédent
+        if block['previous_hash'] != previous_block['hash']:
+            return False
+        
+        # Vérifier la difficulté
+        return block['hash'].startswith('0' * self.difficulty)
+    
+    def validate_incremental(self):
+        """
+        Valide uniquement les blocs ajoutés depuis le dernier point de contrôle
+        (hauteur vérifiée + hash du dernier bloc vérifié).
+        """
+        with self._lock:
+            self.refresh()
+            height = len(self.chain)
             
-            # Vérifier le hash du bloc actuel
-            if current_block['hash'] != self.hash_block(current_block):
-                return False
+            # Le point de contrôle n'a de sens que si le bloc vérifié n'a pas changé
+            if self.verified_height > 0:
+                if (self.verified_height > height or
+                        self.chain[self.verified_height - 1]['hash'] != self.verified_hash):
+                    self._reset_checkpoint()
             
-            # Vérifier le lien avec le bloc précédent
-            if current_block['previous_hash'] != previous_block['hash']:
-                return False
+            if self.verified_height >= height:
+                return self.chain_valid
             
-            # Vérifier la difficulté
-            if not current_block['hash'].startswith('0' * self.difficulty):
-                return False
+            start = max(self.verified_height, 1)
+            invalid_index = self._find_invalid_block(start, height)
+            if invalid_index is None:
+                self._set_checkpoint(height)
+                self.chain_valid = True
+            else:
+                self.chain_valid = False
+            
+            return self.chain_valid
+    
+    def _set_checkpoint(self, height):
+        self.verified_height = height
+        self.verified_hash = self.chain[height - 1]['hash'] if height else None
+        if self.store is not None:
+            self.store.save_checkpoint(self.verified_height, self.verified_hash)
+    
+    def _reset_checkpoint(self):
+        self.verified_height = 0
+        self.verified_hash = None
+        self.chain_valid = True
+    
+    def _load_checkpoint(self):
+        """Reprend le point de contrôle enregistré avec le ledger (vérifié au prochain appel)"""
+        checkpoint = self.store.load_checkpoint() if self.store is not None else None
+        if checkpoint:
+            self.verified_height = checkpoint['height']
+            self.verified_hash = checkpoint['hash']
+    
+    def start_full_audit(self):
+        """Lance un audit complet de la chaîne dans un thread ; retourne l'état de l'audit"""
+        with self._lock:
+            if self.audit.get('status') == 'running':
+                return dict(self.audit)
+            
+            height = len(self.chain)
+            self.audit = {
+                'status': 'running',
+                'height': height,
+                'started_at': datetime.utcnow().isoformat(),
+                'finished_at': None,
+                'is_valid': None,
+                'invalid_block': None
+            }
+            audit_thread = threading.Thread(
+                target=self._run_full_audit,
+                args=(height,),
+                name='blockchain-audit',
+                daemon=True
+            )
         
-        return True
+        audit_thread.start()
+        return dict(self.audit)
+    
+    def _run_full_audit(self, height):
+        try:
+            invalid_index = self._find_invalid_block(1, height)
+        except Exception as e:
+            with self._lock:
+                self.audit.update({
+                    'status': 'failed',
+                    'error': str(e),
+                    'finished_at': datetime.utcnow().isoformat()
+                })
+            return
+        
+        with self._lock:
+            self.audit.update({
+                'status': 'completed',
+                'is_valid': invalid_index is None,
+                'invalid_block': invalid_index,
+                'finished_at': datetime.utcnow().isoformat()
+            })
+            if invalid_index is None:
+                # Avancer le point de contrôle si la chaîne auditée est toujours en place
+                if height > self.verified_height and len(self.chain) >= height:
+                    self._set_checkpoint(height)
+            else:
+                self.chain_valid = False
+                self.verified_height = min(self.verified_height, invalid_index)
+                self._set_checkpoint(self.verified_height)
+    
+    def get_audit_status(self):
+        """État du dernier audit complet"""
+        with self._lock:
+            return dict(self.audit) if self.audit else {'status': 'never_run'}
     
     def get_latest_block(self):
         """Retourne le dernier bloc"""
@@ -108,14 +428,28 @@ class Blockchain:
     
     def get_chain(self):
         """Retourne toute la chaîne"""
-        return self.chain
+        return list(self.chain)
+    
+    def iter_chain(self, start=0, stop=None):
+        """
+        Générateur sur les blocs [start, stop) lus au fil de l'eau.
+        La borne haute est figée à l'appel : les blocs minés pendant le parcours sont ignorés.
+        """
+        self.refresh()
+        length = len(self.chain)
+        stop = length if stop is None else min(stop, length)
+        return self._iter_blocks(max(start, 0), stop)
     
     def get_blockchain_stats(self):
         """Retourne les statistiques de la blockchain"""
-        total_transactions = sum(
-            len(block.get('transactions', []))
-            for block in self.chain
-        )
+        if self.store is not None:
+            # Compteur tenu par l'index : pas de relecture des blocs sur disque
+            total_transactions = self.store.transactions_count
+        else:
+            total_transactions = sum(
+                len(block.get('transactions', []))
+                for block in self.chain
+            )
         
         latest_block = self.get_latest_block()
         
@@ -127,42 +461,157 @@ class Blockchain:
             'nodes_count': len(self.nodes),
             'last_block_hash': latest_block['hash'] if latest_block else None,
             'last_block_time': latest_block['timestamp'] if latest_block else None,
-            'is_valid': self.is_chain_valid()
+            # Validation incrémentale : seuls les blocs postérieurs au point de contrôle sont vérifiés
+            'is_valid': self.validate_incremental(),
+            'verified_height': self.verified_height
         }
     
     def get_transaction_history(self, entity_type=None, entity_id=None):
         """Retourne l'historique des transactions pour une entité"""
+        history, _ = self.query_transaction_history(entity_type, entity_id)
+        return history
+    
+    def query_transaction_history(self, entity_type=None, entity_id=None,
+                                  since=None, until=None, offset=0, limit=None):
+        """
+        Historique paginé d'une entité via l'index (entity_type, entity_id).
+        since/until filtrent sur l'horodatage du bloc (ISO 8601, bornes incluses).
+        Retourne (entrées de la page, nombre total d'entrées correspondantes).
+        """
+        if isinstance(since, datetime):
+            since = since.isoformat()
+        if isinstance(until, datetime):
+            until = until.isoformat()
+        
+        if not entity_type:
+            return self._scan_transaction_history(since, until, offset, limit)
+        
+        self._update_entity_index()
+        with self._lock:
+            if entity_id is not None and entity_id != '':
+                entries = self._entity_index.get((entity_type, str(entity_id)), [])
+            else:
+                entries = self._entity_type_index.get(entity_type, [])
+            
+            # Les entrées sont triées par (horodatage du bloc, index du bloc, position)
+            lo = bisect.bisect_left(entries, (since,)) if since else 0
+            hi = bisect.bisect_right(entries, (until, float('inf'))) if until else len(entries)
+            total = max(0, hi - lo)
+            start = lo + max(0, offset)
+            stop = hi if limit is None else min(hi, start + limit)
+            page = entries[start:stop]
+        
+        history = []
+        for timestamp, block_index, tx_offset in page:
+            block = self.chain[block_index]
+            history.append({
+                'block_index': block_index,
+                'timestamp': timestamp,
+                'transaction': block['transactions'][tx_offset]
+            })
+        return history, total
+    
+    def _scan_transaction_history(self, since, until, offset, limit):
+        """Historique complet (sans filtre d'entité) : parcours séquentiel de la chaîne"""
         history = []
-        for block in self.chain:
+        total = 0
+        for block in self._iter_blocks(0, len(self.chain)):
+            if since and block['timestamp'] < since:
+                continue
+            if until and block['timestamp'] > until:
+                continue
             for transaction in block.get('transactions', []):
-                if entity_type and entity_id:
-                    if (transaction.get('entity_type') == entity_type and 
-                        str(transaction.get('entity_id')) == str(entity_id)):
-                        history.append({
-                            'block_index': block['index'],
-                            'timestamp': block['timestamp'],
-                            'transaction': transaction
-                        })
-                elif entity_type:
-                    if transaction.get('entity_type') == entity_type:
-                        history.append({
-                            'block_index': block['index'],
-                            'timestamp': block['timestamp'],
-                            'transaction': transaction
-                        })
-                else:
+                if total >= offset and (limit is None or len(history) < limit):
                     history.append({
                         'block_index': block['index'],
                         'timestamp': block['timestamp'],
                         'transaction': transaction
                     })
-        return history
+                total += 1
+        return history, total
+    
+    def _iter_blocks(self, start, stop):
+        """Parcourt les blocs [start, stop) sans charger toute la chaîne"""
+        if self.store is not None:
+            return self.store.iter_blocks(start, stop)
+        return iter(self.chain[start:stop])
+    
+    def _index_block(self, block):
+        """Ajoute les transactions d'un bloc à l'index des entités"""
+        for tx_offset, transaction in enumerate(block.get('transactions', [])):
+            entity_type = transaction.get('entity_type')
+            if not entity_type:
+                continue
+            entry = (block['timestamp'], block['index'], tx_offset)
+            key = (entity_type, str(transaction.get('entity_id')))
+            self._entity_index.setdefault(key, []).append(entry)
+            self._entity_type_index.setdefault(entity_type, []).append(entry)
+    
+    def _update_entity_index(self):
+        """Indexe les blocs ajoutés depuis la dernière mise à jour (construction au premier appel)"""
+        with self._lock:
+            self.refresh()
+            height = len(self.chain)
+            if self._indexed_height >= height:
+                return
+            for block in self._iter_blocks(self._indexed_height, height):
+                self._index_block(block)
+            self._indexed_height = height
+    
+    def _reset_entity_index(self):
+        """Vide l'index des entités ; il sera reconstruit à la prochaine requête"""
+        self._entity_index = {}
+        self._entity_type_index = {}
+        self._indexed_height = 0
     
     def add_node(self, node_address):
         """Ajoute un nœud au réseau"""
         self.nodes.add(node_address)
         return True
     
+    def get_headers(self, start=0, limit=100):
+        """En-têtes (index, hash, hash précédent, horodatage) des blocs [start, start + limit)"""
+        stop = min(len(self.chain), start + limit)
+        return [{
+            'index': block['index'],
+            'hash': block['hash'],
+            'previous_hash': block['previous_hash'],
+            'timestamp': block['timestamp']
+        } for block in self._iter_blocks(start, stop)]
+    
+    def get_blocks_since(self, height, block_hash, limit=100):
+        """
+        Blocs manquants à un pair de hauteur height dont le dernier bloc a le hash block_hash.
+        Retourne (blocs, fork) : fork=True si le pair a divergé de notre chaîne.
+        """
+        with self._lock:
+            self.refresh()
+            if height > len(self.chain):
+                # Le pair est en avance : rien à lui envoyer
+                return [], False
+            if height < 1 or self.chain[height - 1]['hash'] != block_hash:
+                return [], True
+            stop = min(len(self.chain), height + limit)
+        
+        return list(self._iter_blocks(height, stop)), False
+    
+    def extend_chain(self, blocks):
+        """
+        Ajoute à notre chaîne des blocs reçus d'un pair en ne validant que ce suffixe.
+        Retourne le nombre de blocs ajoutés ; s'arrête au premier bloc qui ne se raccroche pas.
+        """
+        added = 0
+        for block in sorted(blocks, key=lambda b: b['index']):
+            if block['index'] < len(self.chain):
+                # Déjà présent (réception en double)
+                if self.chain[block['index']]['hash'] == block['hash']:
+                    continue
+                break
+            if not self.append_mined_block(block):
+                break
+            added += 1
+        return added
+    
     def replace_chain(self, new_chain):
         """Remplace la chaîne actuelle si la nouvelle est plus longue et valide"""
         if len(new_chain) <= len(self.chain):
@@ -172,7 +621,65 @@ class Blockchain:
         temp_blockchain.chain = new_chain
         
         if temp_blockchain.is_chain_valid():
-            self.chain = new_chain
+            with self._lock:
+                if self.store is not None:
+                    self.store.replace_blocks(new_chain)
+                    self._discard_mined_transactions(new_chain)
+                else:
+                    self.chain = new_chain
+                self._reset_entity_index()
+                # La nouvelle chaîne vient d'être validée intégralement
+                self._set_checkpoint(len(new_chain))
             return True
         
-        return False
\ No newline at end of file
+        return False
+
+
+def benchmark_block_hashing(transactions_count=50, duration=2.0):
+    """
+    Compare le débit (hashes/s) du hachage complet historique et du moteur incrémental
+    sur un bloc de transactions_count transactions.
+    """
+    block = {
+        'index': 1,
+        'timestamp': datetime.utcnow().isoformat(),
+        'transactions': [{
+            'type': 'action',
+            'user_id': i,
+            'action': 'benchmark',
+            'entity_type': 'benchmark',
+            'entity_id': i,
+            'details': {'value': i},
+            'timestamp': datetime.utcnow().isoformat(),
+            'id': hashlib.sha256(str(i).encode()).hexdigest()
+        } for i in range(transactions_count)],
+        'previous_hash': '0' * 64,
+        'nonce': 0,
+        'miner': 'benchmark'
+    }
+    
+    # Avant : re-sérialisation JSON complète à chaque nonce
+    attempts = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        for _ in range(100):
+            block['nonce'] = attempts
+            Blockchain.hash_block(block)
+            attempts += 1
+    full_rate = attempts / (time.perf_counter() - started)
+    
+    # Après : préfixe pré-haché, balayage par lots (difficulté impossible à atteindre)
+    hasher = BlockHasher(block)
+    attempts = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        hasher.scan(attempts, 10000, 64)
+        attempts += 10000
+    incremental_rate = attempts / (time.perf_counter() - started)
+    
+    return {
+        'transactions': transactions_count,
+        'full_serialization_hashes_per_sec': round(full_rate),
+        'incremental_hashes_per_sec': round(incremental_rate),
+        'speedup': round(incremental_rate / full_rate, 1) if full_rate else None
+    }
@@ -0,0 +1,369 @@
+# models/blockchain_store.py
+"""Stockage persistant append-only de la blockchain (segment + index d'offsets)"""
+import json
+import os
+import struct
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-processus
+    fcntl = None
+
+
+class BlockchainStore:
+    """
+    Ledger sur disque :
+    - chain.log : un bloc JSON par ligne, uniquement en ajout (un fsync par bloc)
+    - chain.idx : enregistrements binaires (offset, nb de transactions), reconstructible depuis chain.log
+    - pending.log : journal des transactions en attente (partagé), purgé des transactions minées
+    - checkpoint.json : hauteur vérifiée et hash du dernier bloc vérifié
+    Seul l'index est chargé au démarrage ; les blocs sont lus à la demande.
+    """
+
+    LOG_FILE = 'chain.log'
+    INDEX_FILE = 'chain.idx'
+    PENDING_FILE = 'pending.log'
+    CHECKPOINT_FILE = 'checkpoint.json'
+    LOCK_FILE = 'chain.lock'
+
+    INDEX_RECORD = struct.Struct('<QI')  # offset dans chain.log, nombre de transactions
+    CACHE_SIZE = 128
+
+    def __init__(self, data_dir):
+        os.makedirs(data_dir, exist_ok=True)
+        self.data_dir = data_dir
+        self.log_path = os.path.join(data_dir, self.LOG_FILE)
+        self.index_path = os.path.join(data_dir, self.INDEX_FILE)
+        self.pending_path = os.path.join(data_dir, self.PENDING_FILE)
+        self.checkpoint_path = os.path.join(data_dir, self.CHECKPOINT_FILE)
+        self.lock_path = os.path.join(data_dir, self.LOCK_FILE)
+
+        self._offsets = []
+        self._tx_counts = []
+        self._end = 0  # Taille de chain.log déjà indexée
+        self._log_id = None  # (inode, device) de chain.log indexé
+        self.generation = 0  # Incrémenté quand chain.log a été réécrit par un autre processus
+        self.transactions_count = 0
+        self._cache = OrderedDict()
+        self._lock = threading.RLock()
+
+        with self._file_lock():
+            self._load_index()
+
+    def __len__(self):
+        return len(self._offsets)
+
+    # ==================== CHARGEMENT ====================
+
+    def _load_index(self):
+        """Charge l'index et le complète/répare à partir du segment si besoin"""
+        for path in (self.log_path, self.index_path):
+            if not os.path.exists(path):
+                open(path, 'ab').close()
+
+        log_size = os.path.getsize(self.log_path)
+
+        with open(self.index_path, 'rb') as f:
+            raw = f.read()
+        usable = len(raw) - len(raw) % self.INDEX_RECORD.size
+        for offset, tx_count in self.INDEX_RECORD.iter_unpack(raw[:usable]):
+            if offset >= log_size:
+                break
+            self._offsets.append(offset)
+            self._tx_counts.append(tx_count)
+
+        # Position de fin du dernier bloc indexé
+        if self._offsets:
+            with open(self.log_path, 'rb') as f:
+                f.seek(self._offsets[-1])
+                line = f.readline()
+            if line.endswith(b'\n'):
+                self._end = self._offsets[-1] + len(line)
+            else:
+                # Dernier bloc incomplet (arrêt pendant l'écriture)
+                self._end = self._offsets.pop()
+                self._tx_counts.pop()
+
+        # Blocs présents dans le segment mais absents de l'index
+        self._scan_new_blocks()
+        if os.path.getsize(self.log_path) > self._end:
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(self._end)
+
+        self._sync_index_file()
+        self.transactions_count = sum(self._tx_counts)
+        self._log_id = self._log_identity()
+
+    def _log_identity(self):
+        stat = os.stat(self.log_path)
+        return stat.st_ino, stat.st_dev
+
+    def _log_rewritten(self):
+        """chain.log remplacé (replace_blocks) ou raccourci depuis son indexation"""
+        return self._log_identity() != self._log_id or os.path.getsize(self.log_path) < self._end
+
+    def _catch_up(self):
+        """
+        Sous verrou fichier : intègre les blocs ajoutés par les autres processus, ou recharge
+        tout l'index si le segment a été réécrit (les offsets connus ne sont plus valables).
+        """
+        if not self._log_rewritten():
+            return self._scan_new_blocks()
+
+        self._offsets = []
+        self._tx_counts = []
+        self._end = 0
+        self.transactions_count = 0
+        self._cache.clear()
+        self._load_index()
+        self.generation += 1
+        return []
+
+    def _scan_new_blocks(self):
+        """Lit les blocs ajoutés après self._end (reprise après crash ou écriture d'un autre processus)"""
+        new_blocks = []
+        if os.path.getsize(self.log_path) <= self._end:
+            return new_blocks
+
+        with open(self.log_path, 'rb') as f:
+            f.seek(self._end)
+            position = self._end
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                block = json.loads(line)
+                self._offsets.append(position)
+                self._tx_counts.append(len(block.get('transactions', [])))
+                self.transactions_count += self._tx_counts[-1]
+                position += len(line)
+                new_blocks.append(block)
+            self._end = position
+
+        return new_blocks
+
+    def _sync_index_file(self):
+        """Aligne chain.idx sur l'index en mémoire"""
+        expected_size = len(self._offsets) * self.INDEX_RECORD.size
+        current_size = os.path.getsize(self.index_path)
+        if current_size == expected_size:
+            return
+
+        with open(self.index_path, 'r+b') as f:
+            start = min(current_size, expected_size) // self.INDEX_RECORD.size
+            f.truncate(start * self.INDEX_RECORD.size)
+            f.seek(0, os.SEEK_END)
+            for offset, tx_count in zip(self._offsets[start:], self._tx_counts[start:]):
+                f.write(self.INDEX_RECORD.pack(offset, tx_count))
+
+    @contextmanager
+    def _file_lock(self):
+        """Verrou exclusif partagé entre les workers (gunicorn) sur le même répertoire"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def refresh(self):
+        """
+        Intègre les blocs écrits par d'autres processus ; retourne les nouveaux blocs.
+        Après une réécriture du segment, retourne [] et incrémente generation.
+        """
+        with self._lock:
+            if os.path.getsize(self.log_path) <= self._end and not self._log_rewritten():
+                return []
+            with self._file_lock():
+                return self._catch_up()
+
+    # ==================== LECTURE ====================
+
+    def read_block(self, index):
+        """Lit un bloc par son index (avec cache LRU)"""
+        with self._lock:
+            block = self._cache.get(index)
+            if block is not None:
+                self._cache.move_to_end(index)
+                return block
+
+            with open(self.log_path, 'rb') as f:
+                f.seek(self._offsets[index])
+                block = json.loads(f.readline())
+
+            self._remember(index, block)
+            return block
+
+    def iter_blocks(self, start=0, stop=None):
+        """Parcourt les blocs séquentiellement sans les garder en mémoire"""
+        with self._lock:
+            stop = len(self._offsets) if stop is None else min(stop, len(self._offsets))
+            if start >= stop:
+                return
+            first_offset = self._offsets[start]
+
+        with open(self.log_path, 'rb') as f:
+            f.seek(first_offset)
+            for _ in range(start, stop):
+                yield json.loads(f.readline())
+
+    def _remember(self, index, block):
+        self._cache[index] = block
+        self._cache.move_to_end(index)
+        while len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    # ==================== ÉCRITURE ====================
+
+    def append_block(self, block):
+        """
+        Ajoute un bloc en fin de segment avec un seul fsync.
+        Retourne False si un autre processus a déjà écrit un bloc à cet index
+        ou a réécrit la chaîne (le bloc a été validé contre l'ancienne).
+        """
+        line = (json.dumps(block, sort_keys=True) + '\n').encode()
+
+        with self._file_lock():
+            generation = self.generation
+            self._catch_up()
+            if self.generation != generation or block['index'] != len(self._offsets):
+                return False
+
+            with open(self.log_path, 'ab') as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+            # L'index n'est pas synchronisé sur disque : il se reconstruit depuis chain.log
+            self._sync_index_file()
+            tx_count = len(block.get('transactions', []))
+            with open(self.index_path, 'ab') as f:
+                f.write(self.INDEX_RECORD.pack(offset, tx_count))
+
+            self._offsets.append(offset)
+            self._tx_counts.append(tx_count)
+            self.transactions_count += tx_count
+            self._end = offset + len(line)
+            self._remember(block['index'], block)
+
+        return True
+
+    def replace_blocks(self, blocks):
+        """Remplace atomiquement tout le segment (remplacement de chaîne après synchronisation)"""
+        offsets, tx_counts = [], []
+
+        with self._file_lock():
+            tmp_log = self.log_path + '.tmp'
+            tmp_index = self.index_path + '.tmp'
+
+            position = 0
+            with open(tmp_log, 'wb') as log_file, open(tmp_index, 'wb') as index_file:
+                for block in blocks:
+                    line = (json.dumps(block, sort_keys=True) + '\n').encode()
+                    log_file.write(line)
+                    offsets.append(position)
+                    tx_counts.append(len(block.get('transactions', [])))
+                    index_file.write(self.INDEX_RECORD.pack(position, tx_counts[-1]))
+                    position += len(line)
+                log_file.flush()
+                os.fsync(log_file.fileno())
+
+            os.replace(tmp_log, self.log_path)
+            os.replace(tmp_index, self.index_path)
+
+            self._log_id = self._log_identity()
+            self._offsets = offsets
+            self._tx_counts = tx_counts
+            self._end = position
+            self.transactions_count = sum(tx_counts)
+            self._cache.clear()
+
+    # ==================== TRANSACTIONS EN ATTENTE ====================
+
+    def load_pending(self):
+        """Relit le journal des transactions en attente"""
+        transactions = []
+        if not os.path.exists(self.pending_path):
+            return transactions
+
+        with open(self.pending_path, 'rb') as f:
+            for line in f:
+                if line.endswith(b'\n'):
+                    transactions.append(json.loads(line))
+        return transactions
+
+    def append_pending(self, transactions):
+        """Ajoute des transactions au journal (sans fsync : le bloc miné est le point durable)"""
+        data = ''.join(json.dumps(tx, sort_keys=True) + '\n' for tx in transactions).encode()
+        with self._file_lock():
+            with open(self.pending_path, 'ab') as f:
+                f.write(data)
+
+    def discard_pending(self, mined_ids):
+        """
+        Retire du journal les transactions minées, relu sous verrou : les transactions
+        journalisées par les autres processus sont conservées.
+        """
+        with self._file_lock():
+            transactions = self.load_pending()
+            remaining = [tx for tx in transactions if tx.get('id') not in mined_ids]
+            if len(remaining) == len(transactions):
+                return
+
+            tmp_path = self.pending_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                for tx in remaining:
+                    f.write((json.dumps(tx, sort_keys=True) + '\n').encode())
+            os.replace(tmp_path, self.pending_path)
+
+    # ==================== POINT DE CONTRÔLE ====================
+
+    def load_checkpoint(self):
+        """Retourne {'height', 'hash'} du dernier point de contrôle de validation, ou None"""
+        try:
+            with open(self.checkpoint_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_checkpoint(self, height, block_hash):
+        """Enregistre le point de contrôle (remplacement atomique du fichier)"""
+        tmp_path = f'{self.checkpoint_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'height': height, 'hash': block_hash}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+
+class PersistentChain(Sequence):
+    """Vue liste de la chaîne stockée sur disque (len, index, tranches, itération, append)"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.store.read_block(i) for i in range(*index.indices(len(self)))]
+
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('index de bloc hors limites')
+        return self.store.read_block(index)
+
+    def __iter__(self):
+        return self.store.iter_blocks()
+
+    def append(self, block):
+        return self.store.append_block(block)
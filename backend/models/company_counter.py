@@ -0,0 +1,38 @@
+# models/company_counter.py
+"""Compteurs matérialisés d'une entreprise (en-tête du dashboard)"""
+from datetime import datetime
+from database import db
+
+
+class CompanyCounter(db.Model):
+    """
+    Totaux d'une entreprise tenus à jour dans la transaction qui modifie les données
+    (voir utils/company_counters.py) ; is_stale force un recomptage complet à la prochaine lecture.
+    """
+
+    __tablename__ = 'company_counters'
+
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), primary_key=True)
+
+    departments = db.Column(db.Integer, nullable=False, default=0)  # Actifs, non supprimés
+    employees = db.Column(db.Integer, nullable=False, default=0)  # Utilisateurs actifs
+    projects = db.Column(db.Integer, nullable=False, default=0)  # Projets au statut 'active'
+    tickets = db.Column(db.Integer, nullable=False, default=0)  # Tickets ouverts
+    tables = db.Column(db.Integer, nullable=False, default=0)  # Tables actives
+    entries = db.Column(db.Integer, nullable=False, default=0)  # Lignes actives
+
+    is_stale = db.Column(db.Boolean, nullable=False, default=False)
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow)  # Dernier recomptage complet
+
+    def to_dict(self):
+        return {
+            'departments': self.departments,
+            'employees': self.employees,
+            'projects': self.projects,
+            'tickets': self.tickets,
+            'tables': self.tables,
+            'entries': self.entries
+        }
+
+    def __repr__(self):
+        return f'<CompanyCounter {self.company_id}>'
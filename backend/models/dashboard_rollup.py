@@ -0,0 +1,46 @@
+# models/dashboard_rollup.py
+"""Agrégats quotidiens du dashboard (par entreprise, département et jour)"""
+from datetime import datetime
+from database import db
+
+
+class DailyRollup(db.Model):
+    """
+    Compteurs et montants d'une source pour un jour, une entreprise et un département :
+    ex. ('tickets', 'status', 'en_cours') -> 12 tickets créés ce jour-là et actuellement en cours.
+    Recalculés par jour entier (voir utils/dashboard_rollups.py), jamais modifiés ligne à ligne.
+    """
+
+    __tablename__ = 'dashboard_daily_rollups'
+
+    id = db.Column(db.Integer, primary_key=True)
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=False)
+    department_id = db.Column(db.Integer, nullable=False, default=0)  # 0 : sans département
+    day = db.Column(db.Date, nullable=False)
+
+    source = db.Column(db.String(20), nullable=False)  # tickets, employees, attendance, payroll
+    dimension = db.Column(db.String(30), nullable=False)  # status, priority, hires, net
+    bucket = db.Column(db.String(50), nullable=False, default='')  # Valeur groupée ('' : total)
+
+    count = db.Column(db.Integer, nullable=False, default=0)
+    amount = db.Column(db.Numeric(14, 3), nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('source', 'day', 'company_id', 'department_id', 'dimension', 'bucket',
+                            name='uq_daily_rollup'),
+        db.Index('ix_daily_rollup_lookup', 'company_id', 'source', 'dimension', 'day'),
+    )
+
+    def __repr__(self):
+        return f'<DailyRollup {self.source}/{self.dimension}/{self.bucket} {self.day}>'
+
+
+class RollupMark(db.Model):
+    """Jour d'une source à recalculer, inscrit dans la transaction qui a modifié les données"""
+
+    __tablename__ = 'dashboard_rollup_marks'
+
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(20), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1,7 +1,10 @@
 # models/department_table.py
 """Modèle pour les tableaux personnalisés des départements"""
-from datetime import datetime
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
 from database import db
+from sqlalchemy.exc import IntegrityError
+import hashlib
 import json
 
 
@@ -41,8 +44,75 @@ class DepartmentTable(db.Model):
     rows = db.relationship('TableRow', back_populates='table', 
                           cascade='all, delete-orphan')
     created_by = db.relationship('User', foreign_keys=[created_by_id])
-    
-    def to_dict(self, include_columns=True, include_rows=False) -> dict:
+    state = db.relationship('TableState', uselist=False, cascade='all, delete-orphan')
+    
+    @property
+    def typed_values_ready(self) -> bool:
+        """Les valeurs typées (table_row_values) couvrent toutes les lignes de la table"""
+        return self.state is not None and bool(self.state.typed_values_ready)
+    
+    def get_state(self):
+        """Retourne l'état maintenu de la table, créé au besoin"""
+        if self.state is None:
+            if self.id is None:
+                self.state = TableState(typed_values_ready=False)
+            else:
+                self._create_state()
+        return self.state
+    
+    def _create_state(self):
+        """
+        Crée l'état d'une table existante dans un SAVEPOINT : si une requête concurrente
+        l'a créé entre-temps, son état est repris au lieu de faire échouer la transaction.
+        """
+        try:
+            with db.session.begin_nested():
+                db.session.execute(TableState.__table__.insert().values(
+                    table_id=self.id, typed_values_ready=False
+                ))
+        except IntegrityError:
+            pass
+        # Lecture verrouillante : voit la ligne validée par l'autre transaction
+        self.state = TableState.query.filter_by(table_id=self.id).with_for_update().one()
+    
+    def mark_rows_changed(self):
+        """Signale une écriture de lignes : incrément atomique de data_version"""
+        self._increment_state('data_version')
+    
+    def mark_schema_changed(self):
+        """Signale une modification des colonnes : invalide les validateurs compilés (schema_version)"""
+        self._increment_state('schema_version')
+    
+    @property
+    def schema_version(self) -> int:
+        return self.state.schema_version if self.state is not None else 0
+    
+    def _increment_state(self, field):
+        state = self.get_state()
+        current = getattr(state, field)
+        if state in db.session.new or current is None:
+            setattr(state, field, (current or 0) + 1)
+        else:
+            # Incrément en SQL : pas de perte de mise à jour entre workers
+            setattr(state, field, getattr(TableState, field) + 1)
+    
+    @staticmethod
+    def count_rows(table_ids) -> dict:
+        """Nombre de lignes de plusieurs tables en une requête groupée : {table_id: nombre}"""
+        table_ids = list(table_ids)
+        if not table_ids:
+            return {}
+        counts = dict(db.session.query(TableRow.table_id, db.func.count(TableRow.id)).filter(
+            TableRow.table_id.in_(table_ids)
+        ).group_by(TableRow.table_id).all())
+        return {table_id: counts.get(table_id, 0) for table_id in table_ids}
+    
+    def to_dict(self, include_columns=True, include_rows=False, rows_count=None) -> dict:
+        """rows_count : nombre de lignes déjà compté (listes), sinon un COUNT sans charger les lignes"""
+        if rows_count is None:
+            # Lignes de toute façon chargées pour include_rows : pas de requête supplémentaire
+            rows_count = len(self.rows) if include_rows else self.count_rows([self.id])[self.id]
+        
         data = {
             'id': self.id,
             'department_id': self.department_id,
@@ -58,7 +128,7 @@ class DepartmentTable(db.Model):
             'delete_permission': self.delete_permission,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
-            'rows_count': len(self.rows)
+            'rows_count': rows_count
         }
         
         if include_columns:
@@ -187,6 +257,10 @@ class TableRow(db.Model):
     table = db.relationship('DepartmentTable', back_populates='rows')
     created_by = db.relationship('User', foreign_keys=[created_by_id])
     updated_by = db.relationship('User', foreign_keys=[updated_by_id])
+    unique_values = db.relationship('TableUniqueValue', back_populates='row',
+                                    cascade='all, delete-orphan')
+    values = db.relationship('TableRowValue', back_populates='row',
+                             cascade='all, delete-orphan')
     
     # Index pour recherche rapide
     __table_args__ = (
@@ -212,6 +286,60 @@ class TableRow(db.Model):
         data[column_name] = value
         self.set_data(data)
     
+    def sync_unique_values(self, columns):
+        """
+        Met à jour l'index des valeurs uniques de la ligne (colonnes is_unique).
+        Une ligne inactive ne réserve aucune valeur.
+        """
+        data = self.get_data()
+        wanted = {}
+        if self.is_active is not False:
+            for column in columns:
+                if column.is_unique and not is_empty_value(data.get(column.name)):
+                    wanted[column.id] = TableUniqueValue.hash_value(data[column.name], column.data_type)
+        
+        # Mise à jour en place : pas de suppression/réinsertion d'une même valeur
+        existing = {entry.column_id: entry for entry in self.unique_values}
+        for column_id, value_hash in wanted.items():
+            entry = existing.pop(column_id, None)
+            if entry is None:
+                self.unique_values.append(TableUniqueValue(
+                    table_id=self.table_id,
+                    column_id=column_id,
+                    value_hash=value_hash
+                ))
+            elif entry.value_hash != value_hash:
+                entry.value_hash = value_hash
+        
+        for entry in existing.values():
+            self.unique_values.remove(entry)
+    
+    def sync_typed_values(self, columns):
+        """Met à jour les valeurs typées de la ligne (une par colonne renseignée)"""
+        data = self.get_data()
+        wanted = {}
+        for column in columns:
+            fields = TableRowValue.typed_fields(column, data.get(column.name))
+            if fields is not None:
+                wanted[column.id] = fields
+        
+        existing = {entry.column_id: entry for entry in self.values}
+        for column_id, fields in wanted.items():
+            entry = existing.pop(column_id, None)
+            if entry is None:
+                self.values.append(TableRowValue(table_id=self.table_id, column_id=column_id, **fields))
+            else:
+                for field, value in fields.items():
+                    setattr(entry, field, value)
+        
+        for entry in existing.values():
+            self.values.remove(entry)
+    
+    def sync_indexes(self, columns):
+        """Synchronise les index dérivés des données (valeurs uniques, valeurs typées)"""
+        self.sync_unique_values(columns)
+        self.sync_typed_values(columns)
+    
     def to_dict(self, include_audit=False) -> dict:
         result = {
             'id': self.id,
@@ -235,6 +363,251 @@ class TableRow(db.Model):
         return f'<TableRow {self.id}>'
 
 
+def is_empty_value(value) -> bool:
+    """Valeur absente pour une colonne (None ou chaîne vide)"""
+    return value is None or value == ''
+
+
+class TableUniqueValue(db.Model):
+    """Index des valeurs des colonnes uniques : l'unicité est garantie par la base"""
+    
+    __tablename__ = 'table_unique_values'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    table_id = db.Column(db.Integer, db.ForeignKey('department_tables.id'), nullable=False)
+    column_id = db.Column(db.Integer, db.ForeignKey('table_columns.id'), nullable=False)
+    row_id = db.Column(db.Integer, db.ForeignKey('table_rows.id'), nullable=False)
+    
+    # SHA-256 de la valeur normalisée
+    value_hash = db.Column(db.String(64), nullable=False)
+    
+    # Relation
+    row = db.relationship('TableRow', back_populates='unique_values')
+    
+    __table_args__ = (
+        db.UniqueConstraint('table_id', 'column_id', 'value_hash', name='unique_table_column_value'),
+        db.Index('idx_unique_value_row', 'row_id'),
+    )
+    
+    @staticmethod
+    def hash_value(value, data_type=None) -> str:
+        """Hash de la valeur normalisée (espaces retirés, nombres sous forme canonique)"""
+        if isinstance(value, str):
+            value = value.strip()
+        if data_type in ('number', 'decimal'):
+            try:
+                number = float(value)
+                value = int(number) if number.is_integer() else number
+            except (TypeError, ValueError):
+                pass
+        return hashlib.sha256(json.dumps(value, sort_keys=True).encode()).hexdigest()
+    
+    @classmethod
+    def is_taken(cls, table_id, column, value, exclude_row_id=None) -> bool:
+        """Indique si la valeur est déjà utilisée par une autre ligne (requête indexée)"""
+        query = cls.query.filter_by(
+            table_id=table_id,
+            column_id=column.id,
+            value_hash=cls.hash_value(value, column.data_type)
+        )
+        if exclude_row_id is not None:
+            query = query.filter(cls.row_id != exclude_row_id)
+        return db.session.query(query.exists()).scalar()
+    
+    def __repr__(self):
+        return f'<TableUniqueValue {self.table_id}/{self.column_id}>'
+
+
+class TableRowValue(db.Model):
+    """
+    Valeur typée d'une cellule, extraite du JSON de la ligne selon TableColumn.data_type.
+    Permet tris, filtres et agrégats indexés en SQL sans décoder les lignes.
+    """
+    
+    __tablename__ = 'table_row_values'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    table_id = db.Column(db.Integer, db.ForeignKey('department_tables.id'), nullable=False)
+    column_id = db.Column(db.Integer, db.ForeignKey('table_columns.id'), nullable=False)
+    row_id = db.Column(db.Integer, db.ForeignKey('table_rows.id'), nullable=False)
+    
+    # Une seule valeur renseignée selon le type de la colonne
+    value_number = db.Column(db.Numeric(30, 10))  # number, decimal
+    value_date = db.Column(db.DateTime)  # date, datetime
+    value_bool = db.Column(db.Boolean)  # boolean
+    value_text = db.Column(db.Text)  # autres types
+    
+    # Relation
+    row = db.relationship('TableRow', back_populates='values')
+    
+    __table_args__ = (
+        db.UniqueConstraint('row_id', 'column_id', name='unique_row_column_value'),
+        db.Index('idx_row_value_number', 'table_id', 'column_id', 'value_number'),
+        db.Index('idx_row_value_date', 'table_id', 'column_id', 'value_date'),
+        db.Index('idx_row_value_bool', 'table_id', 'column_id', 'value_bool'),
+        db.Index('idx_row_value_text', 'table_id', 'column_id', 'value_text',
+                 mysql_length={'value_text': 191}),
+    )
+    
+    # Champ de stockage par type de colonne
+    NUMBER_TYPES = ('number', 'decimal')
+    DATE_TYPES = ('date', 'datetime')
+    
+    @classmethod
+    def value_field(cls, data_type) -> str:
+        """Nom du champ typé utilisé pour un data_type"""
+        if data_type in cls.NUMBER_TYPES:
+            return 'value_number'
+        if data_type in cls.DATE_TYPES:
+            return 'value_date'
+        if data_type == 'boolean':
+            return 'value_bool'
+        return 'value_text'
+    
+    @classmethod
+    def typed_fields(cls, column, value):
+        """
+        Convertit une valeur brute dans le champ typé de la colonne.
+        Retourne None si la valeur est vide ; une valeur non convertible est conservée en texte.
+        """
+        if is_empty_value(value):
+            return None
+        
+        field = cls.value_field(column.data_type)
+        try:
+            if field == 'value_number':
+                number = Decimal(str(value).strip())
+                if not number.is_finite():
+                    raise ValueError(value)
+                return {'value_number': number}
+            if field == 'value_date':
+                moment = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+                if moment.tzinfo is not None:
+                    moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+                return {'value_date': moment}
+            if field == 'value_bool':
+                if isinstance(value, bool):
+                    return {'value_bool': value}
+                return {'value_bool': str(value).strip().lower() in ('true', '1', 'yes', 'oui')}
+        except (InvalidOperation, ValueError):
+            pass
+        
+        if isinstance(value, (list, dict)):
+            value = json.dumps(value, ensure_ascii=False)
+        return {'value_text': str(value)}
+    
+    def __repr__(self):
+        return f'<TableRowValue {self.row_id}/{self.column_id}>'
+
+
+class TableState(db.Model):
+    """État maintenu d'une table personnalisée (table annexe, sans modifier department_tables)"""
+    
+    __tablename__ = 'department_table_states'
+    
+    table_id = db.Column(db.Integer, db.ForeignKey('department_tables.id'), primary_key=True)
+    
+    # Les valeurs typées ont été générées pour toutes les lignes existantes
+    typed_values_ready = db.Column(db.Boolean, default=False, nullable=False)
+    
+    # Incrémenté à chaque écriture de lignes (invalidation des caches entre workers)
+    data_version = db.Column(db.Integer, default=0, nullable=False)
+    
+    # Incrémenté à chaque modification des colonnes (invalidation des validateurs compilés)
+    schema_version = db.Column(db.Integer, default=0, nullable=False)
+    
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<TableState {self.table_id}>'
+
+
+def backfill_typed_values(table, batch_size=1000) -> int:
+    """
+    Génère les valeurs typées de toutes les lignes d'une table, par lots d'une transaction.
+    Retourne le nombre de lignes traitées ; la table est ensuite marquée prête.
+    """
+    columns = list(table.columns)
+    processed = 0
+    last_id = 0
+    
+    while True:
+        batch = db.session.query(TableRow.id, TableRow.data).filter(
+            TableRow.table_id == table.id,
+            TableRow.id > last_id
+        ).order_by(TableRow.id).limit(batch_size).all()
+        if not batch:
+            break
+        
+        row_ids = [row_id for row_id, _ in batch]
+        TableRowValue.query.filter(TableRowValue.row_id.in_(row_ids)).delete(synchronize_session=False)
+        
+        entries = []
+        for row_id, raw_data in batch:
+            data = json.loads(raw_data) if raw_data else {}
+            for column in columns:
+                fields = TableRowValue.typed_fields(column, data.get(column.name))
+                if fields is not None:
+                    entries.append(dict(fields, table_id=table.id, column_id=column.id, row_id=row_id))
+        
+        db.session.bulk_insert_mappings(TableRowValue, entries)
+        db.session.commit()
+        
+        processed += len(batch)
+        last_id = row_ids[-1]
+    
+    table.get_state().typed_values_ready = True
+    table.mark_rows_changed()
+    db.session.commit()
+    return processed
+
+
+def rebuild_unique_index(table) -> list:
+    """
+    Reconstruit l'index des valeurs uniques d'une table à partir des lignes actives.
+    Retourne les doublons rencontrés : ligne en double, colonne, valeur et ligne déjà indexée
+    (les doublons ne sont pas indexés, l'appelant doit les signaler).
+    """
+    TableUniqueValue.query.filter_by(table_id=table.id).delete(synchronize_session=False)
+    
+    unique_columns = [column for column in table.columns if column.is_unique]
+    if not unique_columns:
+        return []
+    
+    seen = {}  # (colonne, hash) -> ligne indexée
+    entries = []
+    duplicates = []
+    rows = db.session.query(TableRow.id, TableRow.data).filter_by(
+        table_id=table.id, is_active=True
+    ).order_by(TableRow.id)
+    
+    for row_id, raw_data in rows.yield_per(1000):
+        data = json.loads(raw_data) if raw_data else {}
+        for column in unique_columns:
+            value = data.get(column.name)
+            if is_empty_value(value):
+                continue
+            key = (column.id, TableUniqueValue.hash_value(value, column.data_type))
+            if key in seen:
+                duplicates.append({
+                    'row_id': row_id,
+                    'column': column.name,
+                    'value': value,
+                    'indexed_row_id': seen[key]
+                })
+                continue
+            seen[key] = row_id
+            entries.append({
+                'table_id': table.id,
+                'column_id': column.id,
+                'row_id': row_id,
+                'value_hash': key[1]
+            })
+    
+    db.session.bulk_insert_mappings(TableUniqueValue, entries)
+    return duplicates
+
+
 class TableTemplate(db.Model):
     """Templates prédéfinis pour créer rapidement des tables"""
     
@@ -105,15 +105,13 @@ def signup_admin():
         
         # Logger l'événement dans la blockchain (SANS IMPORT CIRCULAIRE)
         try:
-            blockchain = get_blockchain()
-            if blockchain:
-                blockchain.add_transaction({
-                    'type': 'admin_created',
-                    'user_id': admin_user.id,
-                    'username': username,
-                    'email': email,
-                    'timestamp': datetime.utcnow().isoformat()
-                })
+            AuditLogger.log_transaction({
+                'type': 'admin_created',
+                'user_id': admin_user.id,
+                'username': username,
+                'email': email,
+                'timestamp': datetime.utcnow().isoformat()
+            })
         except Exception as e:
             print(f"Blockchain logging failed: {e}")
         
@@ -230,13 +228,11 @@ def logout():
     
     if user_id:
         try:
-            blockchain = get_blockchain()
-            if blockchain:
-                blockchain.add_transaction({
-                    'type': 'logout',
-                    'user_id': user_id,
-                    'timestamp': datetime.utcnow().isoformat()
-                })
+            AuditLogger.log_transaction({
+                'type': 'logout',
+                'user_id': user_id,
+                'timestamp': datetime.utcnow().isoformat()
+            })
         except Exception as e:
             print(f"Blockchain logging failed: {e}")
     
@@ -304,13 +300,11 @@ def change_password():
         
         # Logger dans la blockchain (SANS IMPORT CIRCULAIRE)
         try:
-            blockchain = get_blockchain()
-            if blockchain:
-                blockchain.add_transaction({
-                    'type': 'password_changed',
-                    'user_id': user.id,
-                    'timestamp': datetime.utcnow().isoformat()
-                })
+            AuditLogger.log_transaction({
+                'type': 'password_changed',
+                'user_id': user.id,
+                'timestamp': datetime.utcnow().isoformat()
+            })
         except Exception as e:
             print(f"Blockchain logging failed: {e}")
         
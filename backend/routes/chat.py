@@ -6,6 +6,7 @@ from database import db
 from models.user import User
 from models.chat import ChatMessage, ChatConversation, ChatGroup, ChatGroupMember, ChatFile
 from utils.security import require_login, SecurityValidator, AuditLogger
+from utils.dashboard_feed import dashboard_feed
 from datetime import datetime
 from werkzeug.utils import secure_filename
 import os
@@ -19,6 +20,7 @@ def init_socketio(app):
     """Initialiser SocketIO"""
     global socketio
     socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+    dashboard_feed.init_app(app, socketio)
     
     @socketio.on('connect')
     def handle_connect():
@@ -78,6 +80,7 @@ def init_socketio(app):
     @socketio.on('disconnect')
     def handle_disconnect():
         """Déconnexion WebSocket"""
+        dashboard_feed.unsubscribe(request.sid)
         if 'user_id' in session:
             user_id = session['user_id']
             user = User.query.get(user_id)
@@ -114,6 +117,28 @@ def init_socketio(app):
             'conversation_id': conversation_id
         }, room=f'conversation_{conversation_id}', include_self=False)
     
+    @socketio.on('dashboard_subscribe')
+    def handle_dashboard_subscribe(data):
+        """Suivre en direct les widgets affichés (remplace l'abonnement précédent de la connexion)"""
+        if 'user_id' not in session:
+            return {'error': 'Non authentifié'}
+        
+        user = User.query.get(session['user_id'])
+        widget_ids = (data or {}).get('widget_ids')
+        if not user or not isinstance(widget_ids, list) or not all(isinstance(wid, int) for wid in widget_ids):
+            return {'error': 'widget_ids doit être une liste d\'identifiants'}
+        
+        subscription = dashboard_feed.subscribe(
+            request.sid, user, widget_ids, dashboard_feed.normalize_filters(data)
+        )
+        return {'success': True, 'filters': subscription.filters}
+    
+    @socketio.on('dashboard_unsubscribe')
+    def handle_dashboard_unsubscribe():
+        """Arrêter le suivi du dashboard"""
+        dashboard_feed.unsubscribe(request.sid)
+        return {'success': True}
+    
     return socketio
 
 
@@ -1,7 +1,8 @@
-from flask import Blueprint, request, jsonify, session, render_template
+from flask import Blueprint, request, jsonify, session, render_template, current_app
 from models.user import User, db
 from models.company import Company, Department, DepartmentField, DepartmentItem
 from utils.security import SecurityValidator, require_login, require_admin, AuditLogger
+from utils.company_stats import get_company_stats
 from datetime import datetime
 
 try:
@@ -230,134 +231,8 @@ def company_stats(company_id):
     company = Company.query.get_or_404(company_id)
     
     try:
-        # Compter les départements actifs (non supprimés)
-        departments = Department.query.filter_by(
-            company_id=company_id,
-            deleted_at=None
-        ).all()
-        departments_count = len(departments)
-        
-        # Compter les utilisateurs actifs
-        users_count = User.query.filter_by(
-            company_id=company_id,
-            is_active=True
-        ).count()
-        
-        # Compter les tables personnalisées (si le module existe)
-        tables_count = 0
-        total_entries = 0
-        
-        if DepartmentTable is not None and TableRow is not None:
-            tables_count = db.session.query(DepartmentTable).join(
-                Department
-            ).filter(
-                Department.company_id == company_id,
-                Department.deleted_at == None
-            ).count()
-            
-            # Compter les entrées totales dans toutes les tables
-            total_entries = db.session.query(TableRow).join(
-                DepartmentTable
-            ).join(
-                Department
-            ).filter(
-                Department.company_id == company_id,
-                Department.deleted_at == None
-            ).count()
-        
-        # Statistiques détaillées par département
-        dept_stats = []
-        for dept in departments:
-            # Compter les employés du département
-            employees_count = User.query.filter_by(
-                department_id=dept.id,
-                is_active=True
-            ).count()
-            
-            # Compter les tables du département
-            dept_tables_count = 0
-            dept_entries = 0
-            
-            if DepartmentTable is not None and TableRow is not None:
-                dept_tables_count = DepartmentTable.query.filter_by(
-                    department_id=dept.id
-                ).count()
-                
-                # Compter les entrées du département
-                dept_entries = db.session.query(TableRow).join(
-                    DepartmentTable
-                ).filter(
-                    DepartmentTable.department_id == dept.id
-                ).count()
-            
-            dept_stats.append({
-                'id': dept.id,
-                'name': dept.name,
-                'employees_count': employees_count,
-                'tables_count': dept_tables_count,
-                'entries_count': dept_entries,
-                'budget': float(dept.budget) if dept.budget else 0,
-                'budget_spent': float(dept.budget_spent) if dept.budget_spent else 0
-            })
-        
-        # Statistiques par période (7 derniers jours)
-        from datetime import timedelta
-        today = datetime.utcnow()
-        week_ago = today - timedelta(days=7)
-        
-        # Activité des 7 derniers jours
-        daily_activity = []
-        for i in range(7):
-            day = week_ago + timedelta(days=i)
-            day_start = day.replace(hour=0, minute=0, second=0, microsecond=0)
-            day_end = day.replace(hour=23, minute=59, second=59, microsecond=999999)
-            
-            # Compter les entrées créées ce jour (si le module existe)
-            entries_count = 0
-            if DepartmentTable is not None and TableRow is not None:
-                entries_count = db.session.query(TableRow).join(
-                    DepartmentTable
-                ).join(
-                    Department
-                ).filter(
-                    Department.company_id == company_id,
-                    TableRow.created_at >= day_start,
-                    TableRow.created_at <= day_end
-                ).count()
-            
-            # Utilisateurs actifs (placeholder - nécessite une table de logs)
-            active_users = users_count // 7 if users_count > 0 else 0
-            
-            daily_activity.append({
-                'date': day.strftime('%Y-%m-%d'),
-                'day_name': ['Lun', 'Mar', 'Mer', 'Jeu', 'Ven', 'Sam', 'Dim'][day.weekday()],
-                'entries': entries_count,
-                'active_users': active_users
-            })
-        
-        # Statistiques par rôle
-        role_stats = {}
-        for role in ['admin', 'department_manager', 'employee', 'technician']:
-            count = User.query.filter_by(
-                company_id=company_id,
-                role=role,
-                is_active=True
-            ).count()
-            role_stats[role] = count
-        
-        stats = {
-            'departments_count': departments_count,
-            'users_count': users_count,
-            'tables_count': tables_count,
-            'total_entries': total_entries,
-            'departments': dept_stats,
-            'daily_activity': daily_activity,
-            'role_distribution': role_stats,
-            'company': {
-                'name': company.name,
-                'created_at': company.created_at.isoformat() if company.created_at else None
-            }
-        }
+        # Requêtes groupées (nombre constant), mises en cache quelques secondes par entreprise
+        stats = get_company_stats(company, current_app.config.get('COMPANY_STATS_CACHE_TTL', 30))
         
         return jsonify({
             'success': True,
@@ -1,21 +1,26 @@
 # routes/dashboard.py
 """Routes pour le dashboard Power BI personnalisable"""
-from flask import Blueprint, request, jsonify, session, render_template, redirect, url_for
+from flask import Blueprint, request, jsonify, session, render_template, redirect, url_for, current_app
 from database import db
 from models.user import User
 from models.company import Department, Company
 from models.dashboard import DashboardWidget
-from models.department_table import DepartmentTable, TableRow
+from models.department_table import DepartmentTable, TableRow, TableState
 from models.project import Project, ProjectTask
 from models.ticket import Ticket
 from models.employee_request import EmployeeRequest
 from models.payroll import Attendance, Payslip
-from datetime import datetime, timedelta
+from models.dashboard_rollup import DailyRollup
+from utils.company_counters import get_company_counters
+from utils.dashboard_rollups import rollup_daily, rollup_totals
+from utils.widget_engine import widget_engine
 from sqlalchemy import func, distinct, and_, or_
 import json
 
 dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/api/dashboard')
 
+MAX_BATCH_WIDGETS = 50
+
 def check_auth():
     """Vérifie l'authentification"""
     if 'user_id' not in session:
@@ -37,32 +42,13 @@ def get_accessible_departments(user):
         return [dept] if dept and dept.deleted_at is None else []
     return []
 
-def get_date_range(time_filter, start_date=None, end_date=None):
-    """Calcule les dates selon le filtre"""
-    end = datetime.utcnow()
-    
-    if time_filter == 'custom' and start_date and end_date:
-        try:
-            start = datetime.fromisoformat(start_date)
-            end = datetime.fromisoformat(end_date)
-            return start, end
-        except:
-            pass
-    
-    if time_filter == 'today':
-        start = end.replace(hour=0, minute=0, second=0, microsecond=0)
-    elif time_filter == 'week':
-        start = end - timedelta(days=7)
-    elif time_filter == 'month':
-        start = end - timedelta(days=30)
-    elif time_filter == 'quarter':
-        start = end - timedelta(days=90)
-    elif time_filter == 'year':
-        start = end - timedelta(days=365)
-    else:
-        start = end - timedelta(days=7)
-    
-    return start, end
+def get_rollup_department(user, department_id):
+    """Département agrégé : celui demandé, sinon celui de l'utilisateur hors admin/DRH (None : toute l'entreprise)"""
+    if department_id:
+        return department_id
+    if not (user.is_admin or user.role == 'directeur_rh'):
+        return user.department_id
+    return None
 
 # ==================== ROUTES PRINCIPALES ====================
 
@@ -229,52 +215,54 @@ def get_widget_data(widget_id):
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
     
-    # Générer les données selon le type
-    data = generate_widget_data(widget, user, time_filter, department_id, start_date, end_date)
+    # Données calculées par la source du widget (ou lues dans le cache du moteur)
+    data = widget_engine.get_data(widget, user, time_filter, department_id, start_date, end_date)
     
     return jsonify({
         'success': True,
         'data': data
     })
 
-# ==================== GÉNÉRATION DES DONNÉES ====================
-
-def generate_widget_data(widget, user, time_filter, department_filter=None, start_date=None, end_date=None):
-    """Génère les données pour un widget selon son type"""
-    filters = widget.get_filters()
-    metric = filters.get('metric', 'count')
-    start, end = get_date_range(time_filter, start_date, end_date)
-    
-    data_source = widget.data_source
-    department_id = department_filter or widget.department_id
-    
-    # Vérifier les permissions
-    if department_id and not (user.is_admin or user.role == 'directeur_rh'):
-        if user.department_id != int(department_id):
-            return {'error': 'Accès non autorisé'}
-    
-    # Router vers la fonction appropriée
-    if data_source == 'employees':
-        return get_employees_data(widget, user, metric, start, end, department_id)
-    elif data_source == 'projects':
-        return get_projects_data(widget, user, metric, start, end, department_id)
-    elif data_source == 'tickets':
-        return get_tickets_data(widget, user, metric, start, end, department_id)
-    elif data_source == 'requests':
-        return get_requests_data(widget, user, metric, start, end, department_id)
-    elif data_source == 'tables':
-        return get_tables_data(widget, user, metric, start, end, department_id)
-    elif data_source == 'attendance':
-        return get_attendance_data(widget, user, metric, start, end, department_id)
-    elif data_source == 'payroll':
-        return get_payroll_data(widget, user, metric, start, end, department_id)
-    elif data_source == 'departments':
-        return get_departments_data(widget, user, metric, start, end, department_id)
-    elif data_source == 'tasks':
-        return get_tasks_data(widget, user, metric, start, end, department_id)
+@dashboard_bp.route('/widgets/data', methods=['POST'])
+def get_widgets_data():
+    """Données de plusieurs widgets (tout un dashboard) en une requête"""
+    user = check_auth()
+    if not user:
+        return jsonify({'error': 'Non authentifié'}), 401
     
-    return {'labels': [], 'datasets': [], 'type': 'chart'}
+    data = request.get_json(silent=True) or {}
+    widget_ids = data.get('widget_ids')
+    if not isinstance(widget_ids, list) or not all(isinstance(wid, int) for wid in widget_ids):
+        return jsonify({'error': "widget_ids doit être une liste d'identifiants"}), 400
+    if len(widget_ids) > MAX_BATCH_WIDGETS:
+        return jsonify({'error': f'Maximum {MAX_BATCH_WIDGETS} widgets par requête'}), 400
+    
+    # Un seul chargement pour tous les widgets de l'utilisateur demandés
+    widgets = DashboardWidget.query.filter(
+        DashboardWidget.user_id == user.id,
+        DashboardWidget.id.in_(widget_ids)
+    ).all() if widget_ids else []
+    
+    results = widget_engine.get_many(
+        widgets, user,
+        data.get('time_filter', 'week'),
+        data.get('department_id') or None,
+        data.get('start_date'),
+        data.get('end_date'),
+        workers=current_app.config.get('DASHBOARD_BATCH_WORKERS', 0)
+    )
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            str(wid): results.get(wid, {'error': 'Widget introuvable'})
+            for wid in widget_ids
+        }
+    })
+
+# ==================== SOURCES DE DONNÉES ====================
 
+@widget_engine.source('employees', User, DailyRollup)
 def get_employees_data(widget, user, metric, start_date, end_date, department_id):
     """Données employés"""
     query = User.query.filter(
@@ -350,33 +338,14 @@ def get_employees_data(widget, user, metric, start_date, end_date, department_id
         }
     
     elif metric == 'new_hires':
-        query = query.filter(
-            User.created_at >= start_date,
-            User.created_at <= end_date
-        )
-        
-        # Grouper par jour
-        daily_data = db.session.query(
-            func.date(User.created_at).label('date'),
-            func.count(User.id).label('count')
-        ).filter(
-            User.company_id == user.company_id,
-            User.created_at >= start_date,
-            User.created_at <= end_date
-        )
-        
-        if department_id:
-            daily_data = daily_data.filter_by(department_id=department_id)
-        elif not (user.is_admin or user.role == 'directeur_rh'):
-            daily_data = daily_data.filter_by(department_id=user.department_id)
-        
-        daily_data = daily_data.group_by(func.date(User.created_at)).all()
+        daily_data = rollup_daily(user.company_id, get_rollup_department(user, department_id),
+                                  'employees', 'hires', start_date.date(), end_date.date())
         
         return {
-            'labels': [d.date.strftime('%d/%m') for d in daily_data],
+            'labels': [day.strftime('%d/%m') for day, _, _ in daily_data],
             'datasets': [{
                 'label': 'Nouvelles embauches',
-                'data': [d.count for d in daily_data],
+                'data': [count for _, count, _ in daily_data],
                 'borderColor': '#0078d4',
                 'backgroundColor': 'rgba(0, 120, 212, 0.1)',
                 'tension': 0.4,
@@ -410,6 +379,7 @@ def get_employees_data(widget, user, metric, start_date, end_date, department_id
     
     return {'labels': [], 'datasets': [], 'type': 'chart'}
 
+@widget_engine.source('projects', Project)
 def get_projects_data(widget, user, metric, start_date, end_date, department_id):
     """Données projets"""
     query = Project.query.filter(
@@ -513,22 +483,15 @@ def get_projects_data(widget, user, metric, start_date, end_date, department_id)
     
     return {'labels': [], 'datasets': [], 'type': 'chart'}
 
+@widget_engine.source('tickets', Ticket, DailyRollup)
 def get_tickets_data(widget, user, metric, start_date, end_date, department_id):
-    """Données tickets"""
-    query = Ticket.query.filter(
-        Ticket.created_at >= start_date,
-        Ticket.created_at <= end_date
-    )
-    
-    if department_id:
-        query = query.filter_by(department_id=department_id)
-    elif not (user.is_admin or user.role == 'directeur_rh'):
-        if user.department_id:
-            query = query.filter_by(department_id=user.department_id)
+    """Données tickets (agrégats quotidiens de l'entreprise)"""
+    scope = get_rollup_department(user, department_id)
     
     if metric == 'count':
-        count = query.count()
-        open_count = query.filter(Ticket.status.in_(['en_attente', 'en_cours', 'reouvert'])).count()
+        statuses = rollup_totals(user.company_id, scope, 'tickets', 'status', start_date.date(), end_date.date())
+        count = sum(total for total, _ in statuses.values())
+        open_count = sum(statuses.get(status, (0, 0))[0] for status in ['en_attente', 'en_cours', 'reouvert'])
         
         return {
             'value': count,
@@ -539,21 +502,7 @@ def get_tickets_data(widget, user, metric, start_date, end_date, department_id):
         }
     
     elif metric == 'by_status':
-        statuses = db.session.query(
-            Ticket.status,
-            func.count(Ticket.id).label('count')
-        ).filter(
-            Ticket.created_at >= start_date,
-            Ticket.created_at <= end_date
-        )
-        
-        if department_id:
-            statuses = statuses.filter_by(department_id=department_id)
-        elif not (user.is_admin or user.role == 'directeur_rh'):
-            if user.department_id:
-                statuses = statuses.filter_by(department_id=user.department_id)
-        
-        statuses = statuses.group_by(Ticket.status).all()
+        statuses = rollup_totals(user.company_id, scope, 'tickets', 'status', start_date.date(), end_date.date())
         
         status_labels = {
             'en_attente': 'En attente',
@@ -564,28 +513,17 @@ def get_tickets_data(widget, user, metric, start_date, end_date, department_id):
         }
         
         return {
-            'labels': [status_labels.get(s.status, s.status) for s in statuses],
+            'labels': [status_labels.get(status, status) for status in statuses],
             'datasets': [{
                 'label': 'Statuts des tickets',
-                'data': [s.count for s in statuses],
+                'data': [count for count, _ in statuses.values()],
                 'backgroundColor': ['#f59e0b', '#0078d4', '#10b981', '#8b5cf6', '#ef4444']
             }],
             'type': 'chart'
         }
     
     elif metric == 'by_priority':
-        priorities = db.session.query(
-            Ticket.priority,
-            func.count(Ticket.id).label('count')
-        ).filter(
-            Ticket.created_at >= start_date,
-            Ticket.created_at <= end_date
-        )
-        
-        if department_id:
-            priorities = priorities.filter_by(department_id=department_id)
-        
-        priorities = priorities.group_by(Ticket.priority).all()
+        priorities = rollup_totals(user.company_id, scope, 'tickets', 'priority', start_date.date(), end_date.date())
         
         priority_labels = {
             'critique': 'Critique',
@@ -595,10 +533,10 @@ def get_tickets_data(widget, user, metric, start_date, end_date, department_id):
         }
         
         return {
-            'labels': [priority_labels.get(p.priority, p.priority) for p in priorities],
+            'labels': [priority_labels.get(priority, priority) for priority in priorities],
             'datasets': [{
                 'label': 'Tickets par priorité',
-                'data': [p.count for p in priorities],
+                'data': [count for count, _ in priorities.values()],
                 'backgroundColor': ['#ef4444', '#f59e0b', '#10b981', '#06b6d4']
             }],
             'type': 'chart'
@@ -606,6 +544,7 @@ def get_tickets_data(widget, user, metric, start_date, end_date, department_id):
     
     return {'labels': [], 'datasets': [], 'type': 'chart'}
 
+@widget_engine.source('tasks', ProjectTask, Project)
 def get_tasks_data(widget, user, metric, start_date, end_date, department_id):
     """Données tâches de projets"""
     query = ProjectTask.query.join(Project).filter(
@@ -663,6 +602,7 @@ def get_tasks_data(widget, user, metric, start_date, end_date, department_id):
     
     return {'labels': [], 'datasets': [], 'type': 'chart'}
 
+@widget_engine.source('requests', EmployeeRequest, User)
 def get_requests_data(widget, user, metric, start_date, end_date, department_id):
     """Données demandes employés"""
     query = EmployeeRequest.query.filter(
@@ -738,6 +678,7 @@ def get_requests_data(widget, user, metric, start_date, end_date, department_id)
     
     return {'labels': [], 'datasets': [], 'type': 'chart'}
 
+@widget_engine.source('tables', DepartmentTable, TableRow, TableState, Department)
 def get_tables_data(widget, user, metric, start_date, end_date, department_id):
     """Données tables personnalisées"""
     query = DepartmentTable.query.join(Department).filter(
@@ -818,25 +759,18 @@ def get_tables_data(widget, user, metric, start_date, end_date, department_id):
     
     return {'labels': [], 'datasets': [], 'type': 'chart'}
 
+@widget_engine.source('attendance', Attendance, DailyRollup)
 def get_attendance_data(widget, user, metric, start_date, end_date, department_id):
-    """Données présences"""
+    """Données présences (agrégats quotidiens de l'entreprise)"""
     if not user.can_access_payroll:
         return {'error': 'Accès non autorisé'}
     
-    query = Attendance.query.filter(
-        Attendance.date >= start_date.date(),
-        Attendance.date <= end_date.date()
-    )
-    
-    if department_id:
-        query = query.join(User).filter(User.department_id == department_id)
-    elif not (user.is_admin or user.role == 'directeur_rh'):
-        if user.department_id:
-            query = query.join(User).filter(User.department_id == user.department_id)
+    scope = get_rollup_department(user, department_id)
     
     if metric == 'present':
-        count = query.filter_by(status='present').count()
-        total = query.count()
+        statuses = rollup_totals(user.company_id, scope, 'attendance', 'status', start_date.date(), end_date.date())
+        count = statuses.get('present', (0, 0))[0]
+        total = sum(total for total, _ in statuses.values())
         rate = (count / total * 100) if total > 0 else 0
         
         return {
@@ -848,20 +782,14 @@ def get_attendance_data(widget, user, metric, start_date, end_date, department_i
         }
     
     elif metric == 'trend':
-        daily_data = db.session.query(
-            Attendance.date,
-            func.count(Attendance.id).label('count')
-        ).filter(
-            Attendance.date >= start_date.date(),
-            Attendance.date <= end_date.date(),
-            Attendance.status == 'present'
-        ).group_by(Attendance.date).order_by(Attendance.date).all()
+        daily_data = rollup_daily(user.company_id, scope, 'attendance', 'status',
+                                  start_date.date(), end_date.date(), bucket='present')
         
         return {
-            'labels': [d.date.strftime('%d/%m') for d in daily_data],
+            'labels': [day.strftime('%d/%m') for day, _, _ in daily_data],
             'datasets': [{
                 'label': 'Présences',
-                'data': [d.count for d in daily_data],
+                'data': [count for _, count, _ in daily_data],
                 'borderColor': '#10b981',
                 'backgroundColor': 'rgba(16, 185, 129, 0.1)',
                 'tension': 0.4,
@@ -872,34 +800,17 @@ def get_attendance_data(widget, user, metric, start_date, end_date, department_i
     
     return {'labels': [], 'datasets': [], 'type': 'chart'}
 
+@widget_engine.source('payroll', Payslip, User, DailyRollup)
 def get_payroll_data(widget, user, metric, start_date, end_date, department_id):
-    """Données paie"""
+    """Données paie (agrégats quotidiens de l'entreprise)"""
     if not user.can_access_payroll:
         return {'error': 'Accès non autorisé'}
     
-    query = Payslip.query.filter(
-        Payslip.created_at >= start_date,
-        Payslip.created_at <= end_date
-    )
-    
-    if department_id:
-        query = query.join(User).filter(User.department_id == department_id)
-    elif not (user.is_admin or user.role == 'directeur_rh'):
-        if user.department_id:
-            query = query.join(User).filter(User.department_id == user.department_id)
+    scope = get_rollup_department(user, department_id)
     
     if metric == 'total_salary':
-        total = db.session.query(
-            func.sum(Payslip.net_salary)
-        ).filter(
-            Payslip.created_at >= start_date,
-            Payslip.created_at <= end_date
-        )
-        
-        if department_id:
-            total = total.join(User).filter(User.department_id == department_id)
-        
-        total = total.scalar() or 0
+        totals = rollup_totals(user.company_id, scope, 'payroll', 'net', start_date.date(), end_date.date())
+        total = sum(amount for _, amount in totals.values())
         
         return {
             'value': float(total),
@@ -909,19 +820,17 @@ def get_payroll_data(widget, user, metric, start_date, end_date, department_id):
         }
     
     elif metric == 'trend':
-        monthly_data = db.session.query(
-            func.strftime('%Y-%m', Payslip.created_at).label('month'),
-            func.sum(Payslip.net_salary).label('total')
-        ).filter(
-            Payslip.created_at >= start_date,
-            Payslip.created_at <= end_date
-        ).group_by(func.strftime('%Y-%m', Payslip.created_at)).all()
+        monthly_data = {}
+        for day, _, amount in rollup_daily(user.company_id, scope, 'payroll', 'net',
+                                           start_date.date(), end_date.date()):
+            month = day.strftime('%Y-%m')
+            monthly_data[month] = monthly_data.get(month, 0) + amount
         
         return {
-            'labels': [d.month for d in monthly_data],
+            'labels': list(monthly_data),
             'datasets': [{
                 'label': 'Masse salariale',
-                'data': [float(d.total) for d in monthly_data],
+                'data': list(monthly_data.values()),
                 'borderColor': '#0078d4',
                 'backgroundColor': 'rgba(0, 120, 212, 0.1)',
                 'tension': 0.4,
@@ -932,6 +841,7 @@ def get_payroll_data(widget, user, metric, start_date, end_date, department_id):
     
     return {'labels': [], 'datasets': [], 'type': 'chart'}
 
+@widget_engine.source('departments', Department, User)
 def get_departments_data(widget, user, metric, start_date, end_date, department_id):
     """Données départements"""
     query = Department.query.filter(
@@ -1170,58 +1080,22 @@ def get_global_stats():
     try:
         company = Company.query.get(user.company_id)
         
-        # Départements
-        dept_count = Department.query.filter_by(
-            company_id=user.company_id,
-            is_active=True,
-            deleted_at=None
-        ).count()
-        
-        # Employés
-        emp_count = User.query.filter_by(
-            company_id=user.company_id,
-            is_active=True
-        ).count()
-        
-        # Projets actifs
-        proj_count = Project.query.filter_by(
-            company_id=user.company_id,
-            status='active'
-        ).count()
-        
-        # Tickets ouverts
-        ticket_count = Ticket.query.filter(
-            Ticket.status.in_(['en_attente', 'en_cours', 'reouvert'])
-        ).count()
-        
-        # Tables
-        table_count = DepartmentTable.query.join(Department).filter(
-            Department.company_id == user.company_id,
-            DepartmentTable.is_active == True,
-            Department.deleted_at == None
-        ).count()
-        
-        # Entrées
-        entry_count = db.session.query(func.count(TableRow.id)).join(
-            DepartmentTable
-        ).join(
-            Department
-        ).filter(
-            Department.company_id == user.company_id,
-            TableRow.is_active == True,
-            Department.deleted_at == None
-        ).scalar() or 0
+        # Compteurs matérialisés : une lecture par clé, quel que soit le volume de données
+        counters = get_company_counters(
+            user.company_id,
+            max_age=current_app.config.get('COMPANY_COUNTERS_MAX_AGE', 3600)
+        )
         
         return jsonify({
             'success': True,
             'stats': {
                 'company_name': company.name if company else '',
-                'departments': dept_count,
-                'employees': emp_count,
-                'projects': proj_count,
-                'tickets': ticket_count,
-                'tables': table_count,
-                'entries': entry_count
+                'departments': counters['departments'],
+                'employees': counters['employees'],
+                'projects': counters['projects'],
+                'tickets': counters['tickets'],
+                'tables': counters['tables'],
+                'entries': counters['entries']
             }
         })
     
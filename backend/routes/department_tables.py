@@ -1,11 +1,22 @@
 # routes/department_tables.py
 """Routes pour la gestion des tableaux personnalisés des départements"""
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context
 from database import db
 from models.user import User
 from models.company import Department
-from models.department_table import DepartmentTable, TableColumn, TableRow, TableTemplate
+from models.department_table import (
+    DepartmentTable, TableColumn, TableRow, TableTemplate, TableUniqueValue,
+    is_empty_value, rebuild_unique_index
+)
 from utils.security import SecurityValidator, require_login, AuditLogger
+from utils.table_query import TableRowQuery, RowQueryError
+from utils.table_stats import compute_table_stats
+from utils.table_import import TableImporter, ImportFormatError, detect_format, iter_csv, iter_xlsx
+from utils.table_export import TableExporter, ExportFormatError
+from utils.table_validation import get_row_validator
+from utils.table_batch import TableRowBatch, BatchError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 from datetime import datetime
 import json
 
@@ -88,6 +99,9 @@ def create_table():
         db.session.add(table)
         db.session.flush()
         
+        # Table vide : les valeurs typées seront maintenues dès la première ligne
+        table.get_state().typed_values_ready = True
+        
         # Créer les colonnes
         columns_data = data.get('columns', [])
         for idx, col_data in enumerate(columns_data):
@@ -150,16 +164,21 @@ def list_tables(department_id):
     if not user.is_admin and user.company_id != department.company_id:
         return jsonify({'error': 'Accès non autorisé'}), 403
     
-    tables = DepartmentTable.query.filter_by(
+    # Colonnes chargées en une requête pour toutes les tables (pas de chargement paresseux par table)
+    tables = DepartmentTable.query.options(
+        selectinload(DepartmentTable.columns)
+    ).filter_by(
         department_id=department_id,
         is_active=True
     ).all()
     
     # Filtrer selon les permissions
-    accessible_tables = []
-    for table in tables:
-        if check_table_permission(table, user, 'view'):
-            accessible_tables.append(table.to_dict(include_columns=True))
+    tables = [table for table in tables if check_table_permission(table, user, 'view')]
+    rows_counts = DepartmentTable.count_rows(table.id for table in tables)
+    accessible_tables = [
+        table.to_dict(include_columns=True, rows_count=rows_counts[table.id])
+        for table in tables
+    ]
     
     return jsonify({
         'success': True,
@@ -206,6 +225,7 @@ def update_table(table_id):
             table.icon = data['icon']
         
         table.updated_at = datetime.utcnow()
+        table.mark_schema_changed()
         db.session.commit()
         
         return jsonify({
@@ -268,6 +288,8 @@ def add_row(table_id):
             created_by_id=user.id
         )
         row.set_data(row_data)
+        row.sync_indexes(table.columns)
+        table.mark_rows_changed()
         
         db.session.add(row)
         db.session.commit()
@@ -278,11 +300,113 @@ def add_row(table_id):
             'row': row.to_dict()
         }), 201
         
+    except IntegrityError:
+        # Valeur unique insérée entre-temps par une autre requête
+        db.session.rollback()
+        return jsonify({'error': 'Une valeur unique existe déjà dans cette table'}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Erreur: {str(e)}'}), 500
 
 
+@dept_tables_bp.route('/<int:table_id>/rows', methods=['GET', 'POST'])
+@require_login
+def query_rows(table_id):
+    """
+    Lignes d'une table par pages (pagination par curseur), triées et filtrées côté serveur.
+    Paramètres (query string en GET, corps JSON en POST) :
+    sort, order (asc/desc), limit, cursor, filters ([{column, op, value}]), include_total
+    """
+    user = User.query.get(session['user_id'])
+    table = DepartmentTable.query.get_or_404(table_id)
+    
+    if not check_table_permission(table, user, 'view'):
+        return jsonify({'error': 'Accès non autorisé'}), 403
+    
+    if request.method == 'POST':
+        params = request.get_json() or {}
+        filters = params.get('filters')
+    else:
+        params = request.args
+        try:
+            filters = json.loads(params['filters']) if params.get('filters') else None
+        except ValueError:
+            return jsonify({'error': 'filters doit être une liste JSON'}), 400
+    
+    try:
+        limit = min(max(int(params.get('limit', 100)), 1), 500)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'limit invalide'}), 400
+    
+    try:
+        query = TableRowQuery(table).filter(filters).sort(
+            params.get('sort'),
+            params.get('order', 'asc')
+        )
+        rows, next_cursor = query.page(params.get('cursor'), limit)
+        total = query.count() if str(params.get('include_total', '')).lower() == 'true' else None
+    except RowQueryError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'rows': [row.to_dict() for row in rows],
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None,
+        'total': total
+    }), 200
+
+
+@dept_tables_bp.route('/<int:table_id>/rows/batch', methods=['POST'])
+@require_login
+def batch_rows(table_id):
+    """
+    Ajouts, modifications et suppressions de lignes en une requête et une transaction.
+    Corps : {"operations": [{"op": "insert|update|delete", "id": ..., "data": {...}}], "atomic": true}
+    Résultat par opération ; en mode atomique, une seule erreur annule tout le lot.
+    """
+    user = User.query.get(session['user_id'])
+    table = DepartmentTable.query.get_or_404(table_id)
+    
+    payload = request.get_json() or {}
+    operations = payload.get('operations')
+    
+    # Permissions résolues une fois pour tout le lot
+    ops = {item.get('op') for item in operations if isinstance(item, dict)} if isinstance(operations, list) else set()
+    if ops & {'insert', 'update'} and not check_table_permission(table, user, 'edit'):
+        return jsonify({'error': 'Accès non autorisé'}), 403
+    if 'delete' in ops and not check_table_permission(table, user, 'delete'):
+        return jsonify({'error': 'Accès non autorisé'}), 403
+    
+    batch = TableRowBatch(table, user.id, atomic=payload.get('atomic', True) is not False)
+    try:
+        report = batch.apply(batch.parse(operations))
+        db.session.commit()
+    except BatchError as e:
+        return jsonify({'error': str(e)}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Une valeur unique existe déjà dans cette table'}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erreur: {str(e)}'}), 500
+    
+    if report['succeeded']:
+        AuditLogger.log_action(
+            user.id,
+            'table_rows_batch',
+            'department_table',
+            table.id,
+            {'succeeded': report['succeeded'], 'failed': report['failed']}
+        )
+    
+    return jsonify({
+        'success': report['applied'],
+        'message': f"{report['succeeded']} opération(s) appliquée(s), {report['failed']} en erreur",
+        **report
+    }), 200 if report['applied'] else 400
+
+
 @dept_tables_bp.route('/rows/<int:row_id>', methods=['GET'])
 @require_login
 def get_row(row_id):
@@ -312,12 +436,14 @@ def update_row(row_id):
     data = request.get_json()
     row_data = data.get('data', {})
     
-    validation_errors = validate_row_data(row.table, row_data)
+    validation_errors = validate_row_data(row.table, row_data, row_id=row.id)
     if validation_errors:
         return jsonify({'errors': validation_errors}), 400
     
     try:
         row.set_data(row_data)
+        row.sync_indexes(row.table.columns)
+        row.table.mark_rows_changed()
         row.updated_at = datetime.utcnow()
         row.updated_by_id = user.id
         
@@ -328,6 +454,9 @@ def update_row(row_id):
             'row': row.to_dict()
         }), 200
         
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Une valeur unique existe déjà dans cette table'}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Erreur: {str(e)}'}), 500
@@ -344,6 +473,7 @@ def delete_row(row_id):
         return jsonify({'error': 'Accès non autorisé'}), 403
     
     try:
+        row.table.mark_rows_changed()
         db.session.delete(row)
         db.session.commit()
         
@@ -373,19 +503,32 @@ def add_column(table_id):
     
     try:
         column = TableColumn(
-            table_id=table_id,
             name=SecurityValidator.sanitize_input(data['name']),
             display_name=SecurityValidator.sanitize_input(data['display_name']),
             data_type=data['data_type'],
             is_required=data.get('is_required', False),
             is_unique=data.get('is_unique', False),
-            order=data.get('order', len(table.columns))
+            order=data['order'] if 'order' in data else len(table.columns)
         )
         
         if 'type_config' in data:
             column.set_config(data['type_config'])
         
-        db.session.add(column)
+        # Rattacher par la relation : table.columns (déjà chargée) inclut la nouvelle colonne
+        table.columns.append(column)
+        table.mark_schema_changed()
+        db.session.flush()
+        
+        # Indexer les valeurs existantes ; refuser la colonne si elles ont des doublons
+        if column.is_unique:
+            duplicates = rebuild_unique_index(table)
+            if any(duplicate['column'] == column.name for duplicate in duplicates):
+                db.session.rollback()
+                return jsonify({
+                    'error': 'Des valeurs en double existent déjà pour cette colonne',
+                    'duplicates': duplicates[:50]
+                }), 400
+        
         db.session.commit()
         
         return jsonify({
@@ -451,6 +594,7 @@ def create_from_template():
         
         db.session.add(table)
         db.session.flush()
+        table.get_state().typed_values_ready = True
         
         # Créer les colonnes depuis le template
         for col_config in config.get('columns', []):
@@ -472,6 +616,97 @@ def create_from_template():
         return jsonify({'error': f'Erreur: {str(e)}'}), 500
 
 
+# ============= IMPORT / EXPORT =============
+
+@dept_tables_bp.route('/<int:table_id>/import', methods=['POST'])
+@require_login
+def import_rows(table_id):
+    """
+    Import en masse d'un fichier CSV ou XLSX (champ multipart "file").
+    La première ligne contient les noms de colonnes ; ?dry_run=true valide sans insérer.
+    """
+    user = User.query.get(session['user_id'])
+    table = DepartmentTable.query.get_or_404(table_id)
+    
+    if not check_table_permission(table, user, 'edit'):
+        return jsonify({'error': 'Accès non autorisé'}), 403
+    
+    if not table.allow_import:
+        return jsonify({'error': 'L\'import est désactivé pour cette table'}), 403
+    
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'error': 'Fichier requis'}), 400
+    
+    dry_run = request.values.get('dry_run', 'false').lower() == 'true'
+    
+    try:
+        fmt = detect_format(upload.filename, request.values.get('format'))
+        records = iter_csv(upload.stream) if fmt == 'csv' else iter_xlsx(upload.stream)
+        report = TableImporter(table, user.id, dry_run=dry_run).run(records)
+    except ImportFormatError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erreur: {str(e)}'}), 500
+    
+    if not dry_run and report['imported']:
+        AuditLogger.log_action(
+            user.id,
+            'table_rows_imported',
+            'department_table',
+            table.id,
+            {'imported': report['imported'], 'failed': report['failed'], 'filename': upload.filename}
+        )
+    
+    return jsonify({
+        'success': True,
+        'message': f"{report['imported']} ligne(s) importée(s), {report['failed']} en erreur",
+        'report': report
+    }), 200
+
+
+@dept_tables_bp.route('/<int:table_id>/export', methods=['GET'])
+@require_login
+def export_rows(table_id):
+    """
+    Export en flux des lignes actives (?format=csv|ndjson|xlsx, ?delimiter= pour le CSV).
+    Colonnes visibles uniquement, dans l'ordre de la table.
+    """
+    user = User.query.get(session['user_id'])
+    table = DepartmentTable.query.get_or_404(table_id)
+    
+    if not check_table_permission(table, user, 'view'):
+        return jsonify({'error': 'Accès non autorisé'}), 403
+    
+    if not table.allow_export:
+        return jsonify({'error': 'L\'export est désactivé pour cette table'}), 403
+    
+    delimiter = request.args.get('delimiter', ',')
+    if delimiter == 'tab':
+        delimiter = '\t'
+    
+    try:
+        exporter = TableExporter(table, request.args.get('format', 'csv').lower(), delimiter)
+    except ExportFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    AuditLogger.log_action(
+        user.id,
+        'table_rows_exported',
+        'department_table',
+        table.id,
+        {'format': exporter.format}
+    )
+    
+    return Response(
+        stream_with_context(exporter.generate()),
+        mimetype=exporter.mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{exporter.filename}"'}
+    )
+
+
 # ============= STATISTIQUES =============
 
 @dept_tables_bp.route('/<int:table_id>/stats', methods=['GET'])
@@ -484,80 +719,30 @@ def get_table_stats(table_id):
     if not check_table_permission(table, user, 'view'):
         return jsonify({'error': 'Accès non autorisé'}), 403
     
-    total_rows = table.rows.count()
-    active_rows = TableRow.query.filter_by(table_id=table_id, is_active=True).count()
-    
-    # Statistiques par colonne numérique
-    column_stats = {}
-    for column in table.columns:
-        if column.data_type in ['number', 'decimal']:
-            values = []
-            for row in table.rows:
-                val = row.get_value(column.name)
-                if val is not None:
-                    try:
-                        values.append(float(val))
-                    except:
-                        pass
-            
-            if values:
-                column_stats[column.name] = {
-                    'count': len(values),
-                    'sum': sum(values),
-                    'avg': sum(values) / len(values),
-                    'min': min(values),
-                    'max': max(values)
-                }
+    try:
+        histogram_bins = min(max(int(request.args.get('histogram_bins', 10)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'histogram_bins invalide'}), 400
     
     return jsonify({
         'success': True,
-        'stats': {
-            'total_rows': total_rows,
-            'active_rows': active_rows,
-            'columns_count': len(table.columns),
-            'column_stats': column_stats
-        }
+        'stats': compute_table_stats(table, histogram_bins)
     }), 200
 
 
 # ============= FONCTIONS UTILITAIRES =============
 
-def validate_row_data(table, row_data):
-    """Valide les données d'une ligne selon les colonnes"""
-    errors = {}
+def validate_row_data(table, row_data, row_id=None):
+    """Valide les données d'une ligne selon les colonnes (row_id : ligne modifiée, exclue de l'unicité)"""
+    validator = get_row_validator(table)
+    errors = validator.validate(row_data)
     
-    for column in table.columns:
+    # Unicité (index des valeurs uniques)
+    for column in validator.unique_columns:
         value = row_data.get(column.name)
-        
-        # Champ requis
-        if column.is_required and (value is None or value == ''):
-            errors[column.name] = f"{column.display_name} est requis"
+        if column.name in errors or is_empty_value(value):
             continue
-        
-        # Validation du type
-        if value is not None and value != '':
-            if column.data_type == 'number':
-                try:
-                    float(value)
-                except ValueError:
-                    errors[column.name] = f"{column.display_name} doit être un nombre"
-            
-            elif column.data_type == 'email':
-                valid, msg = SecurityValidator.validate_email(str(value))
-                if not valid:
-                    errors[column.name] = msg
-            
-            elif column.data_type == 'phone':
-                valid, msg = SecurityValidator.validate_phone(str(value))
-                if not valid:
-                    errors[column.name] = msg
-        
-        # Unicité
-        if column.is_unique and value:
-            existing = TableRow.query.filter_by(table_id=table.id).all()
-            for row in existing:
-                if row.get_value(column.name) == value:
-                    errors[column.name] = f"Cette valeur existe déjà pour {column.display_name}"
-                    break
+        if TableUniqueValue.is_taken(table.id, column, value, exclude_row_id=row_id):
+            errors[column.name] = f"Cette valeur existe déjà pour {column.display_name}"
     
     return errors
\ No newline at end of file
@@ -15,6 +15,11 @@ def get_blockchain():
     return current_app.extensions.get('blockchain')
 
 
+def get_mining_service():
+    """Récupère le service de minage en arrière-plan"""
+    return current_app.extensions.get('blockchain_miner')
+
+
 def add_to_blockchain(request_obj, action_type, user_id):
     """Ajoute une transaction à la blockchain"""
     blockchain = get_blockchain()
@@ -53,19 +58,24 @@ def add_to_blockchain(request_obj, action_type, user_id):
             'amount': float(request_obj.amount) if request_obj.amount else None
         })
     
-    blockchain.add_transaction(transaction)
+    miner = get_mining_service()
     
-    # Miner immédiatement pour les actions importantes
-    if action_type in ['approved', 'rejected']:
-        blockchain.mine_pending_transactions(f"system_payroll")
+    # Miner en arrière-plan pour les actions importantes
+    if action_type in ['approved', 'rejected'] and miner:
+        request_id = request_obj.id
         
-        # Mettre à jour l'enregistrement avec le hash blockchain
-        latest_block = blockchain.get_latest_block()
-        if latest_block:
-            request_obj.blockchain_hash = latest_block['hash']
-            request_obj.blockchain_block_index = latest_block['index']
-            request_obj.is_in_blockchain = True
-            db.session.commit()
+        def mark_request_mined(block):
+            # Bloc qui contient réellement la transaction, pas le dernier de la chaîne
+            mined_request = EmployeeRequest.query.get(request_id)
+            if mined_request:
+                mined_request.blockchain_hash = block['hash']
+                mined_request.blockchain_block_index = block['index']
+                mined_request.is_in_blockchain = True
+                db.session.commit()
+        
+        miner.submit_transaction('system_payroll', transaction, on_mined=mark_request_mined)
+    else:
+        blockchain.add_transaction(transaction)
     
     return True
 
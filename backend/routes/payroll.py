@@ -72,14 +72,12 @@ def get_config():
             db.session.commit()
             
             # Logger dans blockchain
-            blockchain = current_app.extensions.get('blockchain')
-            if blockchain:
-                blockchain.add_transaction({
-                    'type': 'payroll_config_created',
-                    'company_id': user.company_id,
-                    'config_id': config.id,
-                    'timestamp': datetime.utcnow().isoformat()
-                })
+            AuditLogger.log_transaction({
+                'type': 'payroll_config_created',
+                'company_id': user.company_id,
+                'config_id': config.id,
+                'timestamp': datetime.utcnow().isoformat()
+            })
         
         return jsonify({'success': True, 'config': config.to_dict()}), 200
         
@@ -144,15 +142,13 @@ def update_config():
         db.session.commit()
         
         # Logger dans blockchain
-        blockchain = current_app.extensions.get('blockchain')
-        if blockchain:
-            blockchain.add_transaction({
-                'type': 'payroll_config_updated',
-                'company_id': user.company_id,
-                'config_id': config.id,
-                'updated_by': user.id,
-                'timestamp': datetime.utcnow().isoformat()
-            })
+        AuditLogger.log_transaction({
+            'type': 'payroll_config_updated',
+            'company_id': user.company_id,
+            'config_id': config.id,
+            'updated_by': user.id,
+            'timestamp': datetime.utcnow().isoformat()
+        })
         
         AuditLogger.log_action(
             session['user_id'],
@@ -261,16 +257,14 @@ def update_employee_salary(user_id):
         db.session.commit()
         
         # Logger dans blockchain
-        blockchain = current_app.extensions.get('blockchain')
-        if blockchain:
-            blockchain.add_transaction({
-                'type': 'salary_updated',
-                'user_id': user_id,
-                'salary_id': salary.id,
-                'base_salary': float(salary.base_salary),
-                'updated_by': session['user_id'],
-                'timestamp': datetime.utcnow().isoformat()
-            })
+        AuditLogger.log_transaction({
+            'type': 'salary_updated',
+            'user_id': user_id,
+            'salary_id': salary.id,
+            'base_salary': float(salary.base_salary),
+            'updated_by': session['user_id'],
+            'timestamp': datetime.utcnow().isoformat()
+        })
         
         AuditLogger.log_action(
             session['user_id'],
@@ -581,18 +575,16 @@ def generate_payslip(user_id):
         db.session.commit()
         
         # Logger dans blockchain
-        blockchain = current_app.extensions.get('blockchain')
-        if blockchain:
-            blockchain.add_transaction({
-                'type': 'payslip_generated',
-                'payslip_id': payslip.id,
-                'user_id': user_id,
-                'month': month,
-                'year': year,
-                'net_salary': float(net_salary),
-                'generated_by': session['user_id'],
-                'timestamp': datetime.utcnow().isoformat()
-            })
+        AuditLogger.log_transaction({
+            'type': 'payslip_generated',
+            'payslip_id': payslip.id,
+            'user_id': user_id,
+            'month': month,
+            'year': year,
+            'net_salary': float(net_salary),
+            'generated_by': session['user_id'],
+            'timestamp': datetime.utcnow().isoformat()
+        })
         
         return jsonify({
             'success': True,
@@ -701,14 +693,12 @@ def validate_payslip(payslip_id):
         db.session.commit()
         
         # Logger dans blockchain
-        blockchain = current_app.extensions.get('blockchain')
-        if blockchain:
-            blockchain.add_transaction({
-                'type': 'payslip_validated',
-                'payslip_id': payslip.id,
-                'validated_by': session['user_id'],
-                'timestamp': datetime.utcnow().isoformat()
-            })
+        AuditLogger.log_transaction({
+            'type': 'payslip_validated',
+            'payslip_id': payslip.id,
+            'validated_by': session['user_id'],
+            'timestamp': datetime.utcnow().isoformat()
+        })
         
         return jsonify({
             'success': True,
@@ -18,6 +18,11 @@ def get_blockchain():
     return current_app.extensions.get('blockchain')
 
 
+def get_mining_service():
+    """Récupère le service de minage en arrière-plan"""
+    return current_app.extensions.get('blockchain_miner')
+
+
 def add_to_blockchain(ticket, action_type, user_id):
     """Ajoute une transaction à la blockchain"""
     blockchain = get_blockchain()
@@ -41,15 +46,19 @@ def add_to_blockchain(ticket, action_type, user_id):
     
     blockchain.add_transaction(transaction)
     
-    # Miner pour les actions importantes
-    if action_type in ['created', 'resolved', 'escalated']:
-        blockchain.mine_pending_transactions('system_tickets')
+    # Miner pour les actions importantes (en arrière-plan, le hash est enregistré à la fin du minage)
+    miner = get_mining_service()
+    if miner and action_type in ['created', 'resolved', 'escalated']:
+        ticket_id = ticket.id
+        
+        def mark_ticket_mined(block):
+            mined_ticket = Ticket.query.get(ticket_id)
+            if mined_ticket:
+                mined_ticket.blockchain_hash = block['hash']
+                mined_ticket.is_in_blockchain = True
+                db.session.commit()
         
-        latest_block = blockchain.get_latest_block()
-        if latest_block:
-            ticket.blockchain_hash = latest_block['hash']
-            ticket.is_in_blockchain = True
-            db.session.commit()
+        miner.submit('system_tickets', on_mined=mark_ticket_mined)
     
     return True
 
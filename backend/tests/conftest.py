@@ -0,0 +1,87 @@
+# tests/conftest.py
+"""Fixtures communes : application de test (SQLite), entreprise, département et client admin"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from database import db
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    # Journal blockchain de test (chemin relatif) créé dans un dossier temporaire
+    os.chdir(tmp_path_factory.mktemp('flowerp'))
+    app, _ = create_app('testing')
+    return app
+
+
+@pytest.fixture
+def db_session(app):
+    from utils import company_stats
+    from utils.table_stats import stats_cache
+    from utils.table_validation import validator_cache
+    from utils.widget_engine import widget_engine
+
+    # Les ids repartent de 1 à chaque test : vider les caches du processus, indexés par id
+    for cache in (stats_cache, validator_cache, widget_engine.cache, company_stats.stats_cache):
+        cache.invalidate()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield db.session
+        db.session.remove()
+
+
+@pytest.fixture
+def company(db_session):
+    from models.company import Company
+    company = Company(name='Acme')
+    db_session.add(company)
+    db_session.commit()
+    return company
+
+
+@pytest.fixture
+def admin(db_session, company):
+    from models.user import User
+    admin = User(username='admin', email='admin@acme.tn', password_hash='x', is_admin=True, company_id=company.id)
+    db_session.add(admin)
+    db_session.commit()
+    return admin
+
+
+@pytest.fixture
+def department(db_session, company, admin):
+    from models.company import Department
+    department = Department(name='IT', company_id=company.id, manager_id=admin.id)
+    db_session.add(department)
+    db_session.commit()
+    return department
+
+
+@pytest.fixture
+def client(app, admin, company):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = admin.id
+        session['company_id'] = company.id
+    return client
+
+
+@pytest.fixture
+def make_table(client, department):
+    """Crée une table du département par l'API et retourne son id"""
+    def make(columns, name='inventaire', display_name='Inventaire'):
+        response = client.post('/api/department-tables/create', json={
+            'department_id': department.id,
+            'name': name,
+            'display_name': display_name,
+            'columns': columns
+        })
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()['table']['id']
+    return make
@@ -0,0 +1,162 @@
+# tests/test_blockchain.py
+"""Blockchain : hachage incrémental, historique indexé par entité, validation incrémentale"""
+from models.blockchain import Blockchain, BlockHasher
+from models.blockchain_store import BlockchainStore
+
+
+def candidate_block():
+    return {
+        'index': 1,
+        'timestamp': '2026-01-15T10:30:00.123456',
+        'transactions': [{'type': 'ticket', 'entity_id': 4, 'title': 'Écran cassé', 'details': {'n': [1, 2]}}],
+        'previous_hash': '0' * 64,
+        'nonce': 0,
+        'miner': 'test'
+    }
+
+
+def test_hasher_matches_full_serialization():
+    block = candidate_block()
+    hasher = BlockHasher(block)
+    for nonce in (0, 7, 123456789):
+        assert hasher.hash(nonce) == Blockchain.compute_block_hash(dict(block, nonce=nonce))
+
+
+def test_scan_returns_first_nonce_meeting_difficulty():
+    block = candidate_block()
+    difficulty = 3
+
+    nonce, block_hash = BlockHasher(block).scan(0, 200000, difficulty)
+
+    assert block_hash == Blockchain.compute_block_hash(dict(block, nonce=nonce))
+    assert block_hash.startswith('0' * difficulty)
+    assert not any(
+        Blockchain.compute_block_hash(dict(block, nonce=n)).startswith('0' * difficulty)
+        for n in range(nonce)
+    )
+
+
+def test_mined_block_passes_validation():
+    blockchain = Blockchain(difficulty=2)
+    blockchain.add_transaction({'type': 'test'})
+    assert blockchain.mine_pending_transactions('test')
+
+    block = blockchain.get_latest_block()
+    assert block['hash'] == Blockchain.compute_block_hash(block)
+    assert blockchain.is_chain_valid()
+
+
+def mine_at(blockchain, timestamp, transactions):
+    """Mine un bloc horodaté à la date donnée"""
+    blockchain.add_transactions(transactions)
+    block = blockchain.prepare_block('test')
+    block['timestamp'] = timestamp
+    block['hash'] = blockchain.proof_of_work(block)
+    assert blockchain.append_mined_block(block)
+
+
+def history_chain():
+    blockchain = Blockchain(difficulty=1)
+    for day in range(1, 6):
+        mine_at(blockchain, f'2026-03-0{day}T12:00:00', [
+            {'type': 'ticket', 'entity_type': 'ticket', 'entity_id': 1, 'day': day},
+            {'type': 'ticket', 'entity_type': 'ticket', 'entity_id': 2, 'day': day}
+        ])
+    return blockchain
+
+
+def test_history_filters_entity_and_period():
+    blockchain = history_chain()
+
+    history, total = blockchain.query_transaction_history(
+        'ticket', 1, since='2026-03-02T00:00:00', until='2026-03-04T12:00:00'
+    )
+
+    assert total == 3
+    assert [entry['transaction']['day'] for entry in history] == [2, 3, 4]
+    assert {entry['transaction']['entity_id'] for entry in history} == {1}
+
+
+def test_history_paginates_in_chain_order():
+    blockchain = history_chain()
+
+    history, total = blockchain.query_transaction_history('ticket', None, offset=3, limit=4)
+
+    assert total == 10
+    assert [(entry['transaction']['day'], entry['transaction']['entity_id']) for entry in history] == [
+        (2, 2), (3, 1), (3, 2), (4, 1)
+    ]
+    scanned = [
+        (block['index'], tx_offset)
+        for block in blockchain.chain[1:]
+        for tx_offset in range(len(block['transactions']))
+    ][3:7]
+    assert [(entry['block_index'], entry['transaction']) for entry in history] == [
+        (index, blockchain.chain[index]['transactions'][tx_offset]) for index, tx_offset in scanned
+    ]
+
+
+def test_history_index_follows_new_blocks():
+    blockchain = history_chain()
+    assert blockchain.query_transaction_history('ticket', 1)[1] == 5
+
+    mine_at(blockchain, '2026-03-06T12:00:00', [{'type': 'ticket', 'entity_type': 'ticket', 'entity_id': 1, 'day': 6}])
+
+    history, total = blockchain.query_transaction_history('ticket', 1, since='2026-03-06')
+    assert total == 1
+    assert history[0]['transaction']['day'] == 6
+
+
+def mine(blockchain, count):
+    for n in range(count):
+        blockchain.add_transaction({'type': 'test', 'n': n})
+        assert blockchain.mine_pending_transactions('test')
+
+
+def test_checkpoint_follows_mined_blocks_and_survives_restart(tmp_path):
+    blockchain = Blockchain(difficulty=1, store=BlockchainStore(str(tmp_path)))
+    mine(blockchain, 3)
+
+    assert blockchain.verified_height == len(blockchain.chain) == 4
+    assert blockchain.validate_incremental()
+
+    reopened = Blockchain(difficulty=1, store=BlockchainStore(str(tmp_path)))
+    assert reopened.verified_height == 4
+    assert reopened.verified_hash == blockchain.get_latest_block()['hash']
+    assert reopened.validate_incremental()
+
+
+def test_incremental_validation_only_checks_new_blocks():
+    blockchain = Blockchain(difficulty=1)
+    mine(blockchain, 3)
+    assert blockchain.validate_incremental()
+
+    # Bloc déjà vérifié altéré : seul l'audit complet le voit
+    blockchain.chain[1]['transactions'][0]['n'] = 99
+    assert blockchain.validate_incremental()
+    assert not blockchain.is_chain_valid()
+
+
+def test_incremental_validation_rejects_invalid_new_block():
+    blockchain = Blockchain(difficulty=1)
+    mine(blockchain, 2)
+    assert blockchain.validate_incremental()
+
+    forged = dict(blockchain.get_latest_block(), index=3, previous_hash=blockchain.get_latest_block()['hash'])
+    forged['hash'] = 'f' * 64
+    blockchain.chain.append(forged)
+
+    assert not blockchain.validate_incremental()
+    assert blockchain.verified_height == 3
+    assert blockchain.get_blockchain_stats()['verified_height'] == 3
+
+
+def test_replaced_checkpoint_block_triggers_full_revalidation():
+    blockchain = Blockchain(difficulty=1)
+    mine(blockchain, 2)
+    assert blockchain.validate_incremental()
+
+    blockchain.chain[-1] = dict(blockchain.chain[-1], hash='0' + 'a' * 63)
+
+    assert not blockchain.validate_incremental()
+    assert blockchain.verified_height == 0
@@ -0,0 +1,38 @@
+# tests/test_blockchain_api.py
+"""API de consultation de la chaîne : chaîne complète par défaut, pages sur demande, historique par période"""
+
+
+def mine_blocks(app, count):
+    blockchain = app.extensions['blockchain']
+    for n in range(count):
+        blockchain.add_transaction({'type': 'test', 'n': n})
+        blockchain.mine_pending_transactions('test')
+    return blockchain
+
+
+def test_chain_defaults_to_full_chain(app, client):
+    blockchain = mine_blocks(app, 2)
+    data = client.get('/api/blockchain/chain').get_json()
+    assert data['length'] == len(blockchain.chain)
+    assert [block['hash'] for block in data['chain']] == [block['hash'] for block in blockchain.chain]
+
+
+def test_chain_pages_on_request(app, client):
+    blockchain = mine_blocks(app, 2)
+    data = client.get('/api/blockchain/chain?limit=1').get_json()
+    assert len(data['chain']) == 1
+    assert data['next_cursor'] == 1 and data['has_more'] == (len(blockchain.chain) > 1)
+
+
+def test_history_until_date_includes_whole_day(app, client):
+    blockchain = app.extensions['blockchain']
+    blockchain.add_transaction({'type': 'test', 'entity_type': 'history_day', 'entity_id': 1})
+    blockchain.mine_pending_transactions('test')
+    day = blockchain.get_latest_block()['timestamp'][:10]
+
+    data = client.get(f'/api/blockchain/history/history_day/1?since={day}&until={day}').get_json()
+    assert data['pagination']['total'] == 1
+    assert data['history'][0]['transaction']['entity_id'] == 1
+
+    data = client.get(f'/api/blockchain/history/history_day/1?until={day}T00:00:00').get_json()
+    assert data['pagination']['total'] == 0
@@ -0,0 +1,37 @@
+# tests/test_blockchain_store.py
+"""Ledger partagé entre workers : journal des transactions en attente et réécriture de la chaîne"""
+from models.blockchain import Blockchain
+from models.blockchain_store import BlockchainStore
+
+
+def open_chain(data_dir, difficulty=1):
+    return Blockchain(difficulty=difficulty, store=BlockchainStore(str(data_dir)))
+
+
+def test_mining_keeps_other_workers_pending_transactions(tmp_path):
+    first, second = open_chain(tmp_path), open_chain(tmp_path)
+    first.add_transaction({'type': 'a'})
+    second.add_transaction({'type': 'b'})
+
+    first.mine_pending_transactions('miner')
+
+    assert [tx['type'] for tx in first.store.load_pending()] == ['b']
+    second.refresh()
+    assert [tx['type'] for tx in second.pending_transactions] == ['b']
+
+
+def test_refresh_reloads_chain_rewritten_by_another_worker(tmp_path):
+    first, second = open_chain(tmp_path), open_chain(tmp_path)
+    longer = Blockchain(difficulty=1)
+    for n in range(3):
+        longer.add_transaction({'type': 'z', 'n': n})
+        longer.mine_pending_transactions('miner')
+
+    assert first.replace_chain(list(longer.chain))
+    second.refresh()
+
+    assert len(second.chain) == len(longer.chain)
+    assert second.chain[-1]['hash'] == longer.chain[-1]['hash']
+    assert second.is_chain_valid()
+    second.add_transaction({'type': 'b'})
+    assert second.mine_pending_transactions('miner')
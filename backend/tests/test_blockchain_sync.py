@@ -0,0 +1,139 @@
+# tests/test_blockchain_sync.py
+"""Synchronisation entre pairs : signature HMAC des blocs reçus, santé et backoff des nœuds"""
+import json
+import time
+
+import pytest
+import requests
+from flask import Flask
+
+from models.blockchain import Blockchain
+from utils.blockchain_sync import SIGNATURE_HEADER, BlockchainSyncManager, register_sync_routes, sign_payload
+
+SECRET = 'secret-partage'
+
+
+@pytest.fixture
+def node():
+    app = Flask(__name__)
+    app.config['BLOCKCHAIN_PEER_SECRET'] = SECRET
+    blockchain = Blockchain(difficulty=1)
+    register_sync_routes(app, BlockchainSyncManager(blockchain))
+    return app.test_client(), blockchain
+
+
+def next_block(blockchain):
+    """Bloc valide qui prolonge la chaîne, miné sur une copie"""
+    peer = Blockchain(difficulty=1)
+    peer.chain = list(blockchain.chain)
+    peer.add_transaction({'type': 'test'})
+    peer.mine_pending_transactions('pair')
+    return peer.chain[-1]
+
+
+def post_block(client, block, secret=None):
+    body = json.dumps({'block': block}, sort_keys=True).encode()
+    headers = {SIGNATURE_HEADER: sign_payload(secret, body)} if secret else {}
+    return client.post('/api/blockchain/new-block', data=body, content_type='application/json', headers=headers)
+
+
+def test_signed_block_is_appended(node):
+    client, blockchain = node
+    response = post_block(client, next_block(blockchain), SECRET)
+    assert response.status_code == 200
+    assert len(blockchain.chain) == 2
+
+
+@pytest.mark.parametrize('secret', [None, 'autre-secret'])
+def test_unsigned_or_forged_block_is_rejected(node, secret):
+    client, blockchain = node
+    response = post_block(client, next_block(blockchain), secret)
+    assert response.status_code == 403
+    assert len(blockchain.chain) == 1
+
+
+class StubSession:
+    """Session HTTP sans réseau : handler(url, params) retourne (statut, corps) ou lève une erreur"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.urls = []
+
+    def request(self, method, url, **kwargs):
+        self.urls.append(url)
+        status_code, content = self.handler(url, kwargs.get('params') or {})
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = content
+        return response
+
+
+def unreachable(url, params):
+    raise requests.exceptions.ConnectionError('connexion refusée')
+
+
+def test_invalid_delta_response_puts_node_in_backoff():
+    blockchain = Blockchain(difficulty=1)
+    manager = BlockchainSyncManager(blockchain)
+    manager.register_node('http://pair:5001')
+    manager.session = StubSession(lambda url, params: (200, b'{"blocks": ['))
+
+    assert manager.fetch_missing_blocks('http://pair:5001') == 0
+
+    health = manager.node_health['http://pair:5001']
+    assert health['failures'] == 1
+    assert health['last_error'].startswith('Réponse invalide')
+    assert manager.available_nodes() == []
+    assert len(blockchain.chain) == 1
+
+
+def test_failures_back_off_exponentially_until_success():
+    manager = BlockchainSyncManager(Blockchain(difficulty=1))
+    manager.register_node('http://pair:5001')
+    manager.session = StubSession(unreachable)
+
+    delays = []
+    for _ in range(8):
+        before = time.time()
+        assert manager.get_height_from_node('http://pair:5001') is None
+        delays.append(round(manager.node_health['http://pair:5001']['next_retry_at'] - before))
+
+    base, cap = BlockchainSyncManager.BACKOFF_BASE, BlockchainSyncManager.BACKOFF_MAX
+    assert delays == [min(base * 2 ** n, cap) for n in range(8)]
+    assert manager.available_nodes() == []
+
+    manager.session = StubSession(lambda url, params: (200, b'{"height": 1}'))
+    assert manager.get_height_from_node('http://pair:5001') == {'height': 1}
+    assert manager.node_health['http://pair:5001']['failures'] == 0
+    assert manager.available_nodes() == ['http://pair:5001']
+
+
+def test_sync_pulls_missing_blocks_and_skips_nodes_in_backoff():
+    blockchain = Blockchain(difficulty=1)
+    peer = Blockchain(difficulty=1)
+    peer.chain = list(blockchain.chain)
+    for n in range(3):
+        peer.add_transaction({'type': 'test', 'n': n})
+        peer.mine_pending_transactions('pair')
+
+    def serve(url, params):
+        if url.startswith('http://hors-ligne'):
+            unreachable(url, params)
+        if url.endswith('/headers'):
+            return 200, json.dumps({'height': len(peer.chain)}).encode()
+        blocks = peer.chain[params['height']:params['height'] + params['limit']]
+        return 200, json.dumps({'blocks': blocks, 'has_more': False}).encode()
+
+    manager = BlockchainSyncManager(blockchain)
+    manager.register_node('http://hors-ligne:5001')
+    manager.register_node('http://pair:5001')
+    manager.session = StubSession(serve)
+
+    assert manager.sync_with_nodes()
+    assert [block['hash'] for block in blockchain.chain] == [block['hash'] for block in peer.chain]
+    assert manager.node_health['http://hors-ligne:5001']['failures'] == 1
+
+    # Second tour : le nœud en backoff n'est plus contacté
+    manager.session.urls.clear()
+    assert not manager.sync_with_nodes()
+    assert manager.session.urls == ['http://pair:5001/api/blockchain/headers']
@@ -0,0 +1,89 @@
+# tests/test_company_counters.py
+"""Compteurs d'entreprise : deltas appliqués au flush, recomptage quand ils sont périmés"""
+from datetime import datetime, timedelta
+
+from models.company import Department
+from models.company_counter import CompanyCounter
+from models.ticket import Ticket
+from models.user import User
+from utils.company_counters import count_company, get_company_counters
+
+LABEL_COLUMN = [{'name': 'label', 'display_name': 'Libellé', 'data_type': 'text'}]
+
+
+def stored_counters(db_session, company):
+    """Valeurs enregistrées, sans recomptage"""
+    db_session.expire_all()
+    return db_session.get(CompanyCounter, company.id).to_dict()
+
+
+def add_ticket(db_session, user, department, number, status='en_cours'):
+    ticket = Ticket(
+        ticket_number=number, created_by_id=user.id, department_id=department.id, title='Ticket',
+        description='Description', category='autre', status=status, created_at=datetime.utcnow()
+    )
+    db_session.add(ticket)
+    db_session.commit()
+    return ticket
+
+
+def test_deltas_follow_inserts_and_status_changes(client, make_table, company, admin, department, db_session):
+    get_company_counters(company.id)
+    employee = User(username='emp', email='emp@acme.tn', password_hash='x', company_id=company.id)
+    db_session.add(employee)
+    db_session.commit()
+    open_ticket = add_ticket(db_session, admin, department, 'T1')
+    add_ticket(db_session, admin, department, 'T2', status='ferme')
+    table_id = make_table(LABEL_COLUMN)
+    for label in ('a', 'b'):
+        response = client.post(f'/api/department-tables/{table_id}/rows/add', json={'data': {'label': label}})
+        assert response.status_code == 201, response.get_json()
+
+    assert stored_counters(db_session, company) == {
+        'departments': 1, 'employees': 2, 'projects': 0, 'tickets': 1, 'tables': 1, 'entries': 2
+    }
+
+    open_ticket = db_session.get(Ticket, open_ticket.id)
+    open_ticket.status = 'ferme'
+    db_session.get(User, employee.id).is_active = False
+    db_session.commit()
+
+    counters = stored_counters(db_session, company)
+    assert (counters['tickets'], counters['employees']) == (0, 1)
+    assert counters == count_company(company.id)
+
+
+def test_structural_change_marks_counters_stale(client, make_table, company, department, db_session):
+    make_table(LABEL_COLUMN)
+    assert get_company_counters(company.id)['tables'] == 1
+
+    # Département supprimé : ses tables et entrées sortent aussi des totaux -> recomptage
+    db_session.get(Department, department.id).deleted_at = datetime.utcnow()
+    db_session.commit()
+    db_session.expire_all()
+    assert db_session.get(CompanyCounter, company.id).is_stale
+
+    counters = get_company_counters(company.id)
+    assert (counters['departments'], counters['tables']) == (0, 0)
+    db_session.expire_all()
+    assert not db_session.get(CompanyCounter, company.id).is_stale
+
+
+def test_old_counters_are_recounted(company, department, db_session):
+    get_company_counters(company.id)
+    counter = db_session.get(CompanyCounter, company.id)
+    counter.departments = 42
+    counter.refreshed_at = datetime.utcnow() - timedelta(hours=2)
+    db_session.commit()
+
+    assert get_company_counters(company.id, max_age=None)['departments'] == 42
+    assert get_company_counters(company.id, max_age=3600)['departments'] == 1
+
+
+def test_global_stats_reads_counters(client, company, department, db_session):
+    stats = client.get('/api/dashboard/global-stats').get_json()['stats']
+    assert (stats['company_name'], stats['departments'], stats['employees']) == ('Acme', 1, 1)
+
+    db_session.add(Department(name='Finance', company_id=company.id))
+    db_session.commit()
+    assert client.get('/api/dashboard/global-stats').get_json()['stats']['departments'] == 2
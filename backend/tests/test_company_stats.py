@@ -0,0 +1,57 @@
+# tests/test_company_stats.py
+"""Statistiques d'entreprise : agrégats groupés par département et par jour, cache à durée de vie courte"""
+from datetime import datetime, timedelta
+
+from models.department_table import TableRow
+from models.user import User
+from utils.company_stats import compute_company_stats, get_company_stats
+
+LABEL_COLUMN = [{'name': 'label', 'display_name': 'Libellé', 'data_type': 'text'}]
+
+
+def add_rows(client, table_id, count):
+    for n in range(count):
+        response = client.post(f'/api/department-tables/{table_id}/rows/add', json={'data': {'label': f'ligne {n}'}})
+        assert response.status_code == 201, response.get_json()
+
+
+def test_stats_aggregate_departments_roles_and_activity(client, make_table, company, admin, department, db_session):
+    technician = User(username='tech', email='tech@acme.tn', password_hash='x', role='technician',
+                      company_id=company.id, department_id=department.id)
+    db_session.add(technician)
+    db_session.commit()
+    add_rows(client, make_table(LABEL_COLUMN, name='stock', display_name='Stock'), 2)
+    add_rows(client, make_table(LABEL_COLUMN, name='achats', display_name='Achats'), 1)
+
+    # Entrées d'avant-hier : deux saisies, par deux utilisateurs
+    two_days_ago = datetime.utcnow() - timedelta(days=2)
+    rows = TableRow.query.order_by(TableRow.id).all()
+    for row, author in zip(rows[:2], (admin, technician)):
+        row.created_at = two_days_ago
+        row.created_by_id = author.id
+    db_session.commit()
+
+    stats = compute_company_stats(company)
+
+    assert (stats['departments_count'], stats['users_count'], stats['tables_count'], stats['total_entries']) == (1, 2, 2, 3)
+    assert stats['departments'][0]['employees_count'] == 1
+    assert stats['departments'][0]['entries_count'] == 3
+    assert stats['role_distribution']['technician'] == 1
+    assert stats['role_distribution']['employee'] == 1
+    activity = {day['date']: (day['entries'], day['active_users']) for day in stats['daily_activity']}
+    assert len(activity) == 7
+    assert activity[two_days_ago.strftime('%Y-%m-%d')] == (2, 2)
+    assert sum(entries for entries, _ in activity.values()) == 2
+
+
+def test_stats_route_is_cached_until_ttl(client, make_table, company, db_session):
+    table_id = make_table(LABEL_COLUMN)
+    add_rows(client, table_id, 1)
+
+    first = client.get(f'/company/stats/{company.id}').get_json()['stats']
+    add_rows(client, table_id, 1)
+    cached = client.get(f'/company/stats/{company.id}').get_json()['stats']
+
+    assert first['total_entries'] == cached['total_entries'] == 1
+    # TTL nul : pas de cache, recalcul à chaque appel
+    assert get_company_stats(company, ttl=0)['total_entries'] == 2
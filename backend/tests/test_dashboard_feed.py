@@ -0,0 +1,92 @@
+# tests/test_dashboard_feed.py
+"""Flux du dashboard : seuls les widgets abonnés dont les données ont changé sont poussés"""
+import threading
+
+from models.company import Department
+from utils.dashboard_feed import DashboardFeed
+from utils.widget_engine import widget_engine
+
+
+class EmitRecorder:
+    """Remplace le serveur Socket.IO : enregistre les événements émis"""
+
+    def __init__(self):
+        self.events = []
+        self.emitted = threading.Event()
+
+    def emit(self, event, data, room=None):
+        self.events.append((event, data, room))
+        self.emitted.set()
+
+
+def make_feed(app):
+    feed = DashboardFeed(widget_engine, debounce=0.05)
+    feed.app = app
+    feed.socketio = EmitRecorder()
+    return feed
+
+
+def make_widget(client, **fields):
+    response = client.post('/api/dashboard/widgets/create', json=dict(
+        title='Départements', data_source='departments', filters={'metric': 'count'}, **fields
+    ))
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['widget']['id']
+
+
+def add_department(db_session, company, name):
+    db_session.add(Department(name=name, company_id=company.id))
+    db_session.commit()
+
+
+def test_push_sends_only_changed_widgets(app, client, company, admin, department, db_session):
+    feed = make_feed(app)
+    widget_id = make_widget(client)
+    feed.subscribe('sid-1', admin, [widget_id], DashboardFeed.normalize_filters({}))
+
+    # Données inchangées ou source non suivie : rien n'est envoyé
+    assert feed.push({'departments'}) == 0
+    assert feed.push({'tickets'}) == 0
+
+    add_department(db_session, company, 'Finance')
+
+    assert feed.push({'departments'}) == 1
+    event, data, room = feed.socketio.events[0]
+    assert (event, room) == ('dashboard_widgets', f'user_{admin.id}')
+    assert data['filters']['time_filter'] == 'week'
+    assert data['widgets'][str(widget_id)]['value'] == 2
+    assert feed.push({'departments'}) == 0
+
+
+def test_connections_with_same_filters_share_one_subscription(app, client, admin, department, db_session):
+    feed = make_feed(app)
+    widget_id = make_widget(client)
+    filters = DashboardFeed.normalize_filters({'time_filter': 'month'})
+
+    first = feed.subscribe('sid-1', admin, [widget_id], filters)
+    second = feed.subscribe('sid-2', admin, [widget_id], filters)
+    assert first is second and first.sids == {'sid-1', 'sid-2'}
+
+    feed.unsubscribe('sid-1')
+    assert feed._subscriptions
+    feed.unsubscribe('sid-2')
+    assert not feed._subscriptions
+
+    # Sans abonné, un commit ne réveille pas le thread
+    feed.notify({'departments'})
+    assert feed._thread is None
+
+
+def test_commit_notification_is_pushed_by_the_feed_thread(app, client, company, admin, department, db_session):
+    feed = make_feed(app)
+    widget_id = make_widget(client)
+    feed.subscribe('sid-1', admin, [widget_id], DashboardFeed.normalize_filters({}))
+    widget_engine.add_listener(feed.notify)
+    try:
+        add_department(db_session, company, 'Finance')
+        assert feed.socketio.emitted.wait(10)
+    finally:
+        widget_engine._listeners.remove(feed.notify)
+        feed.stop()
+
+    assert feed.socketio.events[0][1]['widgets'][str(widget_id)]['value'] == 2
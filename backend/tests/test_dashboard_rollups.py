@@ -0,0 +1,45 @@
+# tests/test_dashboard_rollups.py
+"""Agrégats quotidiens : construction initiale de l'historique et traitement des marques"""
+from datetime import datetime, timedelta
+
+from models.dashboard_rollup import DailyRollup, RollupMark
+from models.ticket import Ticket
+from utils.dashboard_rollups import bootstrap_marks, process_marks, rollup_totals
+
+
+def add_ticket(db_session, user, department, number, created_at, status='en_cours'):
+    db_session.add(Ticket(
+        ticket_number=number, created_by_id=user.id, department_id=department.id, title='Ticket',
+        description='Description', category='autre', status=status, created_at=created_at
+    ))
+    db_session.commit()
+
+
+def test_bootstrap_builds_history_without_backfill(db_session, admin, department):
+    now = datetime.utcnow()
+    for days in range(3):
+        add_ticket(db_session, admin, department, f'T{days}', now - timedelta(days=days * 10))
+    # Base existante avant les agrégats : ni agrégats ni marques
+    RollupMark.query.delete()
+    db_session.commit()
+
+    assert bootstrap_marks() > 0
+    process_marks()
+
+    totals = rollup_totals(admin.company_id, None, 'tickets', 'status',
+                           (now - timedelta(days=30)).date(), now.date())
+    assert totals['en_cours'][0] == 3
+    # Agrégats présents : pas de nouveau marquage au redémarrage
+    assert bootstrap_marks() == 0
+
+
+def test_process_marks_deletes_only_marks_read(db_session, admin, department):
+    add_ticket(db_session, admin, department, 'T1', datetime.utcnow())
+    RollupMark.query.delete()
+    db_session.add_all([RollupMark(source='tickets', day=datetime.utcnow().date()) for _ in range(3)])
+    db_session.commit()
+
+    process_marks(limit=2)
+
+    assert RollupMark.query.count() == 1
+    assert DailyRollup.query.filter_by(source='tickets').count() > 0
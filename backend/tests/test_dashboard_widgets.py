@@ -0,0 +1,123 @@
+# tests/test_dashboard_widgets.py
+"""Moteur de widgets : cache par portée, invalidation au commit des tables lues, chargement par lot"""
+from datetime import datetime
+
+from sqlalchemy import text
+
+from models.company import Department
+from models.dashboard import DashboardWidget
+from models.user import User
+from utils.widget_engine import widget_engine
+
+
+def make_widget(client, data_source='departments', metric='count', **fields):
+    response = client.post('/api/dashboard/widgets/create', json=dict(
+        title='Widget', data_source=data_source, filters={'metric': metric}, **fields
+    ))
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['widget']['id']
+
+
+def widget_value(client, widget_id):
+    return client.get(f'/api/dashboard/widgets/{widget_id}/data').get_json()['data']['value']
+
+
+def insert_department_sql(db_session, company, name):
+    """Insertion hors ORM : invisible pour l'invalidation au commit"""
+    db_session.execute(text(
+        'INSERT INTO departments (name, company_id, is_active) VALUES (:name, :company_id, 1)'
+    ), {'name': name, 'company_id': company.id})
+    db_session.commit()
+
+
+def test_widget_data_is_cached_until_a_source_table_changes(client, company, department, db_session):
+    widget_id = make_widget(client)
+    assert widget_value(client, widget_id) == 1
+
+    insert_department_sql(db_session, company, 'RH')
+    assert widget_value(client, widget_id) == 1
+
+    # Commit ORM sur une table lue par la source : résultat recalculé
+    db_session.add(Department(name='Finance', company_id=company.id))
+    db_session.commit()
+    assert widget_value(client, widget_id) == 3
+
+
+def test_ignored_columns_and_other_tables_keep_the_cache(client, company, admin, department, db_session):
+    widget_id = make_widget(client)
+    assert widget_value(client, widget_id) == 1
+    invalidated = []
+    widget_engine.add_listener(invalidated.append)
+    try:
+        insert_department_sql(db_session, company, 'RH')
+        admin.last_login = datetime.utcnow()
+        admin.is_online = True
+        db_session.commit()
+        assert widget_value(client, widget_id) == 1
+
+        admin.role = 'directeur_rh'
+        db_session.commit()
+    finally:
+        widget_engine._listeners.remove(invalidated.append)
+
+    assert widget_value(client, widget_id) == 2
+    assert any('departments' in sources for sources in invalidated)
+
+
+def test_cache_is_shared_per_scope(client, company, department, db_session):
+    company_wide = make_widget(client)
+    same_scope = make_widget(client)
+    department_only = make_widget(client, department_id=department.id)
+    assert widget_value(client, company_wide) == 1
+    assert widget_value(client, department_only) == 1
+
+    insert_department_sql(db_session, company, 'RH')
+    # Même source, métrique et portée : entrée partagée ; autre portée : entrée distincte
+    assert widget_value(client, same_scope) == 1
+    widget_engine.cache.invalidate(lambda key: key[2][1] is None)
+    assert widget_value(client, company_wide) == 2
+    assert widget_value(client, department_only) == 1
+
+
+def test_batch_returns_each_widget_and_computes_shared_scope_once(client, company, admin, department, db_session):
+    count_ids = [make_widget(client), make_widget(client)]
+    comparison_id = make_widget(client, metric='comparison')
+    calls = []
+    source = widget_engine.sources['departments']
+
+    def counting_handler(widget, user, metric, *args):
+        calls.append(metric)
+        return source.handler(widget, user, metric, *args)
+
+    widget_engine.sources['departments'] = source._replace(handler=counting_handler)
+    try:
+        response = client.post('/api/dashboard/widgets/data', json={
+            'widget_ids': count_ids + [comparison_id, 999]
+        })
+    finally:
+        widget_engine.sources['departments'] = source
+
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert [data[str(wid)]['value'] for wid in count_ids] == [1, 1]
+    assert data[str(comparison_id)]['labels'] == ['IT']
+    assert data['999'] == {'error': 'Widget introuvable'}
+    assert sorted(calls) == ['comparison', 'count']
+
+
+def test_batch_ignores_widgets_of_other_users(client, company, db_session):
+    other = User(username='autre', email='autre@acme.tn', password_hash='x', company_id=company.id)
+    db_session.add(other)
+    db_session.commit()
+    widget = DashboardWidget(user_id=other.id, title='Autre', widget_type='count', data_source='departments')
+    db_session.add(widget)
+    db_session.commit()
+
+    data = client.post('/api/dashboard/widgets/data', json={'widget_ids': [widget.id]}).get_json()['data']
+    assert data == {str(widget.id): {'error': 'Widget introuvable'}}
+
+
+def test_batch_validates_widget_ids(client):
+    assert client.post('/api/dashboard/widgets/data', json={'widget_ids': 'tous'}).status_code == 400
+    assert client.post('/api/dashboard/widgets/data', json={'widget_ids': list(range(51))}).status_code == 400
+    assert client.post('/api/dashboard/widgets/data', json={'widget_ids': []}).get_json()['data'] == {}
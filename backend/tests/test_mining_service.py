@@ -0,0 +1,97 @@
+# tests/test_mining_service.py
+"""Minage en arrière-plan : rappel avec le bloc qui contient la transaction, scellement automatique"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+from models.blockchain import Blockchain
+from utils.mining_service import BlockSealer, MiningService
+
+
+def test_submit_transaction_reports_block_containing_it(app):
+    blockchain = Blockchain(difficulty=1, max_block_transactions=1)
+    miner = MiningService(app, blockchain, max_workers=1)
+    blockchain.add_transaction({'type': 'other'})
+    mined = []
+    done = threading.Event()
+
+    def on_mined(block):
+        mined.append(block)
+        done.set()
+
+    transaction = {'type': 'employee_request', 'entity_id': 7}
+    try:
+        # Le premier bloc ne prend que la transaction déjà en attente : la nôtre part au suivant
+        miner.submit_transaction('system_payroll', transaction, on_mined=on_mined)
+        assert done.wait(30)
+    finally:
+        miner.shutdown()
+
+    assert len(mined) == 1
+    block = mined[0]
+    assert block['index'] == blockchain.get_latest_block()['index']
+    assert [tx['id'] for tx in block['transactions']] == [transaction['id']]
+    assert [tx['type'] for tx in blockchain.chain[block['index'] - 1]['transactions']] == ['other']
+    assert not blockchain.pending_transactions
+
+
+def wait_for_job(miner, job_id):
+    for _ in range(300):
+        job = miner.get_job(job_id)
+        if job['status'] not in ('queued', 'running'):
+            return job
+        time.sleep(0.1)
+    raise AssertionError('job de minage non terminé')
+
+
+def test_sealer_seals_on_size(app):
+    blockchain = Blockchain(difficulty=1)
+    miner = MiningService(app, blockchain, max_workers=1)
+    sealer = BlockSealer(blockchain, miner, seal_size=3, seal_interval=3600)
+    try:
+        blockchain.add_transactions([{'type': 'test', 'n': n} for n in range(2)])
+        assert not sealer.should_seal()
+        assert sealer.check() is None
+
+        blockchain.add_transaction({'type': 'test', 'n': 2})
+        job = sealer.check()
+        assert job is not None
+        job = wait_for_job(miner, job['id'])
+    finally:
+        miner.shutdown()
+
+    assert job['status'] == 'completed' and job['transactions_count'] == 3
+    assert blockchain.get_latest_block()['miner'] == BlockSealer.MINER_ADDRESS
+    assert not sealer.should_seal()
+
+
+def test_sealer_seals_on_age():
+    blockchain = Blockchain(difficulty=1)
+    sealer = BlockSealer(blockchain, None, seal_size=500, seal_interval=60)
+    assert not sealer.should_seal()
+
+    blockchain.add_transactions([{'type': 'test', 'timestamp': datetime.utcnow().isoformat()}])
+    assert not sealer.should_seal()
+
+    blockchain.pending_transactions[0]['timestamp'] = (datetime.utcnow() - timedelta(seconds=61)).isoformat()
+    assert sealer.should_seal()
+
+
+def test_sealer_waits_for_its_running_job(app):
+    blockchain = Blockchain(difficulty=1)
+    miner = MiningService(app, blockchain, max_workers=1)
+    sealer = BlockSealer(blockchain, miner, seal_size=1, seal_interval=3600)
+    blockchain.add_transaction({'type': 'test'})
+    # Job du scelleur encore en cours : aucun second bloc n'est demandé avant sa fin
+    sealer._current_job_id = 'en-cours'
+    miner.jobs['en-cours'] = {'id': 'en-cours', 'status': 'running', 'callbacks': []}
+
+    assert sealer.check() is None
+
+    miner.jobs['en-cours']['status'] = 'completed'
+    try:
+        job = sealer.check()
+        assert job is not None and job['id'] != 'en-cours'
+        wait_for_job(miner, job['id'])
+    finally:
+        miner.shutdown()
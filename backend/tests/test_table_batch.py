@@ -0,0 +1,65 @@
+# tests/test_table_batch.py
+"""Lots de modifications : échanges de valeurs uniques et libération des valeurs en mode non atomique"""
+from models.department_table import TableRow
+
+COLUMNS = [
+    {'name': 'code', 'display_name': 'Code', 'data_type': 'text', 'is_unique': True},
+    {'name': 'qty', 'display_name': 'Quantité', 'data_type': 'number', 'is_required': True},
+]
+
+
+def add_row(client, table_id, data):
+    response = client.post(f'/api/department-tables/{table_id}/rows/add', json={'data': data})
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['row']['id']
+
+
+def batch(client, table_id, operations, atomic=True):
+    return client.post(f'/api/department-tables/{table_id}/rows/batch',
+                       json={'operations': operations, 'atomic': atomic})
+
+
+def codes(table_id):
+    return {row.id: row.get_data()['code'] for row in TableRow.query.filter_by(table_id=table_id)}
+
+
+def test_swap_unique_values(client, make_table):
+    table_id = make_table(COLUMNS)
+    first = add_row(client, table_id, {'code': 'A', 'qty': 1})
+    second = add_row(client, table_id, {'code': 'B', 'qty': 2})
+
+    response = batch(client, table_id, [
+        {'op': 'update', 'id': first, 'data': {'code': 'B', 'qty': 1}},
+        {'op': 'update', 'id': second, 'data': {'code': 'A', 'qty': 2}},
+    ])
+    assert response.status_code == 200, response.get_json()
+    assert codes(table_id) == {first: 'B', second: 'A'}
+
+
+def test_rejected_update_keeps_its_value(client, make_table):
+    table_id = make_table(COLUMNS)
+    first = add_row(client, table_id, {'code': 'A', 'qty': 1})
+
+    response = batch(client, table_id, [
+        {'op': 'update', 'id': first, 'data': {'code': 'Z', 'qty': 'abc'}},
+        {'op': 'insert', 'data': {'code': 'A', 'qty': 3}},
+        {'op': 'insert', 'data': {'code': 'C', 'qty': 4}},
+    ], atomic=False)
+    assert response.status_code == 200, response.get_json()
+    results = response.get_json()['results']
+    assert [bool(result['errors']) for result in results] == [True, True, False]
+    assert sorted(codes(table_id).values()) == ['A', 'C']
+
+
+def test_update_rejected_on_unique_conflict_releases_nothing(client, make_table):
+    table_id = make_table(COLUMNS)
+    first = add_row(client, table_id, {'code': 'A', 'qty': 1})
+    add_row(client, table_id, {'code': 'B', 'qty': 2})
+
+    response = batch(client, table_id, [
+        {'op': 'update', 'id': first, 'data': {'code': 'B', 'qty': 1}},
+        {'op': 'insert', 'data': {'code': 'A', 'qty': 3}},
+    ], atomic=False)
+    assert response.status_code == 200, response.get_json()
+    assert [bool(result['errors']) for result in response.get_json()['results']] == [True, True]
+    assert sorted(codes(table_id).values()) == ['A', 'B']
@@ -0,0 +1,52 @@
+# tests/test_table_columns.py
+"""Ajout de colonnes : index des valeurs uniques construit sur les lignes existantes"""
+from models.department_table import TableUniqueValue
+
+UNIQUE_COLUMN = {'name': 'code', 'display_name': 'Code', 'data_type': 'text', 'is_unique': True}
+
+
+def add_rows(client, table_id, values):
+    for value in values:
+        response = client.post(f'/api/department-tables/{table_id}/rows/add', json={'data': {'label': value, 'code': value}})
+        assert response.status_code == 201, response.get_json()
+
+
+def test_add_unique_column_indexes_existing_values(client, make_table):
+    table_id = make_table([{'name': 'label', 'display_name': 'Libellé', 'data_type': 'text'}])
+    add_rows(client, table_id, ['x', 'y'])
+
+    response = client.post(f'/api/department-tables/{table_id}/columns/add', json=UNIQUE_COLUMN)
+    assert response.status_code == 201, response.get_json()
+    column_id = response.get_json()['column']['id']
+    assert TableUniqueValue.query.filter_by(table_id=table_id, column_id=column_id).count() == 2
+
+
+def test_add_unique_column_rejects_existing_duplicates(client, make_table):
+    table_id = make_table([{'name': 'label', 'display_name': 'Libellé', 'data_type': 'text'}])
+    add_rows(client, table_id, ['x', 'x', 'y'])
+
+    response = client.post(f'/api/department-tables/{table_id}/columns/add', json=UNIQUE_COLUMN)
+    assert response.status_code == 400
+    duplicates = response.get_json()['duplicates']
+    assert [(duplicate['column'], duplicate['value']) for duplicate in duplicates] == [('code', 'x')]
+    assert TableUniqueValue.query.filter_by(table_id=table_id).count() == 0
+
+
+def test_rebuild_unique_index_command_reports_duplicates(app, client, make_table, db_session):
+    from models.department_table import TableColumn
+
+    table_id = make_table([
+        {'name': 'label', 'display_name': 'Libellé', 'data_type': 'text'},
+        {'name': 'code', 'display_name': 'Code', 'data_type': 'text'}
+    ])
+    add_rows(client, table_id, ['x', 'x', 'y'])
+    # Colonne rendue unique hors API : les doublons existent déjà en base
+    TableColumn.query.filter_by(table_id=table_id, name='code').update({'is_unique': True})
+    db_session.commit()
+
+    result = app.test_cli_runner().invoke(args=['rebuild-unique-index'])
+
+    assert result.exit_code == 1
+    assert 'colonne code: ligne 2 en double de la ligne 1 (x)' in result.output
+    assert '1 doublon(s)' in result.output
+    assert TableUniqueValue.query.filter_by(table_id=table_id).count() == 2
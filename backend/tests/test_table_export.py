@@ -0,0 +1,17 @@
+# tests/test_table_export.py
+"""Export XLSX : nom de feuille dérivé du nom affiché de la table"""
+import io
+
+from openpyxl import load_workbook
+
+
+def test_xlsx_export_sanitizes_sheet_title(client, make_table):
+    table_id = make_table([{'name': 'code', 'display_name': 'Code', 'data_type': 'text'}],
+                          display_name='Stock: entrepôt A/B [2024] - inventaire annuel')
+    client.post(f'/api/department-tables/{table_id}/rows/add', json={'data': {'code': 'A1'}})
+
+    response = client.get(f'/api/department-tables/{table_id}/export?format=xlsx')
+    assert response.status_code == 200
+    sheet = load_workbook(io.BytesIO(response.data)).worksheets[0]
+    assert sheet.title == 'Stock- entrepôt A-B -2024- - in'
+    assert [[cell.value for cell in row] for row in sheet.iter_rows()] == [['Code'], ['A1']]
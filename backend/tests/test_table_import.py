@@ -0,0 +1,51 @@
+# tests/test_table_import.py
+"""Import CSV de bout en bout : lignes, index des valeurs uniques et valeurs typées"""
+import io
+
+from models.department_table import TableRow, TableRowValue, TableUniqueValue
+
+COLUMNS = [
+    {'name': 'sn', 'display_name': 'Numéro', 'data_type': 'text', 'is_unique': True},
+    {'name': 'qty', 'display_name': 'Quantité', 'data_type': 'number', 'is_required': True},
+]
+
+
+def import_csv(client, table_id, content):
+    return client.post(
+        f'/api/department-tables/{table_id}/import',
+        data={'file': (io.BytesIO(content.encode()), 'inventaire.csv')},
+        content_type='multipart/form-data'
+    )
+
+
+def test_import_links_values_to_inserted_rows(client, make_table):
+    table_id = make_table(COLUMNS)
+    client.post(f'/api/department-tables/{table_id}/rows/add', json={'data': {'sn': 'A0', 'qty': 1}})
+
+    response = import_csv(client, table_id, 'Numéro;qty\nA1;2\nA2;3,5\nA0;4\nA1;5\nA3;abc\n')
+    assert response.status_code == 200, response.get_json()
+    report = response.get_json()['report']
+    assert report['imported'] == 2
+    assert sorted(error['line'] for error in report['errors']) == [4, 5, 6]
+
+    rows = {row.get_data()['sn']: row for row in TableRow.query.filter_by(table_id=table_id)}
+    assert set(rows) == {'A0', 'A1', 'A2'}
+    for sn, row in rows.items():
+        unique = TableUniqueValue.query.filter_by(row_id=row.id).one()
+        assert unique.value_hash == TableUniqueValue.hash_value(sn, 'text')
+    numbers = {value.row_id: value.value_number for value in TableRowValue.query.filter(
+        TableRowValue.row_id.in_([rows['A1'].id, rows['A2'].id]),
+        TableRowValue.value_number != None
+    )}
+    assert numbers == {rows['A1'].id: 2, rows['A2'].id: 3.5}
+
+
+def test_import_dry_run_writes_nothing(client, make_table):
+    table_id = make_table(COLUMNS)
+    response = client.post(
+        f'/api/department-tables/{table_id}/import?dry_run=true',
+        data={'file': (io.BytesIO('sn,qty\nB1,1\nB2,2\n'.encode()), 'inventaire.csv')},
+        content_type='multipart/form-data'
+    )
+    assert response.get_json()['report']['imported'] == 2
+    assert TableRow.query.filter_by(table_id=table_id).count() == 0
@@ -0,0 +1,37 @@
+# tests/test_table_list.py
+"""Liste des tables : nombre de lignes par COUNT groupé, sans charger les lignes"""
+from sqlalchemy import inspect
+
+from models.department_table import DepartmentTable
+
+LABEL_COLUMN = [{'name': 'label', 'display_name': 'Libellé', 'data_type': 'text'}]
+
+
+def add_rows(client, table_id, count):
+    for n in range(count):
+        response = client.post(f'/api/department-tables/{table_id}/rows/add', json={'data': {'label': f'ligne {n}'}})
+        assert response.status_code == 201, response.get_json()
+
+
+def test_count_rows_groups_tables(client, make_table):
+    first = make_table(LABEL_COLUMN, name='stock', display_name='Stock')
+    second = make_table(LABEL_COLUMN, name='achats', display_name='Achats')
+    empty = make_table(LABEL_COLUMN, name='vide', display_name='Vide')
+    add_rows(client, first, 3)
+    add_rows(client, second, 1)
+
+    assert DepartmentTable.count_rows([first, second, empty]) == {first: 3, second: 1, empty: 0}
+    assert DepartmentTable.count_rows([]) == {}
+
+
+def test_list_reports_rows_count_without_loading_rows(client, make_table, department, db_session):
+    table_id = make_table(LABEL_COLUMN)
+    add_rows(client, table_id, 2)
+
+    tables = client.get(f'/api/department-tables/list/{department.id}').get_json()['tables']
+    assert [(table['id'], table['rows_count']) for table in tables] == [(table_id, 2)]
+
+    db_session.expire_all()
+    table = db_session.get(DepartmentTable, table_id)
+    assert table.to_dict()['rows_count'] == 2
+    assert 'rows' in inspect(table).unloaded
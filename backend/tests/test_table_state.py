@@ -0,0 +1,34 @@
+# tests/test_table_state.py
+"""État maintenu des tables existantes : création paresseuse concurrente"""
+from database import db
+from models.department_table import DepartmentTable, TableState
+
+
+def test_get_state_reuses_state_created_concurrently(client, make_table):
+    table_id = make_table([{'name': 'code', 'display_name': 'Code', 'data_type': 'text'}])
+    # Table antérieure à l'état maintenu
+    TableState.query.filter_by(table_id=table_id).delete()
+    db.session.commit()
+    db.session.expire_all()
+
+    table = db.session.get(DepartmentTable, table_id)
+    assert table.state is None
+    # Une autre requête crée l'état entre-temps
+    with db.engine.begin() as connection:
+        connection.execute(TableState.__table__.insert().values(table_id=table_id, data_version=7))
+
+    assert table.get_state().data_version == 7
+    table.mark_rows_changed()
+    db.session.commit()
+    assert db.session.get(TableState, table_id).data_version == 8
+
+
+def test_first_write_creates_missing_state(client, make_table):
+    table_id = make_table([{'name': 'code', 'display_name': 'Code', 'data_type': 'text'}])
+    TableState.query.filter_by(table_id=table_id).delete()
+    db.session.commit()
+
+    response = client.post(f'/api/department-tables/{table_id}/rows/add', json={'data': {'code': 'A'}})
+    assert response.status_code == 201, response.get_json()
+    state = db.session.get(TableState, table_id)
+    assert state.data_version == 1 and not state.typed_values_ready
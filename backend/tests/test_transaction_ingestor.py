@@ -0,0 +1,44 @@
+# tests/test_transaction_ingestor.py
+"""Contre-pression de l'ingestion : minage demandé, puis rejet borné si rien n'est miné"""
+from models.blockchain import Blockchain
+from utils.mining_service import MiningService
+from utils.transaction_ingestor import TransactionIngestor
+
+
+def full_chain(pending=3):
+    blockchain = Blockchain(difficulty=1)
+    blockchain.add_transactions([{'type': 'old', 'n': n} for n in range(pending)])
+    return blockchain
+
+
+def test_full_pending_queue_rejects_after_deadline():
+    blockchain = full_chain()
+    ingestor = TransactionIngestor(blockchain, max_pending=3, capacity_timeout=0.3)
+
+    assert ingestor.submit({'type': 'audit'})
+    assert ingestor.flush(timeout=5)
+
+    status = ingestor.get_status()
+    assert status['saturated']
+    assert status['rejected'] == 1
+    assert len(blockchain.pending_transactions) == 3
+    # Tant que rien n'est miné, les soumissions sont refusées sans attendre
+    assert not ingestor.submit({'type': 'audit'})
+    assert ingestor.get_status()['rejected'] == 2
+
+
+def test_full_pending_queue_requests_mining(app):
+    blockchain = full_chain()
+    miner = MiningService(app, blockchain, max_workers=1)
+    ingestor = TransactionIngestor(blockchain, max_pending=3, capacity_timeout=30,
+                                   mining_service=miner)
+    try:
+        assert ingestor.submit({'type': 'audit'})
+        assert ingestor.flush(timeout=30)
+    finally:
+        miner.shutdown()
+
+    assert not ingestor.get_status()['saturated']
+    assert ingestor.get_status()['rejected'] == 0
+    assert [tx['type'] for tx in blockchain.pending_transactions] == ['audit']
+    assert blockchain.get_latest_block()['miner'] == TransactionIngestor.MINER_ADDRESS
@@ -1,26 +1,73 @@
+import hashlib
+import hmac
+import json
 import requests
 import threading
 import time
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Any, Callable, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Signature HMAC-SHA256 (secret partagé entre nœuds) du corps des blocs et transactions diffusés
+SIGNATURE_HEADER = 'X-Blockchain-Signature'
+
+
+def sign_payload(secret: str, body: bytes) -> str:
+    """Signature hexadécimale du corps d'une requête entre nœuds"""
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret: Optional[str], body: bytes, signature: Optional[str]) -> bool:
+    """Sans secret configuré, aucun envoi d'un pair n'est accepté"""
+    if not secret or not signature:
+        return False
+    return hmac.compare_digest(sign_payload(secret, body), signature)
+
 
 class BlockchainSyncManager:
     """Gestionnaire de synchronisation de la blockchain entre nœuds"""
     
-    def __init__(self, blockchain, sync_interval: int = 300):
+    # Timeouts (connexion, lecture) en secondes
+    CONNECT_TIMEOUT = 3
+    READ_TIMEOUT = 10
+    
+    # Backoff exponentiel des nœuds injoignables
+    BACKOFF_BASE = 15
+    BACKOFF_MAX = 900
+    
+    # Blocs demandés par page lors d'une synchronisation par delta
+    DELTA_PAGE_SIZE = 100
+    
+    def __init__(self, blockchain, sync_interval: int = 300, max_workers: int = 8,
+                 peer_secret: Optional[str] = None):
         """
         Args:
             blockchain: Instance de la blockchain
             sync_interval: Intervalle de synchronisation en secondes (défaut: 5 minutes)
+            max_workers: Nombre maximum de nœuds contactés en parallèle
+            peer_secret: Secret partagé signant les blocs et transactions échangés entre nœuds
         """
         self.blockchain = blockchain
+        self.peer_secret = peer_secret
         self.sync_interval = sync_interval
         self.is_running = False
         self.sync_thread = None
         self.nodes = set()
+        
+        # Santé des nœuds : échecs consécutifs et date de la prochaine tentative
+        self.node_health = {}
+        self._health_lock = threading.Lock()
+        
+        # Connexions keep-alive partagées et fan-out borné
+        self.max_workers = max_workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='blockchain-sync')
     
     def register_node(self, node_url: str):
         """Enregistre un nouveau nœud dans le réseau"""
@@ -35,98 +82,246 @@ class BlockchainSyncManager:
         """Désenregistre un nœud du réseau"""
         if node_url in self.nodes:
             self.nodes.remove(node_url)
+            with self._health_lock:
+                self.node_health.pop(node_url, None)
             logger.info(f"Nœud désenregistré: {node_url}")
             return True
         return False
     
-    def get_chain_from_node(self, node_url: str) -> Dict[str, Any]:
-        """Récupère la blockchain d'un nœud"""
+    # ==================== SANTÉ DES NŒUDS ====================
+    
+    def _health(self, node_url: str) -> Dict[str, Any]:
+        return self.node_health.setdefault(node_url, {
+            'failures': 0,
+            'next_retry_at': 0.0,
+            'last_success': None,
+            'last_error': None
+        })
+    
+    def _record_success(self, node_url: str):
+        with self._health_lock:
+            health = self._health(node_url)
+            health['failures'] = 0
+            health['next_retry_at'] = 0.0
+            health['last_success'] = time.time()
+            health['last_error'] = None
+    
+    def _record_failure(self, node_url: str, error: str):
+        with self._health_lock:
+            health = self._health(node_url)
+            health['failures'] += 1
+            delay = min(self.BACKOFF_BASE * 2 ** (health['failures'] - 1), self.BACKOFF_MAX)
+            health['next_retry_at'] = time.time() + delay
+            health['last_error'] = error
+        logger.warning(f"Nœud {node_url} injoignable ({error}), nouvel essai dans {delay}s")
+    
+    def available_nodes(self) -> List[str]:
+        """Nœuds à contacter : ceux en backoff sont ignorés jusqu'à leur prochaine tentative"""
+        now = time.time()
+        with self._health_lock:
+            return [
+                node for node in list(self.nodes)
+                if self.node_health.get(node, {}).get('next_retry_at', 0.0) <= now
+            ]
+    
+    def _request(self, method: str, node_url: str, path: str, **kwargs) -> Optional[requests.Response]:
+        """Requête HTTP vers un nœud via la session partagée, avec suivi de santé"""
         try:
-            response = requests.get(
-                f"{node_url}/api/blockchain/chain",
-                timeout=10
+            response = self.session.request(
+                method,
+                f"{node_url}{path}",
+                timeout=(self.CONNECT_TIMEOUT, self.READ_TIMEOUT),
+                **kwargs
             )
-            if response.status_code == 200:
+        except requests.exceptions.RequestException as e:
+            self._record_failure(node_url, str(e))
+            return None
+        
+        if response.status_code >= 500:
+            self._record_failure(node_url, f"HTTP {response.status_code}")
+        else:
+            self._record_success(node_url)
+        return response
+    
+    def _post_signed(self, node_url: str, path: str, payload: Dict[str, Any]) -> Optional[requests.Response]:
+        """POST JSON signé avec le secret partagé (corps sérialisé une fois, signé tel qu'envoyé)"""
+        body = json.dumps(payload, sort_keys=True).encode()
+        headers = {'Content-Type': 'application/json'}
+        if self.peer_secret:
+            headers[SIGNATURE_HEADER] = sign_payload(self.peer_secret, body)
+        return self._request('POST', node_url, path, data=body, headers=headers)
+    
+    def _fan_out(self, func: Callable[[str], Any], nodes: List[str]) -> Dict[str, Any]:
+        """Exécute func(node) en parallèle sur les nœuds et attend tous les résultats"""
+        futures = {node: self.executor.submit(func, node) for node in nodes}
+        results = {}
+        for node, future in futures.items():
+            try:
+                results[node] = future.result()
+            except Exception as e:
+                logger.error(f"Erreur lors de l'appel au nœud {node}: {e}")
+                results[node] = None
+        return results
+    
+    # ==================== SYNCHRONISATION ====================
+    
+    def get_chain_from_node(self, node_url: str) -> Dict[str, Any]:
+        """Récupère la blockchain d'un nœud (flux NDJSON, bloc par bloc)"""
+        response = self._request(
+            'GET', node_url, '/api/blockchain/chain',
+            params={'format': 'ndjson'}, stream=True
+        )
+        if response is None or response.status_code != 200:
+            return None
+        
+        try:
+            if 'ndjson' not in response.headers.get('Content-Type', ''):
+                # Nœud sans mode flux : réponse JSON complète
                 return response.json()
+            chain = [json.loads(line) for line in response.iter_lines() if line]
+            return {'chain': chain, 'length': len(chain)}
         except requests.exceptions.RequestException as e:
-            logger.error(f"Erreur lors de la récupération de la chaîne depuis {node_url}: {e}")
+            self._record_failure(node_url, str(e))
+        except ValueError as e:
+            logger.error(f"Réponse invalide de {node_url}: {e}")
+        finally:
+            response.close()
         return None
     
+    def get_height_from_node(self, node_url: str) -> Optional[Dict[str, Any]]:
+        """Récupère la hauteur et le hash de tête d'un nœud (quelques octets)"""
+        response = self._request('GET', node_url, '/api/blockchain/headers')
+        if response is not None and response.status_code == 200:
+            try:
+                return response.json()
+            except ValueError as e:
+                logger.error(f"Réponse invalide de {node_url}: {e}")
+        return None
+    
+    def fetch_missing_blocks(self, node_url: str) -> Optional[int]:
+        """
+        Récupère auprès d'un nœud uniquement les blocs qui nous manquent et les ajoute.
+        Retourne le nombre de blocs ajoutés, ou None si un fork impose une synchronisation complète.
+        """
+        added = 0
+        while True:
+            latest_block = self.blockchain.get_latest_block()
+            response = self._request(
+                'GET', node_url, '/api/blockchain/blocks/since',
+                params={
+                    'height': len(self.blockchain.chain),
+                    'hash': latest_block['hash'],
+                    'limit': self.DELTA_PAGE_SIZE
+                }
+            )
+            if response is None:
+                return added
+            if response.status_code in (404, 409):
+                # Fork détecté (ou nœud sans protocole delta)
+                return None if added == 0 else added
+            if response.status_code != 200:
+                return added
+            
+            try:
+                data = response.json()
+            except ValueError as e:
+                # Réponse tronquée ou corrompue : le nœud passe en backoff comme une erreur réseau
+                self._record_failure(node_url, f"Réponse invalide: {e}")
+                return added
+            blocks = data.get('blocks', [])
+            if not blocks:
+                return added
+            
+            # Seul le suffixe reçu est validé
+            appended = self.blockchain.extend_chain(blocks)
+            added += appended
+            if appended < len(blocks):
+                logger.warning(f"Blocs invalides reçus de {node_url}, arrêt de la synchronisation")
+                return added
+            if not data.get('has_more'):
+                return added
+    
     def sync_with_nodes(self):
-        """Synchronise avec tous les nœuds enregistrés"""
+        """
+        Synchronise avec les nœuds enregistrés : hauteurs interrogées en parallèle, puis
+        téléchargement des seuls blocs manquants. La chaîne complète n'est téléchargée
+        qu'en cas de fork.
+        """
         if not self.nodes:
             logger.info("Aucun nœud enregistré pour la synchronisation")
             return False
         
-        logger.info(f"Début de la synchronisation avec {len(self.nodes)} nœuds")
+        nodes = self.available_nodes()
+        logger.info(f"Début de la synchronisation avec {len(nodes)}/{len(self.nodes)} nœuds")
         
-        longest_chain = None
-        max_length = len(self.blockchain.chain)
+        local_height = len(self.blockchain.chain)
+        heights = self._fan_out(self.get_height_from_node, nodes)
+        candidates = sorted(
+            ((data.get('height', 0), node) for node, data in heights.items() if data),
+            reverse=True
+        )
         
-        # Parcourir tous les nœuds
-        for node in self.nodes:
-            try:
-                chain_data = self.get_chain_from_node(node)
-                
-                if chain_data:
-                    length = chain_data.get('length', 0)
-                    chain = chain_data.get('chain', [])
-                    
-                    # Vérifier si cette chaîne est plus longue
-                    if length > max_length:
-                        logger.info(f"Chaîne plus longue trouvée sur {node}: {length} blocs")
-                        longest_chain = chain
-                        max_length = length
+        for height, node in candidates:
+            if height <= len(self.blockchain.chain):
+                break
             
-            except Exception as e:
-                logger.error(f"Erreur lors de la synchronisation avec {node}: {e}")
+            logger.info(f"Chaîne plus longue trouvée sur {node}: {height} blocs")
+            added = self.fetch_missing_blocks(node)
+            
+            if added is None:
+                logger.info(f"Fork détecté avec {node}, synchronisation complète")
+                if self.sync_full_chain(node):
+                    return True
                 continue
+            
+            if added:
+                logger.info(f"{added} bloc(s) ajouté(s) depuis {node}")
         
-        # Remplacer notre chaîne si une plus longue est trouvée
-        if longest_chain:
-            if self.blockchain.replace_chain(longest_chain):
-                logger.info(f"Blockchain remplacée par une chaîne de {max_length} blocs")
-                return True
-            else:
-                logger.warning("La nouvelle chaîne n'est pas valide, conservation de la chaîne actuelle")
-        else:
-            logger.info("Notre chaîne est à jour")
+        if len(self.blockchain.chain) > local_height:
+            return True
         
+        logger.info("Notre chaîne est à jour")
+        return False
+    
+    def sync_full_chain(self, node_url: str) -> bool:
+        """Synchronisation complète (repli en cas de fork) : remplace la chaîne si plus longue et valide"""
+        chain_data = self.get_chain_from_node(node_url)
+        if not chain_data:
+            return False
+        
+        chain = chain_data.get('chain', [])
+        if len(chain) <= len(self.blockchain.chain):
+            return False
+        
+        if self.blockchain.replace_chain(chain):
+            logger.info(f"Blockchain remplacée par une chaîne de {len(chain)} blocs")
+            return True
+        
+        logger.warning("La nouvelle chaîne n'est pas valide, conservation de la chaîne actuelle")
         return False
     
     def broadcast_new_block(self, block: Dict[str, Any]):
-        """Diffuse un nouveau bloc à tous les nœuds"""
-        if not self.nodes:
+        """Diffuse un nouveau bloc à tous les nœuds (envoi en arrière-plan)"""
+        nodes = self.available_nodes()
+        if not nodes:
             return
         
-        logger.info(f"Diffusion du bloc {block.get('index')} à {len(self.nodes)} nœuds")
+        logger.info(f"Diffusion du bloc {block.get('index')} à {len(nodes)} nœuds")
         
-        for node in self.nodes:
-            try:
-                requests.post(
-                    f"{node}/api/blockchain/new-block",
-                    json={'block': block},
-                    timeout=5
-                )
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Erreur lors de la diffusion au nœud {node}: {e}")
+        for node in nodes:
+            self.executor.submit(self._post_signed, node, '/api/blockchain/new-block', {'block': block})
     
     def broadcast_transaction(self, transaction: Dict[str, Any]):
-        """Diffuse une nouvelle transaction à tous les nœuds"""
-        if not self.nodes:
+        """Diffuse une nouvelle transaction à tous les nœuds (envoi en arrière-plan)"""
+        nodes = self.available_nodes()
+        if not nodes:
             return
         
-        logger.info(f"Diffusion de la transaction à {len(self.nodes)} nœuds")
+        logger.info(f"Diffusion de la transaction à {len(nodes)} nœuds")
         
-        for node in self.nodes:
-            try:
-                requests.post(
-                    f"{node}/api/blockchain/new-transaction",
-                    json={'transaction': transaction},
-                    timeout=5
-                )
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Erreur lors de la diffusion au nœud {node}: {e}")
+        for node in nodes:
+            self.executor.submit(self._post_signed, node, '/api/blockchain/new-transaction',
+                                 {'transaction': transaction})
     
     def _sync_loop(self):
         """Boucle de synchronisation automatique"""
@@ -162,34 +357,48 @@ class BlockchainSyncManager:
         logger.info("Synchronisation automatique arrêtée")
     
     def get_network_status(self) -> Dict[str, Any]:
-        """Récupère le statut du réseau"""
+        """Récupère le statut du réseau (nœuds interrogés en parallèle, nœuds en backoff ignorés)"""
         active_nodes = []
         inactive_nodes = []
         
-        for node in self.nodes:
-            try:
-                response = requests.get(
-                    f"{node}/api/blockchain/stats",
-                    timeout=5
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    active_nodes.append({
-                        'url': node,
-                        'total_blocks': data.get('total_blocks'),
-                        'is_valid': data.get('is_valid')
-                    })
-                else:
-                    inactive_nodes.append(node)
-            except requests.exceptions.RequestException:
+        def fetch_stats(node):
+            response = self._request('GET', node, '/api/blockchain/stats')
+            if response is not None and response.status_code == 200:
+                return response.json()
+            return None
+        
+        available = self.available_nodes()
+        results = self._fan_out(fetch_stats, available)
+        
+        for node in list(self.nodes):
+            data = results.get(node)
+            if data:
+                active_nodes.append({
+                    'url': node,
+                    'total_blocks': data.get('total_blocks'),
+                    'is_valid': data.get('is_valid')
+                })
+            else:
                 inactive_nodes.append(node)
         
+        with self._health_lock:
+            health = {
+                node: {
+                    'failures': info['failures'],
+                    'retry_in': max(0, round(info['next_retry_at'] - time.time())),
+                    'last_error': info['last_error']
+                }
+                for node, info in self.node_health.items()
+                if info['failures']
+            }
+        
         return {
             'total_nodes': len(self.nodes),
             'active_nodes': len(active_nodes),
             'inactive_nodes': len(inactive_nodes),
             'nodes_details': active_nodes,
             'inactive_nodes_list': inactive_nodes,
+            'nodes_health': health,
             'sync_running': self.is_running,
             'local_chain_length': len(self.blockchain.chain)
         }
@@ -200,6 +409,13 @@ def register_sync_routes(app, sync_manager):
     """Enregistre les routes API pour la synchronisation"""
     from flask import jsonify, request
     
+    if sync_manager.peer_secret is None:
+        sync_manager.peer_secret = app.config.get('BLOCKCHAIN_PEER_SECRET')
+    
+    def peer_authorized() -> bool:
+        return verify_signature(sync_manager.peer_secret, request.get_data(),
+                                request.headers.get(SIGNATURE_HEADER))
+    
     @app.route('/api/blockchain/nodes/register', methods=['POST'])
     def register_node():
         """Enregistrer un nouveau nœud"""
@@ -271,24 +487,38 @@ def register_sync_routes(app, sync_manager):
     
     @app.route('/api/blockchain/new-block', methods=['POST'])
     def receive_new_block():
-        """Reçoit un nouveau bloc d'un autre nœud"""
+        """Reçoit un nouveau bloc d'un autre nœud (corps signé avec le secret partagé)"""
+        if not peer_authorized():
+            return jsonify({'error': 'Signature du nœud invalide'}), 403
+        
         data = request.get_json()
         block_data = data.get('block')
         
         if not block_data:
             return jsonify({'error': 'Données de bloc manquantes'}), 400
         
-        # Vérifier et ajouter le bloc
-        # Note: Implémentation simplifiée, dans un cas réel il faudrait
-        # valider le bloc avant de l'ajouter
+        # Un bloc qui prolonge notre tête est validé seul et ajouté ;
+        # sinon l'émetteur est en avance et une synchronisation par delta suffit
+        blockchain = sync_manager.blockchain
+        if blockchain.extend_chain([block_data]):
+            return jsonify({
+                'success': True,
+                'message': 'Bloc ajouté',
+                'height': len(blockchain.chain)
+            }), 200
+        
         return jsonify({
-            'success': True,
-            'message': 'Bloc reçu'
-        }), 200
+            'success': False,
+            'message': 'Bloc non raccordable à la chaîne locale',
+            'height': len(blockchain.chain)
+        }), 409
     
     @app.route('/api/blockchain/new-transaction', methods=['POST'])
     def receive_new_transaction():
-        """Reçoit une nouvelle transaction d'un autre nœud"""
+        """Reçoit une nouvelle transaction d'un autre nœud (corps signé avec le secret partagé)"""
+        if not peer_authorized():
+            return jsonify({'error': 'Signature du nœud invalide'}), 403
+        
         data = request.get_json()
         transaction = data.get('transaction')
         
@@ -0,0 +1,78 @@
+# utils/cache.py
+"""Caches mémoire partagés par les modules de statistiques, de validation et de dashboard"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Cache mémoire à expiration (par processus), borné en nombre d'entrées"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, predicate=None):
+        """Supprime les entrées dont la clé vérifie predicate (toutes si None)"""
+        with self._lock:
+            if predicate is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+
+class VersionedCache:
+    """
+    Cache mémoire (par processus) dont chaque entrée reste valide tant que la version fournie
+    à la lecture est celle de l'écriture (ex. data_version, schema_version d'une table)
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, version, value):
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, predicate=None):
+        """Supprime les entrées dont la clé vérifie predicate (toutes si None)"""
+        with self._lock:
+            if predicate is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
@@ -0,0 +1,269 @@
+# utils/company_counters.py
+"""
+Compteurs matérialisés par entreprise (départements, employés, projets actifs, tickets ouverts,
+tables, entrées) : les flush appliquent des deltas dans leur transaction, la lecture est une
+recherche par clé ; un recomptage complet (une requête) n'a lieu que si le compteur est absent,
+marqué périmé ou plus ancien que max_age.
+"""
+from collections import Counter, defaultdict, namedtuple
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import db
+from models.company import Department
+from models.company_counter import CompanyCounter
+from models.department_table import DepartmentTable, TableRow
+from models.project import Project
+from models.ticket import Ticket
+from models.user import User
+
+COUNTERS = ('departments', 'employees', 'projects', 'tickets', 'tables', 'entries')
+OPEN_TICKET_STATUSES = ('en_attente', 'en_cours', 'reouvert')
+
+
+# ==================== RECOMPTAGE ====================
+
+def count_company(company_id: int) -> Dict[str, int]:
+    """Les six totaux de l'entreprise en une seule requête (sous-requêtes scalaires)"""
+    departments = select(func.count(Department.id)).where(
+        Department.company_id == company_id,
+        Department.is_active == True,
+        Department.deleted_at == None
+    )
+    employees = select(func.count(User.id)).where(
+        User.company_id == company_id,
+        User.is_active == True
+    )
+    projects = select(func.count(Project.id)).where(
+        Project.company_id == company_id,
+        Project.status == 'active'
+    )
+    # Tickets rattachés à l'entreprise de leur créateur
+    tickets = select(func.count(Ticket.id)).join(
+        User, User.id == Ticket.created_by_id
+    ).where(
+        User.company_id == company_id,
+        Ticket.status.in_(OPEN_TICKET_STATUSES)
+    )
+    tables = select(func.count(DepartmentTable.id)).join(
+        Department, Department.id == DepartmentTable.department_id
+    ).where(
+        Department.company_id == company_id,
+        DepartmentTable.is_active == True,
+        Department.deleted_at == None
+    )
+    entries = select(func.count(TableRow.id)).join(
+        DepartmentTable, DepartmentTable.id == TableRow.table_id
+    ).join(
+        Department, Department.id == DepartmentTable.department_id
+    ).where(
+        Department.company_id == company_id,
+        TableRow.is_active == True,
+        Department.deleted_at == None
+    )
+
+    row = db.session.execute(select(
+        departments.scalar_subquery().label('departments'),
+        employees.scalar_subquery().label('employees'),
+        projects.scalar_subquery().label('projects'),
+        tickets.scalar_subquery().label('tickets'),
+        tables.scalar_subquery().label('tables'),
+        entries.scalar_subquery().label('entries')
+    )).one()
+    return {name: value or 0 for name, value in row._mapping.items()}
+
+
+def refresh_company_counters(company_id: int) -> Dict[str, int]:
+    """Recompte et enregistre les compteurs de l'entreprise (valide la transaction)"""
+    counts = count_company(company_id)
+    counter = db.session.get(CompanyCounter, company_id)
+    if counter is None:
+        counter = CompanyCounter(company_id=company_id)
+        db.session.add(counter)
+    for name, value in counts.items():
+        setattr(counter, name, value)
+    counter.is_stale = False
+    counter.refreshed_at = datetime.utcnow()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Compteur créé en parallèle par une autre requête : ses valeurs sont aussi fraîches
+        db.session.rollback()
+    return counts
+
+
+def get_company_counters(company_id: int, max_age: Optional[float] = 3600) -> Dict[str, int]:
+    """Compteurs de l'entreprise ; recomptés seulement s'ils sont absents, périmés ou trop anciens"""
+    if company_id is None:
+        return dict.fromkeys(COUNTERS, 0)
+    counter = db.session.get(CompanyCounter, company_id)
+    if counter is None or counter.is_stale or (
+        max_age and (counter.refreshed_at is None
+                     or counter.refreshed_at < datetime.utcnow() - timedelta(seconds=max_age))
+    ):
+        return refresh_company_counters(company_id)
+    return counter.to_dict()
+
+
+# ==================== DELTAS ====================
+
+def add_counter_deltas(connection, deltas: Dict[int, Dict[str, int]]):
+    """Applique {company_id: {compteur: delta}} (sans effet si le compteur n'existe pas encore)"""
+    table = CompanyCounter.__table__
+    for company_id, counts in deltas.items():
+        values = {name: table.c[name] + delta for name, delta in counts.items() if delta}
+        if company_id and values:
+            connection.execute(update(table).where(table.c.company_id == company_id).values(**values))
+
+
+def mark_counters_stale(connection, company_ids):
+    """Force un recomptage à la prochaine lecture (changements non exprimables en deltas)"""
+    company_ids = {company_id for company_id in company_ids if company_id}
+    if company_ids:
+        table = CompanyCounter.__table__
+        connection.execute(update(table).where(table.c.company_id.in_(company_ids)).values(is_stale=True))
+
+
+class _Owners:
+    """Résolution des entreprises pendant un flush, par requêtes Core mémorisées"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._users = {}
+        self._departments = {}
+        self._tables = {}
+
+    def user_company(self, user_id):
+        if user_id not in self._users:
+            self._users[user_id] = self.connection.execute(
+                select(User.__table__.c.company_id).where(User.__table__.c.id == user_id)
+            ).scalar()
+        return self._users[user_id]
+
+    def live_department_company(self, department_id):
+        """Entreprise d'un département non supprimé (None sinon : ses tables ne comptent pas)"""
+        if department_id not in self._departments:
+            departments = Department.__table__
+            row = self.connection.execute(
+                select(departments.c.company_id, departments.c.deleted_at).where(departments.c.id == department_id)
+            ).first()
+            self._departments[department_id] = row[0] if row and row[1] is None else None
+        return self._departments[department_id]
+
+    def table_company(self, table_id):
+        if table_id not in self._tables:
+            tables = DepartmentTable.__table__
+            department_id = self.connection.execute(
+                select(tables.c.department_id).where(tables.c.id == table_id)
+            ).scalar()
+            self._tables[table_id] = self.live_department_company(department_id) if department_id else None
+        return self._tables[table_id]
+
+
+# counter : colonne de CompanyCounter ; fields : attributs lus ; counts(valeurs) : l'objet compte-t-il ?
+# company(valeurs, owners) : entreprise ; structural : attributs dont le changement (ou la suppression
+# de l'objet si on_delete_stale) déplace d'autres compteurs -> recomptage
+CounterSpec = namedtuple('CounterSpec', 'counter fields counts company structural on_delete_stale')
+
+COUNTER_SPECS = {
+    Department: CounterSpec(
+        'departments', ('company_id', 'is_active', 'deleted_at'),
+        lambda v: v['is_active'] and v['deleted_at'] is None,
+        lambda v, owners: v['company_id'],
+        ('company_id', 'deleted_at'), True
+    ),
+    User: CounterSpec(
+        'employees', ('company_id', 'is_active'),
+        lambda v: v['is_active'],
+        lambda v, owners: v['company_id'],
+        (), False
+    ),
+    Project: CounterSpec(
+        'projects', ('company_id', 'status'),
+        lambda v: v['status'] == 'active',
+        lambda v, owners: v['company_id'],
+        (), False
+    ),
+    Ticket: CounterSpec(
+        'tickets', ('created_by_id', 'status'),
+        lambda v: v['status'] in OPEN_TICKET_STATUSES,
+        lambda v, owners: owners.user_company(v['created_by_id']),
+        (), False
+    ),
+    DepartmentTable: CounterSpec(
+        'tables', ('department_id', 'is_active'),
+        lambda v: v['is_active'],
+        lambda v, owners: owners.live_department_company(v['department_id']),
+        ('department_id',), True
+    ),
+    TableRow: CounterSpec(
+        'entries', ('table_id', 'is_active'),
+        lambda v: v['is_active'],
+        lambda v, owners: owners.table_company(v['table_id']),
+        (), False
+    ),
+}
+
+
+def _snapshot(obj, fields, state):
+    """(valeurs avant, valeurs après, attributs modifiés) ; avant/après None selon l'état"""
+    if state == 'new':
+        return None, {field: getattr(obj, field) for field in fields}, set(fields)
+    if state == 'deleted':
+        return {field: getattr(obj, field) for field in fields}, None, set(fields)
+
+    attrs = inspect(obj).attrs
+    before, after, changed = {}, {}, set()
+    for field in fields:
+        history = attrs[field].history
+        after[field] = getattr(obj, field)
+        before[field] = history.deleted[0] if history.deleted else after[field]
+        if history.has_changes():
+            changed.add(field)
+    return before, after, changed
+
+
+def _apply_flush(session, flush_context):
+    owners = None
+    deltas = defaultdict(Counter)
+    stale = set()
+
+    for state, objects in (('new', session.new), ('dirty', session.dirty), ('deleted', session.deleted)):
+        for obj in objects:
+            spec = COUNTER_SPECS.get(type(obj))
+            if spec is None:
+                continue
+            before, after, changed = _snapshot(obj, spec.fields, state)
+            if not changed:
+                continue
+            if owners is None:
+                owners = _Owners(session.connection())
+
+            for values, sign in ((before, -1), (after, 1)):
+                if values is not None and spec.counts(values):
+                    deltas[spec.company(values, owners)][spec.counter] += sign
+
+            moved = (state == 'deleted' and spec.on_delete_stale) or (
+                state == 'dirty' and changed & set(spec.structural)
+            )
+            if moved:
+                stale.update(spec.company(values, owners) for values in (before, after) if values is not None)
+
+    if owners is not None:
+        add_counter_deltas(owners.connection, deltas)
+        mark_counters_stale(owners.connection, stale)
+
+
+_tracking = False
+
+
+def track_company_counters():
+    """Applique les deltas des compteurs à chaque flush (une fois par processus)"""
+    global _tracking
+    if not _tracking:
+        event.listen(Session, 'after_flush', _apply_flush)
+        _tracking = True
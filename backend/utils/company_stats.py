@@ -0,0 +1,141 @@
+# utils/company_stats.py
+"""Statistiques d'entreprise : agrégats groupés en un nombre constant de requêtes, cache à durée de vie courte"""
+from datetime import date, datetime, timedelta
+from typing import Any, Dict
+
+from sqlalchemy import func
+
+from database import db
+from models.company import Department
+from models.department_table import DepartmentTable, TableRow
+from models.user import User
+from utils.cache import TTLCache
+
+DAY_NAMES = ['Lun', 'Mar', 'Mer', 'Jeu', 'Ven', 'Sam', 'Dim']
+ROLES = ['admin', 'department_manager', 'employee', 'technician']
+
+stats_cache = TTLCache()
+
+
+def get_company_stats(company, ttl: float = 30) -> Dict[str, Any]:
+    """Statistiques de l'entreprise, recalculées au plus une fois par ttl secondes (0 : sans cache)"""
+    if ttl <= 0:
+        return compute_company_stats(company)
+    stats = stats_cache.get(company.id)
+    if stats is None:
+        stats = compute_company_stats(company)
+        stats_cache.set(company.id, stats, ttl)
+    return stats
+
+
+def _day_key(value) -> str:
+    """func.date() retourne une date (MySQL) ou une chaîne AAAA-MM-JJ (SQLite)"""
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m-%d')
+    return str(value)[:10]
+
+
+def compute_company_stats(company) -> Dict[str, Any]:
+    """
+    Calcule les statistiques de la page entreprise avec un nombre constant de requêtes :
+    une requête GROUP BY département pour les tables, les entrées et les employés,
+    une GROUP BY date pour l'activité, une GROUP BY rôle ; les totaux en sont déduits.
+    """
+    departments = Department.query.filter_by(
+        company_id=company.id,
+        deleted_at=None
+    ).all()
+    department_ids = [dept.id for dept in departments]
+
+    users_count = User.query.filter_by(
+        company_id=company.id,
+        is_active=True
+    ).count()
+
+    tables_by_department = {}
+    entries_by_department = {}
+    employees_by_department = {}
+    activity = {}
+
+    # Fenêtre des 7 derniers jours (du jour J-7 à la veille, jours entiers)
+    first_day = (datetime.utcnow() - timedelta(days=7)).replace(hour=0, minute=0, second=0, microsecond=0)
+    days = [first_day + timedelta(days=i) for i in range(7)]
+
+    if department_ids:
+        tables_by_department = dict(db.session.query(
+            DepartmentTable.department_id, func.count(DepartmentTable.id)
+        ).filter(
+            DepartmentTable.department_id.in_(department_ids)
+        ).group_by(DepartmentTable.department_id).all())
+
+        entries_by_department = dict(db.session.query(
+            DepartmentTable.department_id, func.count(TableRow.id)
+        ).join(
+            TableRow, TableRow.table_id == DepartmentTable.id
+        ).filter(
+            DepartmentTable.department_id.in_(department_ids)
+        ).group_by(DepartmentTable.department_id).all())
+
+        employees_by_department = dict(db.session.query(
+            User.department_id, func.count(User.id)
+        ).filter(
+            User.department_id.in_(department_ids),
+            User.is_active == True
+        ).group_by(User.department_id).all())
+
+        created_day = func.date(TableRow.created_at)
+        activity = {
+            _day_key(day): (entries, active_users)
+            for day, entries, active_users in db.session.query(
+                created_day,
+                func.count(TableRow.id),
+                func.count(func.distinct(TableRow.created_by_id))
+            ).join(
+                DepartmentTable, DepartmentTable.id == TableRow.table_id
+            ).filter(
+                DepartmentTable.department_id.in_(department_ids),
+                TableRow.created_at >= days[0],
+                TableRow.created_at < days[-1] + timedelta(days=1)
+            ).group_by(created_day).all()
+        }
+
+    dept_stats = [{
+        'id': dept.id,
+        'name': dept.name,
+        'employees_count': employees_by_department.get(dept.id, 0),
+        'tables_count': tables_by_department.get(dept.id, 0),
+        'entries_count': entries_by_department.get(dept.id, 0),
+        'budget': float(dept.budget) if dept.budget else 0,
+        'budget_spent': float(dept.budget_spent) if dept.budget_spent else 0
+    } for dept in departments]
+
+    daily_activity = []
+    for day in days:
+        key = day.strftime('%Y-%m-%d')
+        entries, active_users = activity.get(key, (0, 0))
+        daily_activity.append({
+            'date': key,
+            'day_name': DAY_NAMES[day.weekday()],
+            'entries': entries,
+            # Utilisateurs ayant saisi au moins une entrée ce jour-là
+            'active_users': active_users
+        })
+
+    roles = dict(db.session.query(User.role, func.count(User.id)).filter(
+        User.company_id == company.id,
+        User.is_active == True
+    ).group_by(User.role).all())
+
+    return {
+        'departments_count': len(departments),
+        'users_count': users_count,
+        'tables_count': sum(tables_by_department.values()),
+        'total_entries': sum(entries_by_department.values()),
+        'departments': dept_stats,
+        'daily_activity': daily_activity,
+        'role_distribution': {role: roles.get(role, 0) for role in ROLES},
+        'company': {
+            'name': company.name,
+            'created_at': company.created_at.isoformat() if company.created_at else None
+        }
+    }
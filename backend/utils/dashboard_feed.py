@@ -0,0 +1,181 @@
+# utils/dashboard_feed.py
+"""Mises à jour en direct des dashboards : les widgets dont les données ont changé sont poussés par Socket.IO"""
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Dict, Iterable
+
+from database import db
+from models.dashboard import DashboardWidget
+from models.user import User
+from utils.widget_engine import widget_engine
+
+logger = logging.getLogger(__name__)
+
+FILTER_KEYS = ('time_filter', 'department_id', 'start_date', 'end_date')
+
+
+def _digest(data) -> str:
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class Subscription:
+    """Widgets d'un utilisateur suivis avec un jeu de filtres, pour une ou plusieurs connexions"""
+
+    def __init__(self, user_id: int, filters: Dict[str, Any]):
+        self.user_id = user_id
+        self.filters = filters
+        self.widget_ids = set()
+        self.sids = set()
+        self.digests = {}  # widget_id -> empreinte du dernier envoi
+
+
+class DashboardFeed:
+    """
+    Flux de changements des dashboards ouverts :
+    - le moteur de widgets signale les sources invalidées au commit (add_listener) ;
+    - un thread regroupe les signaux (debounce), recalcule seulement les widgets abonnés
+      de ces sources, et pousse ceux dont le résultat a changé dans la room user_<id>.
+    Propre au processus : seules les connexions de ce processus sont servies.
+    """
+
+    def __init__(self, engine, debounce: float = 1.0):
+        self.engine = engine
+        self.debounce = debounce
+        self.app = None
+        self.socketio = None
+        self._subscriptions: Dict[tuple, Subscription] = {}
+        self._lock = threading.Lock()
+        self._stale = set()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def init_app(self, app, socketio):
+        self.app = app
+        self.socketio = socketio
+        self.debounce = app.config.get('DASHBOARD_PUSH_DEBOUNCE', self.debounce)
+        app.extensions['dashboard_feed'] = self
+        self.engine.add_listener(self.notify)
+
+    # ==================== ABONNEMENTS ====================
+
+    @staticmethod
+    def normalize_filters(data: Dict[str, Any]) -> Dict[str, Any]:
+        filters = {key: data.get(key) or None for key in FILTER_KEYS}
+        filters['time_filter'] = filters['time_filter'] or 'week'
+        return filters
+
+    def subscribe(self, sid: str, user, widget_ids: Iterable[int], filters: Dict[str, Any]) -> Subscription:
+        """Remplace l'abonnement de la connexion sid ; les empreintes partent des données actuelles"""
+        self.unsubscribe(sid)
+        key = (user.id, tuple(sorted(filters.items(), key=lambda item: item[0])))
+        widget_ids = {int(wid) for wid in widget_ids}
+
+        # Empreintes initiales : le client vient de charger ces données (le plus souvent depuis le cache)
+        widgets = DashboardWidget.query.filter(
+            DashboardWidget.user_id == user.id,
+            DashboardWidget.id.in_(widget_ids)
+        ).all() if widget_ids else []
+        results = self._compute(widgets, user, filters)
+
+        with self._lock:
+            subscription = self._subscriptions.get(key)
+            if subscription is None:
+                subscription = self._subscriptions[key] = Subscription(user.id, filters)
+            subscription.sids.add(sid)
+            subscription.widget_ids |= widget_ids
+            for widget_id, data in results.items():
+                subscription.digests[widget_id] = _digest(data)
+        return subscription
+
+    def unsubscribe(self, sid: str):
+        with self._lock:
+            for key, subscription in list(self._subscriptions.items()):
+                subscription.sids.discard(sid)
+                if not subscription.sids:
+                    del self._subscriptions[key]
+
+    # ==================== CHANGEMENTS ====================
+
+    def _compute(self, widgets, user, filters):
+        return self.engine.get_many(
+            widgets, user, filters['time_filter'], filters['department_id'],
+            filters['start_date'], filters['end_date']
+        )
+
+    def notify(self, sources):
+        """Appelé au commit par le moteur : ne fait que noter les sources et réveiller le thread"""
+        if not self._subscriptions:
+            return
+        with self._lock:
+            self._stale |= set(sources)
+        self._wakeup.set()
+        self._ensure_started()
+
+    def push(self, sources) -> int:
+        """Recalcule les widgets abonnés des sources données et pousse les changements ; retourne le nombre d'envois"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.values())
+
+        sent = 0
+        for subscription in subscriptions:
+            widgets = DashboardWidget.query.filter(
+                DashboardWidget.user_id == subscription.user_id,
+                DashboardWidget.id.in_(subscription.widget_ids),
+                DashboardWidget.data_source.in_(sources)
+            ).all()
+            if not widgets:
+                continue
+            user = User.query.get(subscription.user_id)
+            if user is None or not user.is_active:
+                continue
+
+            results = self._compute(widgets, user, subscription.filters)
+            changed = {}
+            for widget_id, data in results.items():
+                digest = _digest(data)
+                if subscription.digests.get(widget_id) != digest:
+                    subscription.digests[widget_id] = digest
+                    changed[str(widget_id)] = data
+            if changed:
+                self.socketio.emit('dashboard_widgets', {
+                    'filters': subscription.filters,
+                    'widgets': changed
+                }, room=f'user_{subscription.user_id}')
+                sent += 1
+        return sent
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='dashboard-feed', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait()
+            # Regrouper les commits rapprochés en un seul recalcul
+            if self._stop.wait(self.debounce):
+                return
+            self._wakeup.clear()
+            with self._lock:
+                sources, self._stale = self._stale, set()
+            if not sources:
+                continue
+            with self.app.app_context():
+                try:
+                    self.push(sources)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Erreur lors de l'envoi des mises à jour du dashboard: {e}")
+
+
+dashboard_feed = DashboardFeed(widget_engine)
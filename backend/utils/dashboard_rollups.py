@@ -0,0 +1,340 @@
+# utils/dashboard_rollups.py
+"""
+Agrégats quotidiens des widgets (tickets, embauches, présences, paie) :
+les modifications inscrivent les jours touchés (RollupMark) dans leur transaction,
+un worker recalcule ces jours seulement, et les widgets lisent O(jours) lignes au lieu de O(lignes).
+"""
+import logging
+import threading
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Date, event, func, inspect, literal, select
+from sqlalchemy.orm import Session
+
+from database import db
+from models.dashboard_rollup import DailyRollup, RollupMark
+from models.payroll import Attendance, Payslip
+from models.ticket import Ticket
+from models.user import User
+
+logger = logging.getLogger(__name__)
+
+# model : table source ; day_column : jour de rattachement ; join : condition vers User (entreprise)
+# dimensions : {dimension: (colonne groupée ou None, montant sommé ou None)}
+# fields : attributs dont la modification change les agrégats
+RollupSource = namedtuple('RollupSource', 'name model day_column join department_column dimensions fields')
+
+ROLLUP_SOURCES = {
+    source.name: source for source in (
+        RollupSource(
+            'tickets', Ticket, Ticket.created_at, Ticket.created_by_id == User.id, Ticket.department_id,
+            {'status': (Ticket.status, None), 'priority': (Ticket.priority, None)},
+            ('created_at', 'status', 'priority', 'department_id', 'created_by_id')
+        ),
+        RollupSource(
+            'employees', User, User.created_at, None, User.department_id,
+            {'hires': (None, None)},
+            ('created_at', 'department_id', 'company_id')
+        ),
+        RollupSource(
+            'attendance', Attendance, Attendance.date, Attendance.user_id == User.id, User.department_id,
+            {'status': (Attendance.status, None)},
+            ('date', 'status', 'user_id')
+        ),
+        RollupSource(
+            'payroll', Payslip, Payslip.created_at, Payslip.user_id == User.id, User.department_id,
+            {'net': (None, Payslip.net_salary)},
+            ('created_at', 'net_salary', 'user_id')
+        ),
+    )
+}
+
+SOURCES_BY_MODEL = {source.model: source for source in ROLLUP_SOURCES.values()}
+
+
+def _as_day(value) -> Optional[date]:
+    """func.date() retourne une date (MySQL) ou une chaîne AAAA-MM-JJ (SQLite)"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if value:
+        return date.fromisoformat(str(value)[:10])
+    return None
+
+
+# ==================== CALCUL ====================
+
+def recompute(source_name: str, first_day: date, last_day: date) -> int:
+    """
+    Recalcule les agrégats d'une source sur [first_day, last_day] pour toutes les entreprises :
+    une requête GROUP BY jour/entreprise/département par dimension. Ne valide pas la transaction.
+    """
+    source = ROLLUP_SOURCES[source_name]
+    day_column = source.day_column
+    is_date = isinstance(day_column.type, Date)
+    day_expr = day_column if is_date else func.date(day_column)
+
+    DailyRollup.query.filter(
+        DailyRollup.source == source.name,
+        DailyRollup.day >= first_day,
+        DailyRollup.day <= last_day
+    ).delete(synchronize_session=False)
+
+    rows = []
+    for dimension, (bucket_column, amount_column) in source.dimensions.items():
+        groups = [day_expr, User.company_id, source.department_column]
+        if bucket_column is not None:
+            groups.append(bucket_column)
+        query = db.session.query(
+            *groups,
+            bucket_column if bucket_column is not None else literal(''),
+            func.count(),
+            func.sum(amount_column) if amount_column is not None else literal(0)
+        ).select_from(source.model)
+        if source.join is not None:
+            query = query.join(User, source.join)
+        if is_date:
+            query = query.filter(day_column >= first_day, day_column <= last_day)
+        else:
+            query = query.filter(
+                day_column >= datetime.combine(first_day, datetime.min.time()),
+                day_column < datetime.combine(last_day + timedelta(days=1), datetime.min.time())
+            )
+        query = query.filter(User.company_id.isnot(None)).group_by(*groups)
+
+        for row in query:
+            day, company_id, department_id = row[:3]
+            bucket, count, amount = row[-3:]
+            rows.append({
+                'company_id': company_id,
+                'department_id': department_id or 0,
+                'day': _as_day(day),
+                'source': source.name,
+                'dimension': dimension,
+                'bucket': bucket if bucket is not None else '',
+                'count': count,
+                'amount': amount or 0
+            })
+
+    if rows:
+        db.session.execute(DailyRollup.__table__.insert(), rows)
+    return len(rows)
+
+
+def backfill(first_day: date, last_day: date, chunk_days: int = 31, sources=None):
+    """Recalcule toutes les sources par tranches de chunk_days jours (une transaction par tranche)"""
+    for name in sources or ROLLUP_SOURCES:
+        day = first_day
+        while day <= last_day:
+            chunk_end = min(day + timedelta(days=chunk_days - 1), last_day)
+            rows = recompute(name, day, chunk_end)
+            db.session.commit()
+            yield name, day, chunk_end, rows
+            day = chunk_end + timedelta(days=1)
+
+
+def process_marks(limit: int = 10000) -> List[Tuple[str, date]]:
+    """Recalcule les jours marqués depuis le dernier passage, puis efface leurs marques"""
+    marks = db.session.query(RollupMark.id, RollupMark.source, RollupMark.day).order_by(
+        RollupMark.id
+    ).limit(limit).all()
+    if not marks:
+        return []
+
+    marked = sorted({(source_name, day) for _, source_name, day in marks})
+    for source_name, day in marked:
+        if source_name in ROLLUP_SOURCES:
+            recompute(source_name, day, day)
+
+    # Seulement les marques lues : une transaction encore ouverte peut valider plus tard
+    # une marque d'id inférieur, qui devra être traitée au prochain passage
+    mark_ids = [mark_id for mark_id, _, _ in marks]
+    for start in range(0, len(mark_ids), 1000):
+        RollupMark.query.filter(
+            RollupMark.id.in_(mark_ids[start:start + 1000])
+        ).delete(synchronize_session=False)
+    db.session.commit()
+    return marked
+
+
+def bootstrap_marks() -> int:
+    """
+    Premier démarrage (aucun agrégat ni marque) : marque chaque jour ayant des données,
+    pour que le worker construise l'historique sans backfill manuel. Retourne le nombre de marques.
+    """
+    if db.session.query(DailyRollup.id).first() or db.session.query(RollupMark.id).first():
+        return 0
+
+    created = 0
+    now = datetime.utcnow()
+    marks = RollupMark.__table__
+    for source in ROLLUP_SOURCES.values():
+        day_column = source.day_column
+        day_expr = day_column if isinstance(day_column.type, Date) else func.date(day_column)
+        days = select(literal(source.name), day_expr, literal(now)).where(
+            day_column.isnot(None)
+        ).distinct()
+        result = db.session.execute(marks.insert().from_select(['source', 'day', 'created_at'], days))
+        created += result.rowcount or 0
+    db.session.commit()
+    return created
+
+
+# ==================== LECTURE ====================
+
+def _rollup_query(columns, company_id, department_id, source, dimension, first_day, last_day):
+    query = db.session.query(*columns).filter(
+        DailyRollup.company_id == company_id,
+        DailyRollup.source == source,
+        DailyRollup.dimension == dimension,
+        DailyRollup.day >= first_day,
+        DailyRollup.day <= last_day
+    )
+    if department_id:
+        query = query.filter(DailyRollup.department_id == int(department_id))
+    return query
+
+
+def rollup_totals(company_id, department_id, source: str, dimension: str,
+                  first_day: date, last_day: date) -> Dict[str, Tuple[int, float]]:
+    """{bucket: (nombre, montant)} sur la période ; department_id None : toute l'entreprise"""
+    query = _rollup_query(
+        (DailyRollup.bucket, func.sum(DailyRollup.count), func.sum(DailyRollup.amount)),
+        company_id, department_id, source, dimension, first_day, last_day
+    ).group_by(DailyRollup.bucket)
+    return {bucket: (int(count or 0), float(amount or 0)) for bucket, count, amount in query}
+
+
+def rollup_daily(company_id, department_id, source: str, dimension: str, first_day: date,
+                 last_day: date, bucket: Optional[str] = None) -> List[Tuple[date, int, float]]:
+    """[(jour, nombre, montant)] par jour, pour un bucket ou tous"""
+    query = _rollup_query(
+        (DailyRollup.day, func.sum(DailyRollup.count), func.sum(DailyRollup.amount)),
+        company_id, department_id, source, dimension, first_day, last_day
+    )
+    if bucket is not None:
+        query = query.filter(DailyRollup.bucket == bucket)
+    query = query.group_by(DailyRollup.day).order_by(DailyRollup.day)
+    return [(_as_day(day), int(count or 0), float(amount or 0)) for day, count, amount in query]
+
+
+# ==================== SUIVI DES MODIFICATIONS ====================
+
+def _changed_days(source: RollupSource, obj, state: str):
+    """Jours touchés par un objet : jour courant, et ancien jour si la date a changé"""
+    day_attr = source.day_column.key
+    if state == 'dirty':
+        attrs = inspect(obj).attrs
+        if not any(attrs[field].history.has_changes() for field in source.fields):
+            return set()
+        history = attrs[day_attr].history
+        days = {_as_day(value) for value in list(history.deleted) + list(history.unchanged)
+                + list(history.added)}
+    else:
+        days = {_as_day(getattr(obj, day_attr))}
+    days.discard(None)
+    return days or {datetime.utcnow().date()}
+
+
+def _mark_changes(session, flush_context):
+    marks = set()
+    for state, objects in (('new', session.new), ('dirty', session.dirty), ('deleted', session.deleted)):
+        for obj in objects:
+            source = SOURCES_BY_MODEL.get(type(obj))
+            if source is not None:
+                marks.update((source.name, day) for day in _changed_days(source, obj, state))
+    if marks:
+        session.connection().execute(
+            RollupMark.__table__.insert(),
+            [{'source': name, 'day': day, 'created_at': datetime.utcnow()} for name, day in marks]
+        )
+
+
+_tracking = False
+
+
+def track_changes():
+    """Inscrit les jours à recalculer à chaque flush (une fois par processus)"""
+    global _tracking
+    if not _tracking:
+        event.listen(Session, 'after_flush', _mark_changes)
+        _tracking = True
+
+
+# ==================== WORKER ====================
+
+class RollupWorker:
+    """
+    Recalcule périodiquement les jours marqués, hors du chemin des requêtes.
+    Au démarrage sur une base sans agrégats, tout l'historique est marqué (bootstrap_marks).
+    """
+
+    def __init__(self, app, interval: float = 60):
+        """
+        Args:
+            app: Application Flask (contexte des recalculs)
+            interval: Période de traitement des marques (secondes)
+        """
+        self.app = app
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        track_changes()
+
+    def start(self):
+        """Démarre le traitement périodique"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='dashboard-rollups', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Arrête le traitement périodique"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def bootstrap(self) -> int:
+        """Marque tout l'historique si aucun agrégat n'a encore été calculé"""
+        with self.app.app_context():
+            try:
+                created = bootstrap_marks()
+            except Exception:
+                db.session.rollback()
+                raise
+        if created:
+            logger.info(f"Agrégats du dashboard absents : {created} jour(s) marqué(s) pour recalcul")
+        return created
+
+    def check(self) -> List[Tuple[str, date]]:
+        """Traite les marques une fois ; retourne les (source, jour) recalculés"""
+        from utils.widget_engine import widget_engine
+
+        with self.app.app_context():
+            try:
+                marked = process_marks()
+            except Exception:
+                db.session.rollback()
+                raise
+        if marked:
+            # Écritures en masse, invisibles pour les événements de session : invalider explicitement
+            widget_engine.invalidate_tables({DailyRollup.__tablename__})
+        return marked
+
+    def _run(self):
+        try:
+            self.bootstrap()
+        except Exception as e:
+            logger.error(f"Erreur lors de l'initialisation des agrégats du dashboard: {e}")
+
+        # Premier passage immédiat : l'historique marqué au démarrage est construit sans attendre
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Erreur lors du recalcul des agrégats du dashboard: {e}")
+            if self._stop.wait(self.interval):
+                return
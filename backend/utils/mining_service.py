@@ -0,0 +1,355 @@
+# utils/mining_service.py
+"""Service de minage en arrière-plan : la preuve de travail ne tourne jamais dans un worker HTTP"""
+import logging
+import queue
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def solve_block(block: Dict[str, Any], difficulty: int) -> Dict[str, Any]:
+    """Résout entièrement la preuve de travail d'un bloc et retourne le nonce et le hash"""
+    from models.blockchain import Blockchain
+
+    block_hash = Blockchain.compute_proof_of_work(block, difficulty)
+    return {'nonce': block['nonce'], 'hash': block_hash}
+
+
+def scan_nonce_range(block: Dict[str, Any], difficulty: int,
+                     start: int, count: int) -> Optional[Tuple[int, str]]:
+    """Exécuté dans un processus du pool : teste un lot de nonces"""
+    from models.blockchain import BlockHasher
+
+    return BlockHasher(block).scan(start, count, difficulty)
+
+
+class MiningService:
+    """File de jobs de minage traitée par un thread dédié et un pool de processus"""
+
+    # Nombre maximum de jobs terminés conservés pour la consultation du statut
+    MAX_FINISHED_JOBS = 200
+
+    # Nombre de tentatives si la chaîne a avancé pendant le minage
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, app, blockchain, max_workers: int = 2):
+        """
+        Args:
+            app: Application Flask (contexte pour les callbacks)
+            blockchain: Instance de la blockchain
+            max_workers: Nombre de processus du pool de minage
+        """
+        self.app = app
+        self.blockchain = blockchain
+        self.max_workers = max_workers
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._queued_job_id = None
+        self._watched = {}  # id de transaction -> {'height', 'miner', 'callbacks'}
+        self._executor = None
+        self._worker = None
+
+    def submit(self, miner_address: str,
+               on_mined: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Planifie le minage des transactions en attente et retourne le job immédiatement.
+        Un job encore en file est réutilisé : les demandes rapprochées produisent un seul bloc.
+        """
+        with self._lock:
+            job = self.jobs.get(self._queued_job_id)
+            if job is None or job['status'] != 'queued':
+                job = {
+                    'id': uuid.uuid4().hex,
+                    'status': 'queued',
+                    'miner': miner_address,
+                    'created_at': datetime.utcnow().isoformat(),
+                    'started_at': None,
+                    'finished_at': None,
+                    'block_index': None,
+                    'block_hash': None,
+                    'transactions_count': 0,
+                    'error': None,
+                    'callbacks': []
+                }
+                self.jobs[job['id']] = job
+                self._queued_job_id = job['id']
+                self._queue.put(job['id'])
+                self._trim_jobs()
+
+            if on_mined:
+                job['callbacks'].append(on_mined)
+
+            self._ensure_worker()
+            return self._public(job)
+
+    def submit_transaction(self, miner_address: str, transaction: Dict[str, Any],
+                           on_mined: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+        """
+        Ajoute la transaction, planifie son minage et appelle on_mined(bloc) avec le bloc qui la
+        contient réellement : elle peut être minée par un autre worker, ou rester hors du bloc du
+        job (plafond max_block_transactions), auquel cas un nouveau minage est planifié.
+        """
+        height = len(self.blockchain.chain)
+        self.blockchain.add_transaction(transaction)
+        with self._lock:
+            watch = self._watched.setdefault(
+                transaction['id'], {'height': height, 'miner': miner_address, 'callbacks': []}
+            )
+            watch['callbacks'].append(on_mined)
+        return self.submit(miner_address)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Retourne le statut d'un job"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return self._public(job) if job else None
+
+    def shutdown(self):
+        """Arrête le thread de minage et le pool de processus"""
+        self._queue.put(None)
+        if self._worker:
+            self._worker.join(timeout=10)
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name='blockchain-miner', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        """Boucle du thread de minage : un bloc à la fois pour garder la chaîne continue"""
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                break
+
+            with self._lock:
+                job = self.jobs.get(job_id)
+                if job is None:
+                    continue
+                if self._queued_job_id == job_id:
+                    self._queued_job_id = None
+                job['status'] = 'running'
+                job['started_at'] = datetime.utcnow().isoformat()
+
+            try:
+                self._mine(job)
+            except Exception as e:
+                logger.error(f"Erreur lors du minage (job {job_id}): {e}")
+                self._finish(job, 'failed', error=str(e))
+                continue
+
+            try:
+                self._resolve_watched()
+            except Exception as e:
+                logger.error(f"Erreur lors du suivi des transactions minées: {e}")
+
+    def _mine(self, job: Dict[str, Any]):
+        for _ in range(self.MAX_ATTEMPTS):
+            block = self.blockchain.prepare_block(job['miner'])
+            if block is None:
+                self._finish(job, 'empty')
+                return
+
+            result = self._solve(block)
+            block['nonce'] = result['nonce']
+            block['hash'] = result['hash']
+
+            if self.blockchain.append_mined_block(block):
+                with self._lock:
+                    job['block_index'] = block['index']
+                    job['block_hash'] = block['hash']
+                    job['transactions_count'] = len(block['transactions'])
+                self._finish(job, 'completed')
+                self._run_callbacks(job, block)
+                return
+
+            logger.warning(f"La chaîne a avancé pendant le minage du bloc {block['index']}, nouvel essai")
+
+        self._finish(job, 'failed', error='La chaîne a changé pendant le minage')
+
+    def _solve(self, block: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Résout la preuve de travail dans le pool, ou dans ce thread si le pool est indisponible.
+        L'espace des nonces est découpé en lots répartis sur les processus ; à chaque tour le plus
+        petit nonce trouvé l'emporte.
+        """
+        difficulty = self.blockchain.difficulty
+        executor = self._get_executor()
+        if executor is None:
+            return solve_block(block, difficulty)
+
+        batch_size = self.blockchain.NONCE_BATCH_SIZE
+        start = 0
+        try:
+            while True:
+                futures = [
+                    executor.submit(scan_nonce_range, block, difficulty,
+                                    start + i * batch_size, batch_size)
+                    for i in range(self.max_workers)
+                ]
+                start += self.max_workers * batch_size
+
+                found = [result for result in (f.result() for f in futures) if result]
+                if found:
+                    nonce, block_hash = min(found)
+                    return {'nonce': nonce, 'hash': block_hash}
+        except BrokenProcessPool:
+            logger.error("Pool de minage interrompu, recréation au prochain job")
+            self._executor = None
+            return solve_block(block, difficulty)
+
+    def _get_executor(self):
+        if self._executor is None:
+            try:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            except (OSError, NotImplementedError) as e:
+                logger.warning(f"Pool de processus indisponible, minage dans le thread dédié: {e}")
+                return None
+        return self._executor
+
+    def _run_callbacks(self, job: Dict[str, Any], block: Dict[str, Any]):
+        for callback in job['callbacks']:
+            try:
+                with self.app.app_context():
+                    callback(block)
+            except Exception as e:
+                logger.error(f"Erreur dans le callback de minage (job {job['id']}): {e}")
+
+    def _resolve_watched(self):
+        """
+        Après un job : rappelle chaque transaction suivie avec le bloc qui la contient (parcours des
+        seuls blocs ajoutés depuis son ajout) ; une transaction encore en attente est reminée.
+        """
+        with self._lock:
+            watched = dict(self._watched)
+        if not watched:
+            return
+
+        found = {}
+        for block in self.blockchain.iter_chain(min(watch['height'] for watch in watched.values())):
+            for transaction in block.get('transactions', []):
+                if transaction.get('id') in watched:
+                    found[transaction['id']] = block
+        pending_ids = {transaction.get('id') for transaction in list(self.blockchain.pending_transactions)}
+
+        resubmit = None
+        for transaction_id, watch in watched.items():
+            if transaction_id in pending_ids and transaction_id not in found:
+                resubmit = watch['miner']
+                continue
+            with self._lock:
+                self._watched.pop(transaction_id, None)
+            block = found.get(transaction_id)
+            if block is None:
+                # Ni minée ni en attente : chaîne remplacée pendant le suivi
+                logger.warning(f"Transaction {transaction_id} introuvable après minage")
+                continue
+            for callback in watch['callbacks']:
+                try:
+                    with self.app.app_context():
+                        callback(block)
+                except Exception as e:
+                    logger.error(f"Erreur dans le callback de minage (transaction {transaction_id}): {e}")
+
+        if resubmit:
+            self.submit(resubmit)
+
+    def _finish(self, job: Dict[str, Any], status: str, error: str = None):
+        with self._lock:
+            job['status'] = status
+            job['error'] = error
+            job['finished_at'] = datetime.utcnow().isoformat()
+
+    def _trim_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items()
+                    if job['status'] not in ('queued', 'running')]
+        for job_id in finished[:max(0, len(finished) - self.MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    @staticmethod
+    def _public(job: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in job.items() if key != 'callbacks'}
+
+
+class BlockSealer:
+    """
+    Politique de scellement automatique : un bloc est miné dès que seal_size transactions
+    sont en attente ou que la plus ancienne attend depuis seal_interval secondes.
+    """
+
+    # Nom du mineur inscrit dans les blocs scellés automatiquement
+    MINER_ADDRESS = 'system_sealer'
+
+    def __init__(self, blockchain, mining_service: MiningService, seal_size: int = 500,
+                 seal_interval: int = 60, check_interval: float = 1.0):
+        """
+        Args:
+            blockchain: Instance de la blockchain
+            mining_service: Service de minage auquel les blocs sont confiés
+            seal_size: Nombre de transactions en attente déclenchant un bloc
+            seal_interval: Ancienneté maximale (secondes) d'une transaction en attente
+            check_interval: Période de vérification de la politique (secondes)
+        """
+        self.blockchain = blockchain
+        self.mining_service = mining_service
+        self.seal_size = seal_size
+        self.seal_interval = seal_interval
+        self.check_interval = check_interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._current_job_id = None
+
+    def start(self):
+        """Démarre la vérification périodique"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='blockchain-sealer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Arrête la vérification périodique"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def should_seal(self) -> bool:
+        """Indique si les transactions en attente doivent être scellées dans un bloc"""
+        pending_count = len(self.blockchain.pending_transactions)
+        if pending_count == 0:
+            return False
+        if pending_count >= self.seal_size:
+            return True
+        return self.blockchain.get_pending_age() >= self.seal_interval
+
+    def check(self) -> Optional[Dict[str, Any]]:
+        """Applique la politique une fois ; retourne le job planifié, le cas échéant"""
+        # Un seul bloc à la fois : le suivant est évalué une fois le précédent miné
+        if self._current_job_id:
+            job = self.mining_service.get_job(self._current_job_id)
+            if job and job['status'] in ('queued', 'running'):
+                return None
+            self._current_job_id = None
+
+        if not self.should_seal():
+            return None
+
+        job = self.mining_service.submit(self.MINER_ADDRESS)
+        self._current_job_id = job['id']
+        return job
+
+    def _run(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Erreur lors du scellement automatique: {e}")
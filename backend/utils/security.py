@@ -35,6 +35,15 @@ class SecurityValidator:
         
         return True, ""
     
+    @staticmethod
+    def validate_phone(phone: str) -> tuple[bool, str]:
+        """Valide un numéro de téléphone (espaces, tirets et points ignorés)"""
+        phone = (phone or '').replace(' ', '').replace('-', '').replace('.', '')
+        if not SecurityValidator.PHONE_PATTERN.match(phone):
+            return False, "Numéro de téléphone invalide"
+        
+        return True, ""
+    
     @staticmethod
     def validate_username(username: str) -> tuple[bool, str]:
         """Valide un nom d'utilisateur"""
@@ -319,25 +328,37 @@ class AuditLogger:
         db.session.add(attempt)
         db.session.commit()
     
+    @staticmethod
+    def log_transaction(transaction: dict) -> bool:
+        """
+        Met une transaction en file d'ingestion (non bloquant).
+        Sans service d'ingestion, la transaction est ajoutée directement.
+        """
+        ingestor = current_app.extensions.get('blockchain_ingestor')
+        if ingestor:
+            return ingestor.submit(transaction)
+        
+        blockchain = current_app.extensions.get('blockchain')
+        if blockchain:
+            return blockchain.add_transaction(transaction)
+        return False
+    
     @staticmethod
     def log_action(user_id: int, action: str, entity_type: str, 
                   entity_id: int, details: dict = None):
         """Enregistre une action utilisateur dans la blockchain"""
         # CORRECTION: Utiliser current_app.extensions au lieu d'importer blockchain
         try:
-            blockchain = current_app.extensions.get('blockchain')
-            if blockchain:
-                transaction = {
-                    'type': 'action',
-                    'user_id': user_id,
-                    'action': action,
-                    'entity_type': entity_type,
-                    'entity_id': entity_id,
-                    'details': details or {},
-                    'ip_address': request.remote_addr,
-                    'timestamp': datetime.utcnow().isoformat()
-                }
-                blockchain.add_transaction(transaction)
+            AuditLogger.log_transaction({
+                'type': 'action',
+                'user_id': user_id,
+                'action': action,
+                'entity_type': entity_type,
+                'entity_id': entity_id,
+                'details': details or {},
+                'ip_address': request.remote_addr,
+                'timestamp': datetime.utcnow().isoformat()
+            })
         except Exception as e:
             # Logger l'erreur mais ne pas bloquer l'application
             print(f"Blockchain logging error: {e}")
\ No newline at end of file
@@ -0,0 +1,201 @@
+# utils/table_batch.py
+"""Modifications groupées des lignes d'une table (ajouts, modifications, suppressions) en une transaction"""
+from datetime import datetime
+from typing import Any, Dict, List
+
+from sqlalchemy.orm import selectinload
+
+from database import db
+from models.department_table import TableRow, TableUniqueValue, is_empty_value
+from utils.table_validation import get_row_validator
+
+BATCH_OPERATIONS = ('insert', 'update', 'delete')
+
+
+class BatchError(ValueError):
+    """Lot mal formé (rejeté sans rien appliquer)"""
+
+
+class TableRowBatch:
+    """
+    Applique un lot d'opérations sur les lignes d'une table :
+    - validation compilée de chaque ligne, unicité vérifiée pour tout le lot (une requête par colonne unique)
+    - lignes modifiées/supprimées chargées en une requête avec leurs index
+    - écriture en une seule transaction : suppressions, puis modifications, puis ajouts
+    En mode atomique (par défaut), une seule erreur annule tout le lot.
+    """
+
+    MAX_OPERATIONS = 5000
+
+    def __init__(self, table, user_id: int, atomic: bool = True):
+        self.table = table
+        self.user_id = user_id
+        self.atomic = atomic
+        self.validator = get_row_validator(table)
+
+    def parse(self, operations: Any) -> List[Dict[str, Any]]:
+        """Vérifie la forme du lot : liste d'objets {op, id?, data?}"""
+        if not isinstance(operations, list) or not operations:
+            raise BatchError("operations doit être une liste non vide")
+        if len(operations) > self.MAX_OPERATIONS:
+            raise BatchError(f"Maximum {self.MAX_OPERATIONS} opérations par lot")
+
+        parsed = []
+        for index, item in enumerate(operations):
+            if not isinstance(item, dict) or item.get('op') not in BATCH_OPERATIONS:
+                raise BatchError(f"Opération {index} invalide (op : insert, update ou delete)")
+            op = item['op']
+            row_id = item.get('id')
+            if op != 'insert' and not isinstance(row_id, int):
+                raise BatchError(f"Opération {index} : id de ligne requis")
+            data = item.get('data')
+            if op != 'delete' and not isinstance(data, dict):
+                raise BatchError(f"Opération {index} : data doit être un objet")
+            parsed.append({'index': index, 'op': op, 'id': row_id, 'data': data})
+        return parsed
+
+    def apply(self, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Valide puis applique les opérations ; retourne les résultats par opération"""
+        row_ids = {item['id'] for item in operations if item['op'] != 'insert'}
+        rows = {}
+        if row_ids:
+            rows = {row.id: row for row in TableRow.query.options(
+                selectinload(TableRow.unique_values),
+                selectinload(TableRow.values)
+            ).filter(
+                TableRow.table_id == self.table.id,
+                TableRow.id.in_(row_ids)
+            )}
+
+        results = []
+        seen_ids = set()
+        for item in operations:
+            errors = {}
+            if item['op'] != 'insert':
+                if item['id'] not in rows:
+                    errors['_row'] = 'Ligne introuvable'
+                elif item['id'] in seen_ids:
+                    errors['_row'] = 'Ligne présente plusieurs fois dans le lot'
+                seen_ids.add(item['id'])
+            if item['op'] != 'delete' and not errors:
+                errors = self.validator.validate(item['data'])
+            results.append({'index': item['index'], 'op': item['op'], 'id': item['id'], 'errors': errors})
+
+        self._check_unique(operations, results)
+
+        failed = sum(1 for result in results if result['errors'])
+        if failed and self.atomic:
+            return self._report(results, applied=False)
+
+        valid = [(item, result) for item, result in zip(operations, results) if not result['errors']]
+        self._write(valid, rows)
+        return self._report(results, applied=True)
+
+    def _check_unique(self, operations, results):
+        """Doublons dans le lot et valeurs déjà prises par des lignes hors du lot (ou qui les gardent)"""
+        if not self.validator.unique_columns:
+            return
+
+        # Valeur visée par chaque ligne après le lot, pour chaque colonne unique
+        wanted = {}
+        for item, result in zip(operations, results):
+            if result['errors'] or item['op'] == 'delete':
+                continue
+            for column in self.validator.unique_columns:
+                value = item['data'].get(column.name)
+                if is_empty_value(value):
+                    continue
+                key = (column.id, TableUniqueValue.hash_value(value, column.data_type))
+                if key in wanted:
+                    result['errors'][column.name] = f"Valeur en double dans le lot pour {column.display_name}"
+                else:
+                    wanted[key] = result
+
+        hashes_by_column = {}
+        for column_id, value_hash in wanted:
+            hashes_by_column.setdefault(column_id, []).append(value_hash)
+        columns = {column.id: column for column in self.validator.unique_columns}
+
+        taken = []
+        for column_id, hashes in hashes_by_column.items():
+            owners = db.session.query(TableUniqueValue.value_hash, TableUniqueValue.row_id).filter(
+                TableUniqueValue.table_id == self.table.id,
+                TableUniqueValue.column_id == column_id,
+                TableUniqueValue.value_hash.in_(hashes)
+            ).all()
+            taken.extend((wanted[(column_id, value_hash)], columns[column_id], owner_id)
+                         for value_hash, owner_id in owners)
+
+        # Une ligne du lot ne libère sa valeur (modifiée ou supprimée) que si son opération est acceptée :
+        # chaque refus peut en entraîner d'autres, jusqu'à stabilité
+        changed = True
+        while changed:
+            changed = False
+            released_rows = {
+                item['id'] for item, result in zip(operations, results)
+                if item['op'] != 'insert' and not result['errors']
+            }
+            for result, column, owner_id in taken:
+                if owner_id == result['id'] or owner_id in released_rows or column.name in result['errors']:
+                    continue
+                changed = changed or (result['op'] != 'insert' and not result['errors'])
+                result['errors'][column.name] = f"Cette valeur existe déjà pour {column.display_name}"
+
+    def _write(self, valid, rows):
+        """Une transaction ; flush entre les phases pour libérer les valeurs uniques avant leur reprise"""
+        now = datetime.utcnow()
+        by_op = {op: [(item, result) for item, result in valid if item['op'] == op] for op in BATCH_OPERATIONS}
+
+        for item, _ in by_op['delete']:
+            db.session.delete(rows[item['id']])
+        db.session.flush()
+
+        # Valeurs uniques modifiées supprimées dans leur propre flush : deux lignes qui échangent
+        # leurs valeurs ne dépendent pas de l'ordre des UPDATE face à la contrainte d'unicité
+        for item, _ in by_op['update']:
+            row = rows[item['id']]
+            row.set_data(item['data'])
+            self._release_changed_unique_values(row)
+        db.session.flush()
+
+        for item, _ in by_op['update']:
+            row = rows[item['id']]
+            row.sync_indexes(self.validator.columns)
+            row.updated_at = now
+            row.updated_by_id = self.user_id
+        db.session.flush()
+
+        inserted = []
+        for item, result in by_op['insert']:
+            row = TableRow(table_id=self.table.id, created_by_id=self.user_id)
+            row.set_data(item['data'])
+            row.sync_indexes(self.validator.columns)
+            db.session.add(row)
+            inserted.append((row, result))
+
+        if valid:
+            self.table.mark_rows_changed()
+        db.session.flush()
+        for row, result in inserted:
+            result['id'] = row.id
+
+    def _release_changed_unique_values(self, row):
+        """Retire de l'index les valeurs uniques de la ligne qui ne correspondent plus à ses données"""
+        data = row.get_data()
+        columns = {column.id: column for column in self.validator.unique_columns}
+        for entry in list(row.unique_values):
+            column = columns.get(entry.column_id)
+            value = data.get(column.name) if column is not None else None
+            if is_empty_value(value) or TableUniqueValue.hash_value(value, column.data_type) != entry.value_hash:
+                row.unique_values.remove(entry)
+
+    @staticmethod
+    def _report(results, applied: bool) -> Dict[str, Any]:
+        for result in results:
+            result['success'] = applied and not result['errors']
+        return {
+            'applied': applied,
+            'succeeded': sum(1 for result in results if result['success']),
+            'failed': sum(1 for result in results if result['errors']),
+            'results': results
+        }
@@ -0,0 +1,158 @@
+# utils/table_export.py
+"""Export en flux (CSV, NDJSON, XLSX) des lignes d'une table de département, en mémoire constante"""
+import csv
+import io
+import json
+import os
+import re
+import tempfile
+from typing import Any, Iterator
+
+from database import db
+from models.department_table import TableRow
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx')
+}
+
+
+# Caractères refusés par Excel dans un nom de feuille
+INVALID_SHEET_CHARS = re.compile(r'[\\/?*\[\]:]')
+
+
+class ExportFormatError(ValueError):
+    """Format d'export non supporté ou indisponible"""
+
+
+class TableExporter:
+    """
+    Parcourt les lignes actives d'une table par lots (yield_per : curseur serveur sous MySQL)
+    et produit le fichier morceau par morceau. Seules les colonnes visibles sont exportées,
+    dans l'ordre des colonnes de la table ; les en-têtes sont les noms affichés, relus par l'import.
+    """
+
+    FETCH_SIZE = 1000
+    CHUNK_ROWS = 500  # Lignes par morceau envoyé au client (CSV, NDJSON)
+    FILE_CHUNK = 64 * 1024
+
+    def __init__(self, table, fmt: str = 'csv', delimiter: str = ','):
+        if fmt not in EXPORT_FORMATS:
+            raise ExportFormatError("Format non supporté (csv, ndjson ou xlsx)")
+        if fmt == 'xlsx':
+            try:
+                import openpyxl  # noqa: F401
+            except ImportError:
+                raise ExportFormatError("Export Excel indisponible : installer openpyxl")
+        if delimiter not in (',', ';', '\t'):
+            raise ExportFormatError("Séparateur non supporté")
+
+        self.table = table
+        self.format = fmt
+        self.delimiter = delimiter
+        self.columns = [column for column in table.columns if column.is_visible]
+        # Colonnes extraites avant le parcours : aucune relation chargée pendant le flux
+        self.names = [column.name for column in self.columns]
+        self.headers = [column.display_name for column in self.columns]
+
+    @property
+    def mimetype(self) -> str:
+        return EXPORT_FORMATS[self.format][0]
+
+    @property
+    def filename(self) -> str:
+        return f"{self.table.name}.{EXPORT_FORMATS[self.format][1]}"
+
+    def iter_data(self) -> Iterator[dict]:
+        """Données JSON des lignes actives, par ordre d'id, sans matérialiser d'objets TableRow"""
+        rows = db.session.query(TableRow.data).filter(
+            TableRow.table_id == self.table.id,
+            TableRow.is_active.is_(True)
+        ).order_by(TableRow.id)
+        for (raw_data,) in rows.yield_per(self.FETCH_SIZE):
+            yield json.loads(raw_data) if raw_data else {}
+
+    def generate(self) -> Iterator[Any]:
+        return {
+            'csv': self._generate_csv,
+            'ndjson': self._generate_ndjson,
+            'xlsx': self._generate_xlsx
+        }[self.format]()
+
+    # ==================== FORMATS ====================
+
+    def _generate_csv(self) -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=self.delimiter)
+        # BOM : Excel reconnaît l'UTF-8 (accents)
+        buffer.write('\ufeff')
+        writer.writerow(self.headers)
+
+        for count, data in enumerate(self.iter_data(), start=1):
+            writer.writerow([_text_cell(data.get(name)) for name in self.names])
+            if count % self.CHUNK_ROWS == 0:
+                yield _drain(buffer)
+        yield _drain(buffer)
+
+    def _generate_ndjson(self) -> Iterator[str]:
+        lines = []
+        for data in self.iter_data():
+            lines.append(json.dumps({name: data.get(name) for name in self.names}, ensure_ascii=False))
+            if len(lines) >= self.CHUNK_ROWS:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
+
+    def _generate_xlsx(self) -> Iterator[bytes]:
+        """Classeur en mode écriture seule (lignes écrites sur disque), puis relu par blocs"""
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(title=_sheet_title(self.table.display_name))
+        sheet.append(self.headers)
+        for data in self.iter_data():
+            sheet.append([_excel_cell(data.get(name)) for name in self.names])
+
+        handle, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(handle)
+        try:
+            workbook.save(path)
+            with open(path, 'rb') as f:
+                while True:
+                    chunk = f.read(self.FILE_CHUNK)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            os.remove(path)
+
+
+def _drain(buffer: io.StringIO) -> str:
+    chunk = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+    return chunk
+
+
+def _text_cell(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _sheet_title(name: str) -> str:
+    """Nom de feuille Excel valide : caractères interdits remplacés, 31 caractères, pas d'apostrophe en bord"""
+    title = INVALID_SHEET_CHARS.sub('-', name or '')[:31].strip("'")
+    return title or 'Export'
+
+
+def _excel_cell(value):
+    if isinstance(value, (int, float)) or value is None:
+        return value
+    return _text_cell(value)
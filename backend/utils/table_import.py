@@ -0,0 +1,270 @@
+# utils/table_import.py
+"""Import en masse CSV/XLSX dans une table de département (lecture en flux, insertion par lots)"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from models.department_table import TableRow, TableRowValue, TableUniqueValue, is_empty_value
+from utils.company_counters import add_counter_deltas
+from utils.table_validation import get_row_validator
+
+EMPTY_TYPED_FIELDS = {'value_number': None, 'value_date': None, 'value_bool': None, 'value_text': None}
+
+
+class ImportFormatError(ValueError):
+    """Fichier illisible ou format non supporté"""
+
+
+def detect_format(filename: str, requested: str = None) -> str:
+    """Format d'import à partir du paramètre explicite ou de l'extension du fichier"""
+    fmt = requested
+    if not fmt and filename and '.' in filename:
+        fmt = filename.rsplit('.', 1)[-1]
+    fmt = (fmt or '').lower()
+    if fmt in ('csv', 'txt'):
+        return 'csv'
+    if fmt in ('xlsx', 'xlsm'):
+        return 'xlsx'
+    raise ImportFormatError("Format non supporté (CSV ou XLSX attendu)")
+
+
+def iter_csv(stream) -> Iterator[Tuple[int, List[Any]]]:
+    """(numéro de ligne, cellules) d'un CSV lu en flux ; séparateur , ; ou tabulation détecté"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+    sample = text.read(8192)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+
+    reader = csv.reader(_chain_sample(sample, text), dialect)
+    for line_number, cells in enumerate(reader, start=1):
+        yield line_number, cells
+
+
+def _chain_sample(sample: str, text):
+    """Relit l'échantillon utilisé pour la détection puis la suite du fichier"""
+    yield from io.StringIO(sample + text.readline())
+    yield from text
+
+
+def iter_xlsx(stream) -> Iterator[Tuple[int, List[Any]]]:
+    """(numéro de ligne, cellules) de la première feuille, en mode lecture seule"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFormatError("Import Excel indisponible : installer openpyxl")
+
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFormatError(f"Fichier Excel illisible: {e}")
+
+    try:
+        sheet = workbook.worksheets[0]
+        for line_number, cells in enumerate(sheet.iter_rows(values_only=True), start=1):
+            yield line_number, list(cells)
+    finally:
+        workbook.close()
+
+
+class TableImporter:
+    """
+    Importe des lignes par lots : validation compilée, dédoublonnage des colonnes uniques
+    en mémoire et contre l'index existant, puis insertion groupée en une transaction par lot.
+    """
+
+    BATCH_SIZE = 1000
+    MAX_REPORTED_ERRORS = 1000
+
+    def __init__(self, table, user_id: int, dry_run: bool = False):
+        self.table = table
+        self.user_id = user_id
+        self.dry_run = dry_run
+        self.validator = get_row_validator(table)
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self.ignored_headers = []
+        self._mapping = None
+        self._seen_unique = set()
+
+    def run(self, records: Iterator[Tuple[int, List[Any]]]) -> Dict[str, Any]:
+        """Consomme les lignes (la première est l'en-tête) et retourne le rapport d'import"""
+        batch = []
+        for line_number, cells in records:
+            if self._mapping is None:
+                self._map_headers(cells)
+                continue
+            if all(is_empty_value(cell) for cell in cells):
+                continue
+
+            raw = {name: cells[i] for i, name in self._mapping if i < len(cells)}
+            batch.append((line_number, self.validator.coerce(raw)))
+            if len(batch) >= self.BATCH_SIZE:
+                self._process_batch(batch)
+                batch = []
+
+        if self._mapping is None:
+            raise ImportFormatError("Fichier vide : ligne d'en-tête manquante")
+        if batch:
+            self._process_batch(batch)
+
+        return {
+            'imported': self.imported,
+            'failed': self.failed,
+            'dry_run': self.dry_run,
+            'ignored_columns': self.ignored_headers,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
+
+    def _map_headers(self, headers: List[Any]):
+        """Associe chaque en-tête à une colonne (nom technique ou nom affiché, sans casse)"""
+        lookup = {}
+        for column in self.table.columns:
+            lookup[column.name.strip().lower()] = column.name
+            lookup[column.display_name.strip().lower()] = column.name
+
+        self._mapping = []
+        for index, header in enumerate(headers):
+            key = str(header or '').strip().lower()
+            if key in lookup:
+                self._mapping.append((index, lookup[key]))
+            elif key:
+                self.ignored_headers.append(str(header))
+
+        if not self._mapping:
+            raise ImportFormatError("Aucune colonne du fichier ne correspond aux colonnes de la table")
+
+    def _report(self, line_number: int, errors: Dict[str, str]):
+        self.failed += 1
+        if len(self.errors) < self.MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_number, 'errors': errors})
+
+    def _process_batch(self, batch: List[Tuple[int, Dict[str, Any]]]):
+        valid = []
+        batch_keys = {}
+        for line_number, data in batch:
+            errors = self.validator.validate(data)
+            keys = []
+            for column in self.validator.unique_columns:
+                value = data.get(column.name)
+                if is_empty_value(value) or column.name in errors:
+                    continue
+                key = (column.id, TableUniqueValue.hash_value(value, column.data_type))
+                if key in self._seen_unique or key in batch_keys:
+                    errors[column.name] = f"Valeur en double pour {column.display_name}"
+                else:
+                    keys.append(key)
+            if errors:
+                self._report(line_number, errors)
+                continue
+            for key in keys:
+                batch_keys[key] = line_number
+            valid.append((line_number, data, keys))
+
+        # Valeurs déjà présentes en base : une requête par colonne unique pour tout le lot
+        taken = self._existing_unique_keys(batch_keys)
+        if taken:
+            columns = {column.id: column for column in self.validator.unique_columns}
+            kept = []
+            for line_number, data, keys in valid:
+                conflicts = [key for key in keys if key in taken]
+                if conflicts:
+                    self._report(line_number, {
+                        columns[column_id].name: f"Cette valeur existe déjà pour {columns[column_id].display_name}"
+                        for column_id, _ in conflicts
+                    })
+                else:
+                    kept.append((line_number, data, keys))
+            valid = kept
+
+        if not valid:
+            return
+        if self.dry_run:
+            self.imported += len(valid)
+            for _, _, keys in valid:
+                self._seen_unique.update(keys)
+            return
+
+        try:
+            self._insert(valid)
+        except IntegrityError:
+            # Valeur unique insérée entre-temps par une autre requête : lot entier rejeté
+            db.session.rollback()
+            for line_number, _, _ in valid:
+                self._report(line_number, {'_row': 'Conflit d\'unicité concurrent, ligne non importée'})
+            return
+
+        self.imported += len(valid)
+        for _, _, keys in valid:
+            self._seen_unique.update(keys)
+
+    def _existing_unique_keys(self, batch_keys: Dict[Tuple[int, str], int]) -> set:
+        hashes_by_column = {}
+        for column_id, value_hash in batch_keys:
+            hashes_by_column.setdefault(column_id, []).append(value_hash)
+
+        taken = set()
+        for column_id, hashes in hashes_by_column.items():
+            rows = db.session.query(TableUniqueValue.value_hash).filter(
+                TableUniqueValue.table_id == self.table.id,
+                TableUniqueValue.column_id == column_id,
+                TableUniqueValue.value_hash.in_(hashes)
+            ).all()
+            taken.update((column_id, value_hash) for (value_hash,) in rows)
+        return taken
+
+    def _insert(self, valid: List[Tuple[int, Dict[str, Any], list]]):
+        """Insertion des lignes, puis des valeurs uniques et typées (groupées), en une transaction"""
+        created_at = datetime.utcnow()
+        insert = TableRow.__table__.insert()
+
+        # Un INSERT Core par ligne : l'id de chaque ligne est retourné par le pilote (lastrowid),
+        # sans RETURNING (absent de MySQL) ni relecture par horodatage (DATETIME sans microsecondes)
+        row_ids = []
+        for _, data, _ in valid:
+            result = db.session.execute(insert, {
+                'table_id': self.table.id,
+                'data': json.dumps(data),
+                'is_active': True,
+                'row_order': 0,
+                'created_at': created_at,
+                'updated_at': created_at,
+                'created_by_id': self.user_id
+            })
+            row_ids.append(result.inserted_primary_key[0])
+
+        unique_values = []
+        typed_values = []
+        for row_id, (_, data, keys) in zip(row_ids, valid):
+            for column_id, value_hash in keys:
+                unique_values.append({
+                    'table_id': self.table.id,
+                    'column_id': column_id,
+                    'row_id': row_id,
+                    'value_hash': value_hash
+                })
+            for column in self.validator.columns:
+                fields = TableRowValue.typed_fields(column, data.get(column.name))
+                if fields is not None:
+                    # Mêmes clés pour chaque mapping : un seul executemany pour tout le lot
+                    typed_values.append(dict(EMPTY_TYPED_FIELDS, **fields, table_id=self.table.id,
+                                             column_id=column.id, row_id=row_id))
+
+        if unique_values:
+            db.session.execute(TableUniqueValue.__table__.insert(), unique_values)
+        if typed_values:
+            db.session.execute(TableRowValue.__table__.insert(), typed_values)
+        self.table.mark_rows_changed()
+        # Lignes insérées hors ORM : invisibles pour le suivi des compteurs au flush
+        department = self.table.department
+        if department is not None and department.deleted_at is None:
+            add_counter_deltas(db.session.connection(), {department.company_id: {'entries': len(valid)}})
+        db.session.commit()
@@ -0,0 +1,279 @@
+# utils/table_query.py
+"""Requêtes paginées (keyset), triées et filtrées en SQL sur les lignes des tables de départements"""
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, cast, func, not_, or_
+from sqlalchemy.orm import aliased
+
+from database import db
+from models.department_table import TableRow, TableRowValue
+
+
+class RowQueryError(ValueError):
+    """Paramètre de requête invalide (tri, filtre ou curseur)"""
+
+
+# Champs système triables/filtrables en plus des colonnes de la table
+SYSTEM_FIELDS = {
+    'id': TableRow.id,
+    'created_at': TableRow.created_at,
+    'updated_at': TableRow.updated_at,
+    'row_order': TableRow.row_order
+}
+
+NUMERIC_TYPES = ('number', 'decimal')
+
+FILTER_OPERATORS = ('eq', 'ne', 'lt', 'lte', 'gt', 'gte', 'between', 'in', 'contains', 'is_null', 'not_null')
+
+
+class TableRowQuery:
+    """
+    Construit la requête des lignes d'une table :
+    - filtres typés (égalité, intervalle, contient) sur les colonnes is_filterable
+    - tri sur une colonne is_sortable ou un champ système, valeurs nulles en dernier
+    - pagination par curseur (valeur de tri, id) : coût constant quelle que soit la page
+    Les valeurs sont lues dans les valeurs typées indexées (table_row_values) ; pour une table
+    pas encore migrée, dans le JSON des lignes par json_extract (SQLite, MySQL).
+    """
+
+    def __init__(self, table, include_inactive: bool = False):
+        self.table = table
+        self.columns = {column.name: column for column in table.columns}
+        self.dialect = db.session.get_bind().dialect.name
+        self.query = TableRow.query.filter(TableRow.table_id == table.id)
+        if not include_inactive:
+            self.query = self.query.filter(TableRow.is_active.is_(True))
+        self.sort_field = 'id'
+        self.descending = False
+        self.typed = table.typed_values_ready
+        self._joined_values = {}
+
+    # ==================== EXPRESSIONS ====================
+
+    def value_expression(self, column):
+        """Expression SQL de la valeur d'une colonne, typée selon data_type"""
+        if self.typed:
+            # Une jointure externe par colonne utilisée (lignes sans valeur : NULL)
+            value = self._joined_values.get(column.id)
+            if value is None:
+                value = aliased(TableRowValue)
+                self.query = self.query.outerjoin(value, and_(
+                    value.row_id == TableRow.id,
+                    value.column_id == column.id
+                ))
+                self._joined_values[column.id] = value
+            return getattr(value, TableRowValue.value_field(column.data_type))
+        
+        expression = self._json_extract(column)
+        if self.dialect == 'mysql':
+            expression = func.json_unquote(expression)
+        if column.data_type in NUMERIC_TYPES:
+            expression = cast(expression, db.Numeric(30, 10))
+        return expression
+
+    @staticmethod
+    def _json_extract(column):
+        path = '$."{}"'.format(column.name.replace('"', '\\"'))
+        return func.json_extract(TableRow.data, path)
+
+    def _null_condition(self, field, expression):
+        """Valeur absente ; sous MySQL, un null JSON déballé par JSON_UNQUOTE devient la chaîne 'null'"""
+        column = self.columns.get(field)
+        if self.typed or column is None or self.dialect != 'mysql':
+            return expression.is_(None)
+        return or_(expression.is_(None), func.json_type(self._json_extract(column)) == 'NULL')
+
+    def field_expression(self, field: str, usage: str):
+        """Expression d'un champ système ou d'une colonne autorisée pour usage ('sort' ou 'filter')"""
+        if field in SYSTEM_FIELDS:
+            return SYSTEM_FIELDS[field]
+
+        column = self.columns.get(field)
+        if column is None:
+            raise RowQueryError(f"Colonne inconnue: {field}")
+        if usage == 'sort' and not column.is_sortable:
+            raise RowQueryError(f"La colonne {column.display_name} n'est pas triable")
+        if usage == 'filter' and not column.is_filterable:
+            raise RowQueryError(f"La colonne {column.display_name} n'est pas filtrable")
+        return self.value_expression(column)
+
+    def coerce_value(self, field: str, value):
+        """Convertit une valeur de filtre ou de curseur dans le type du champ"""
+        if value is None:
+            return None
+
+        if field in ('created_at', 'updated_at'):
+            try:
+                return datetime.fromisoformat(str(value))
+            except ValueError:
+                raise RowQueryError(f"Date invalide pour {field}: {value}")
+        if field in ('id', 'row_order'):
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                raise RowQueryError(f"Entier attendu pour {field}")
+
+        column = self.columns[field]
+        if column.data_type in NUMERIC_TYPES:
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                raise RowQueryError(f"{column.display_name} doit être un nombre")
+        if column.data_type in TableRowValue.DATE_TYPES and self.typed:
+            fields = TableRowValue.typed_fields(column, value)
+            if fields is None or 'value_date' not in fields:
+                raise RowQueryError(f"Date invalide pour {column.display_name}: {value}")
+            return fields['value_date']
+        if column.data_type == 'boolean':
+            flag = value if isinstance(value, bool) else str(value).lower() in ('true', '1', 'yes', 'oui')
+            if self.typed:
+                return flag
+            # json_extract : 1/0 sous SQLite, 'true'/'false' une fois désérialisé sous MySQL
+            if self.dialect == 'mysql':
+                return 'true' if flag else 'false'
+            return 1 if flag else 0
+        return str(value)
+
+    # ==================== FILTRES ET TRI ====================
+
+    def filter(self, filters: Optional[List[Dict[str, Any]]]):
+        """Applique une liste de filtres {'column', 'op', 'value'}"""
+        for item in filters or []:
+            if not isinstance(item, dict):
+                raise RowQueryError("Filtre invalide")
+            field = item.get('column')
+            operator = item.get('op', 'eq')
+            value = item.get('value')
+            if operator not in FILTER_OPERATORS:
+                raise RowQueryError(f"Opérateur de filtre inconnu: {operator}")
+
+            expression = self.field_expression(field, 'filter')
+            self.query = self.query.filter(self._condition(field, expression, operator, value))
+        return self
+
+    def _condition(self, field, expression, operator, value):
+        if operator == 'is_null':
+            return self._null_condition(field, expression)
+        if operator == 'not_null':
+            return not_(self._null_condition(field, expression))
+
+        if operator == 'contains':
+            pattern = str(value).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            return func.lower(expression).like(f'%{pattern.lower()}%', escape='\\')
+
+        if operator == 'between':
+            if not isinstance(value, (list, tuple)) or len(value) != 2:
+                raise RowQueryError("between attend deux bornes [min, max]")
+            low, high = (self.coerce_value(field, bound) for bound in value)
+            conditions = []
+            if low is not None:
+                conditions.append(expression >= low)
+            if high is not None:
+                conditions.append(expression <= high)
+            return and_(*conditions) if conditions else expression.isnot(None)
+
+        if operator == 'in':
+            if not isinstance(value, (list, tuple)):
+                raise RowQueryError("in attend une liste de valeurs")
+            return expression.in_([self.coerce_value(field, item) for item in value])
+
+        value = self.coerce_value(field, value)
+        return {
+            'eq': lambda: expression == value,
+            'ne': lambda: or_(expression != value, expression.is_(None)),
+            'lt': lambda: expression < value,
+            'lte': lambda: expression <= value,
+            'gt': lambda: expression > value,
+            'gte': lambda: expression >= value
+        }[operator]()
+
+    def sort(self, field: Optional[str], order: str = 'asc'):
+        """Définit le tri (id croissant par défaut)"""
+        if order not in ('asc', 'desc'):
+            raise RowQueryError("order doit valoir asc ou desc")
+        if field:
+            self.field_expression(field, 'sort')
+            self.sort_field = field
+        self.descending = order == 'desc'
+        return self
+
+    # ==================== PAGINATION ====================
+
+    def count(self) -> int:
+        return self.query.order_by(None).count()
+
+    def page(self, cursor: Optional[str] = None, limit: int = 100) -> Tuple[List[TableRow], Optional[str]]:
+        """Retourne (lignes, curseur suivant) ; le curseur est None sur la dernière page"""
+        sort_expression = self.field_expression(self.sort_field, 'sort')
+        query = self.query
+
+        if cursor:
+            last_value, last_id = self.decode_cursor(cursor)
+            query = query.filter(self._after(sort_expression, last_value, last_id))
+
+        if self.sort_field == 'id':
+            order_by = [TableRow.id.desc() if self.descending else TableRow.id]
+        else:
+            direction = (lambda e: e.desc()) if self.descending else (lambda e: e.asc())
+            order_by = [
+                sort_expression.is_(None),  # Valeurs nulles en dernier
+                direction(sort_expression),
+                direction(TableRow.id)
+            ]
+
+        # Valeur de tri relue depuis l'expression triée (valeur typée, JSON extrait ou champ système) :
+        # le curseur reprend exactement là où l'ORDER BY s'est arrêté, valeurs vides comprises
+        results = query.add_columns(sort_expression).order_by(*order_by).limit(limit + 1).all()
+        has_more = len(results) > limit
+        results = results[:limit]
+
+        next_cursor = None
+        if has_more and results:
+            last_row, last_value = results[-1]
+            next_cursor = self.encode_cursor(self._cursor_value(last_value), last_row.id)
+        return [row for row, _ in results], next_cursor
+
+    def _after(self, sort_expression, last_value, last_id):
+        """Condition « strictement après » la dernière ligne servie dans l'ordre de tri"""
+        after_id = TableRow.id < last_id if self.descending else TableRow.id > last_id
+        if self.sort_field == 'id':
+            return after_id
+
+        if last_value is None:
+            # Déjà dans le bloc final des valeurs nulles
+            return and_(sort_expression.is_(None), after_id)
+
+        last_value = self.coerce_value(self.sort_field, last_value)
+        beyond = sort_expression < last_value if self.descending else sort_expression > last_value
+        return or_(
+            beyond,
+            and_(sort_expression == last_value, after_id),
+            sort_expression.is_(None)
+        )
+
+    @staticmethod
+    def _cursor_value(value):
+        """Valeur de tri sérialisable en JSON (relue par coerce_value)"""
+        if isinstance(value, datetime):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    @staticmethod
+    def encode_cursor(value, row_id: int) -> str:
+        raw = json.dumps([value, row_id]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor: str):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            value, row_id = json.loads(raw)
+            return value, int(row_id)
+        except (ValueError, TypeError):
+            raise RowQueryError("Curseur invalide")
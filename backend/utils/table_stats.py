@@ -0,0 +1,228 @@
+# utils/table_stats.py
+"""Statistiques des tables de départements : agrégats SQL sur les valeurs typées, cache par version"""
+import json
+import math
+from typing import Any, Dict, List
+
+from sqlalchemy import Integer, and_, cast, distinct, func
+
+from database import db
+from models.department_table import TableRow, TableRowValue
+from utils.cache import VersionedCache
+
+# Percentiles calculés pour les colonnes numériques
+PERCENTILES = (25, 50, 75, 90, 99)
+
+NUMERIC_TYPES = TableRowValue.NUMBER_TYPES
+
+
+# Statistiques par table, valides tant que data_version n'a pas changé
+stats_cache = VersionedCache()
+
+
+def compute_table_stats(table, histogram_bins: int = 10) -> Dict[str, Any]:
+    """Statistiques d'une table, servies depuis le cache si aucune ligne n'a changé"""
+    version = table.state.data_version if table.state is not None else None
+    # Sans état maintenu, la version ne peut pas être suivie : pas de cache
+    key = (table.id, histogram_bins, len(table.columns))
+    if version is not None:
+        cached = stats_cache.get(key, version)
+        if cached is not None:
+            return cached
+
+    engine = SqlStatsEngine if table.typed_values_ready else SinglePassStatsEngine
+    stats = engine(table, histogram_bins).compute()
+
+    if version is not None:
+        stats_cache.set(key, version, stats)
+    return stats
+
+
+def _histogram_edges(minimum: float, maximum: float, bins: int):
+    width = (maximum - minimum) / bins if maximum > minimum else 0
+    return width, [minimum + i * width for i in range(bins + 1)]
+
+
+def _nearest_rank(count: int, percentile: int) -> int:
+    """Rang (0-based) du percentile par la méthode du rang le plus proche"""
+    return max(math.ceil(percentile / 100 * count) - 1, 0)
+
+
+class SqlStatsEngine:
+    """Agrégats calculés par la base sur table_row_values (lignes actives uniquement)"""
+
+    def __init__(self, table, histogram_bins: int = 10):
+        self.table = table
+        self.bins = histogram_bins
+        self.numeric_columns = [c for c in table.columns if c.data_type in NUMERIC_TYPES]
+
+    def _values(self, *entities):
+        return db.session.query(*entities).join(
+            TableRow, and_(TableRow.id == TableRowValue.row_id, TableRow.is_active.is_(True))
+        ).filter(TableRowValue.table_id == self.table.id)
+
+    def compute(self) -> Dict[str, Any]:
+        total_rows, active_rows = _row_counts(self.table.id)
+
+        # Un seul passage groupé pour toutes les colonnes numériques
+        column_stats = {}
+        columns_by_id = {column.id: column for column in self.numeric_columns}
+        if columns_by_id:
+            value = TableRowValue.value_number
+            aggregates = self._values(
+                TableRowValue.column_id,
+                func.count(value), func.sum(value), func.avg(value), func.min(value), func.max(value)
+            ).filter(
+                TableRowValue.column_id.in_(columns_by_id),
+                value.isnot(None)
+            ).group_by(TableRowValue.column_id).all()
+
+            for column_id, count, total, average, minimum, maximum in aggregates:
+                if not count:
+                    continue
+                column = columns_by_id[column_id]
+                column_stats[column.name] = {
+                    'count': count,
+                    'sum': float(total),
+                    'avg': float(average),
+                    'min': float(minimum),
+                    'max': float(maximum),
+                    'percentiles': self._percentiles(column_id, count),
+                    'histogram': self._histogram(column_id, float(minimum), float(maximum), count)
+                }
+
+        # Nombre de valeurs distinctes de chaque colonne
+        distinct_counts = {column.name: 0 for column in self.table.columns}
+        names = {column.id: column.name for column in self.table.columns}
+        rows = self._values(
+            TableRowValue.column_id,
+            func.count(distinct(TableRowValue.value_number)),
+            func.count(distinct(TableRowValue.value_date)),
+            func.count(distinct(TableRowValue.value_bool)),
+            func.count(distinct(TableRowValue.value_text))
+        ).group_by(TableRowValue.column_id).all()
+        for column_id, *counts in rows:
+            if column_id in names:
+                # Une seule des colonnes typées est renseignée par colonne de table
+                distinct_counts[names[column_id]] = max(counts)
+
+        return _stats_payload(total_rows, active_rows, self.table, column_stats, distinct_counts)
+
+    def _percentiles(self, column_id: int, count: int) -> Dict[str, float]:
+        """Lecture par rang dans l'index (table_id, column_id, value_number)"""
+        value = TableRowValue.value_number
+        base = self._values(value).filter(
+            TableRowValue.column_id == column_id,
+            value.isnot(None)
+        ).order_by(value)
+
+        result = {}
+        for percentile in PERCENTILES:
+            row = base.offset(_nearest_rank(count, percentile)).limit(1).first()
+            result[f'p{percentile}'] = float(row[0]) if row else None
+        return result
+
+    def _histogram(self, column_id: int, minimum: float, maximum: float,
+                   count: int) -> List[Dict[str, Any]]:
+        width, edges = _histogram_edges(minimum, maximum, self.bins)
+        if width == 0:
+            return [{'from': minimum, 'to': maximum, 'count': count}]
+
+        value = TableRowValue.value_number
+        position = (value - minimum) / width
+        if db.session.get_bind().dialect.name == 'mysql':
+            bucket = func.floor(position)
+        else:
+            # Position positive : la conversion en entier vaut floor() (SQLite arrondit vers zéro)
+            bucket = cast(position, Integer)
+        counts = [0] * self.bins
+        for index, count in self._values(bucket, func.count()).filter(
+            TableRowValue.column_id == column_id,
+            value.isnot(None)
+        ).group_by(bucket).all():
+            counts[min(int(index), self.bins - 1)] += count
+
+        return [{'from': edges[i], 'to': edges[i + 1], 'count': counts[i]} for i in range(self.bins)]
+
+
+class SinglePassStatsEngine:
+    """Repli pour une table sans valeurs typées : un seul décodage JSON par ligne pour toutes les colonnes"""
+
+    def __init__(self, table, histogram_bins: int = 10):
+        self.table = table
+        self.bins = histogram_bins
+
+    def compute(self) -> Dict[str, Any]:
+        total_rows, active_rows = _row_counts(self.table.id)
+        columns = list(self.table.columns)
+        numeric_names = [c.name for c in columns if c.data_type in NUMERIC_TYPES]
+        values = {name: [] for name in numeric_names}
+        distinct_values = {c.name: set() for c in columns}
+
+        rows = db.session.query(TableRow.data).filter(
+            TableRow.table_id == self.table.id,
+            TableRow.is_active.is_(True)
+        )
+        for (raw_data,) in rows.yield_per(1000):
+            data = json.loads(raw_data) if raw_data else {}
+            for name, distinct_set in distinct_values.items():
+                value = data.get(name)
+                if value is None or value == '':
+                    continue
+                distinct_set.add(json.dumps(value, sort_keys=True))
+                if name in values:
+                    try:
+                        values[name].append(float(value))
+                    except (TypeError, ValueError):
+                        pass
+
+        column_stats = {}
+        for name, column_values in values.items():
+            if not column_values:
+                continue
+            column_values.sort()
+            count = len(column_values)
+            minimum, maximum = column_values[0], column_values[-1]
+            column_stats[name] = {
+                'count': count,
+                'sum': sum(column_values),
+                'avg': sum(column_values) / count,
+                'min': minimum,
+                'max': maximum,
+                'percentiles': {
+                    f'p{p}': column_values[_nearest_rank(count, p)] for p in PERCENTILES
+                },
+                'histogram': self._histogram(column_values, minimum, maximum)
+            }
+
+        distinct_counts = {name: len(distinct_set) for name, distinct_set in distinct_values.items()}
+        return _stats_payload(total_rows, active_rows, self.table, column_stats, distinct_counts)
+
+    def _histogram(self, column_values, minimum, maximum):
+        width, edges = _histogram_edges(minimum, maximum, self.bins)
+        if width == 0:
+            return [{'from': minimum, 'to': maximum, 'count': len(column_values)}]
+
+        counts = [0] * self.bins
+        for value in column_values:
+            counts[min(int((value - minimum) / width), self.bins - 1)] += 1
+        return [{'from': edges[i], 'to': edges[i + 1], 'count': counts[i]} for i in range(self.bins)]
+
+
+def _row_counts(table_id: int):
+    """(lignes totales, lignes actives) en une requête"""
+    total, active = db.session.query(
+        func.count(TableRow.id),
+        func.coalesce(func.sum(cast(TableRow.is_active, Integer)), 0)
+    ).filter(TableRow.table_id == table_id).one()
+    return total, int(active)
+
+
+def _stats_payload(total_rows, active_rows, table, column_stats, distinct_counts) -> Dict[str, Any]:
+    return {
+        'total_rows': total_rows,
+        'active_rows': active_rows,
+        'columns_count': len(table.columns),
+        'column_stats': column_stats,
+        'distinct_counts': distinct_counts
+    }
@@ -0,0 +1,213 @@
+# utils/table_validation.py
+"""Validation compilée des lignes d'une table de département, mise en cache par version du schéma"""
+import math
+from collections import namedtuple
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.security import SecurityValidator
+from utils.cache import VersionedCache
+from models.department_table import is_empty_value
+
+NUMERIC_TYPES = ('number', 'decimal')
+DATE_TYPES = ('date', 'datetime')
+TRUE_VALUES = ('true', '1', 'yes', 'oui', 'vrai', 'x')
+FALSE_VALUES = ('false', '0', 'no', 'non', 'faux')
+
+# Définition figée d'une colonne : le validateur en cache ne garde aucun objet ORM
+ColumnSpec = namedtuple('ColumnSpec', 'id name display_name data_type is_required is_unique config')
+
+
+def _parse_number(value) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _parse_date(value) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    try:
+        return datetime.fromisoformat(str(value).strip().replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+def _check_number(column):
+    config = column.config
+    minimum = _parse_number(config.get('min'))
+    maximum = _parse_number(config.get('max'))
+
+    def check(value):
+        number = _parse_number(value)
+        if number is None:
+            return f"{column.display_name} doit être un nombre"
+        if minimum is not None and number < minimum:
+            return f"{column.display_name} doit être supérieur ou égal à {config['min']}"
+        if maximum is not None and number > maximum:
+            return f"{column.display_name} doit être inférieur ou égal à {config['max']}"
+    return check
+
+
+def _check_date(column):
+    config = column.config
+    minimum = _parse_date(config['min']) if config.get('min') else None
+    maximum = _parse_date(config['max']) if config.get('max') else None
+
+    def check(value):
+        moment = _parse_date(value)
+        if moment is None:
+            return f"{column.display_name} doit être une date valide (AAAA-MM-JJ)"
+        if minimum is not None and moment < minimum:
+            return f"{column.display_name} doit être postérieure ou égale au {config['min']}"
+        if maximum is not None and moment > maximum:
+            return f"{column.display_name} doit être antérieure ou égale au {config['max']}"
+    return check
+
+
+def _check_select(column):
+    options = column.config.get('options')
+    if not options:
+        return None
+    allowed = {str(option) for option in options}
+
+    def check(value):
+        values = value if isinstance(value, list) else [value]
+        invalid = [str(item) for item in values if str(item) not in allowed]
+        if invalid:
+            return f"{column.display_name} : valeur non autorisée ({', '.join(invalid)})"
+    return check
+
+
+def _check_email(column):
+    def check(value):
+        valid, message = SecurityValidator.validate_email(str(value))
+        return None if valid else message
+    return check
+
+
+def _check_phone(column):
+    def check(value):
+        valid, message = SecurityValidator.validate_phone(str(value))
+        return None if valid else f"{column.display_name} : {message.lower()}"
+    return check
+
+
+TYPE_CHECKS = {
+    'number': _check_number,
+    'decimal': _check_number,
+    'date': _check_date,
+    'datetime': _check_date,
+    'select': _check_select,
+    'multiselect': _check_select,
+    'email': _check_email,
+    'phone': _check_phone
+}
+
+
+class RowValidator:
+    """
+    Règles de validation d'une table compilées une fois à partir de ses colonnes et de leur
+    type_config (options des listes, bornes des nombres et des dates) : chaque ligne est ensuite
+    validée sans relire ni réinterpréter la définition des colonnes.
+    L'unicité n'est pas vérifiée ici (voir TableUniqueValue).
+    """
+
+    def __init__(self, table):
+        self.table_id = table.id
+        self.columns = [
+            ColumnSpec(column.id, column.name, column.display_name, column.data_type,
+                       bool(column.is_required), bool(column.is_unique), column.get_config())
+            for column in table.columns
+        ]
+        self.unique_columns = [column for column in self.columns if column.is_unique]
+        self._rules: List[Tuple[str, str, bool, Optional[Callable[[Any], Optional[str]]]]] = []
+        for column in self.columns:
+            factory = TYPE_CHECKS.get(column.data_type)
+            self._rules.append((
+                column.name,
+                column.display_name,
+                column.is_required,
+                factory(column) if factory else None
+            ))
+
+    def validate(self, row_data: Dict[str, Any]) -> Dict[str, str]:
+        """Retourne les erreurs {colonne: message} d'une ligne (vide si valide)"""
+        errors = {}
+        for name, display_name, required, check in self._rules:
+            value = row_data.get(name)
+            if is_empty_value(value):
+                if required:
+                    errors[name] = f"{display_name} est requis"
+                continue
+            if check is not None:
+                message = check(value)
+                if message:
+                    errors[name] = message
+        return errors
+
+    def coerce(self, raw: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convertit des valeurs importées (texte CSV, cellules Excel) dans la forme
+        enregistrée par le formulaire : nombres, booléens, dates ISO, texte.
+        """
+        data = {}
+        for column in self.columns:
+            if column.name not in raw:
+                continue
+            value = raw[column.name]
+            if isinstance(value, str):
+                value = value.strip()
+            if is_empty_value(value):
+                data[column.name] = None
+                continue
+
+            if column.data_type in NUMERIC_TYPES:
+                value = self._coerce_number(value)
+            elif column.data_type == 'boolean':
+                lowered = str(value).strip().lower()
+                if lowered in TRUE_VALUES:
+                    value = True
+                elif lowered in FALSE_VALUES:
+                    value = False
+            elif column.data_type in DATE_TYPES:
+                if isinstance(value, datetime):
+                    value = value.date().isoformat() if column.data_type == 'date' else value.isoformat()
+                elif isinstance(value, date):
+                    value = value.isoformat()
+            elif not isinstance(value, str):
+                value = str(value)
+            data[column.name] = value
+        return data
+
+    @staticmethod
+    def _coerce_number(value):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return value
+        text = str(value).replace(' ', '').replace('\u00a0', '')
+        # Virgule décimale française (sans séparateur de milliers)
+        if ',' in text and '.' not in text:
+            text = text.replace(',', '.')
+        try:
+            number = float(text)
+        except ValueError:
+            return value
+        return int(number) if number.is_integer() else number
+
+
+# Validateurs compilés par table, valides tant que schema_version n'a pas changé
+validator_cache = VersionedCache()
+
+
+def get_row_validator(table) -> RowValidator:
+    """Validateur compilé de la table, reconstruit seulement après add_column/update_table"""
+    version = table.schema_version
+    validator = validator_cache.get(table.id, version)
+    if validator is None:
+        validator = RowValidator(table)
+        validator_cache.set(table.id, version, validator)
+    return validator
@@ -0,0 +1,152 @@
+# utils/transaction_ingestor.py
+"""File d'ingestion des transactions d'audit : les requêtes HTTP ne touchent jamais la blockchain"""
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class TransactionIngestor:
+    """
+    Regroupe les transactions soumises par les workers (Flask, Socket.IO) et les ajoute
+    par lots à la blockchain depuis un thread dédié.
+    Contre-pression : la file est bornée, et le thread suspend l'ingestion tant que
+    la blockchain compte plus de max_pending transactions en attente ; il demande alors un
+    minage et, passé capacity_timeout, rejette le lot et les soumissions suivantes.
+    """
+
+    # Attente maximale d'un lot incomplet avant ingestion (secondes)
+    FLUSH_INTERVAL = 0.2
+
+    # Nom du mineur inscrit dans les blocs demandés pour libérer de la capacité
+    MINER_ADDRESS = 'system_ingestor'
+
+    def __init__(self, blockchain, batch_size: int = 500, queue_size: int = 10000,
+                 max_pending: int = 50000, submit_timeout: float = 2.0,
+                 mining_service=None, capacity_timeout: float = 30.0):
+        """
+        Args:
+            blockchain: Instance de la blockchain
+            batch_size: Nombre maximum de transactions ajoutées en une fois
+            queue_size: Taille maximale de la file d'ingestion
+            max_pending: Transactions en attente de minage au-delà desquelles l'ingestion est suspendue
+            submit_timeout: Attente maximale d'un appelant lorsque la file est pleine
+            mining_service: Service de minage sollicité lorsque max_pending est atteint
+            capacity_timeout: Attente maximale d'un retour sous max_pending avant rejet du lot
+        """
+        self.blockchain = blockchain
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.submit_timeout = submit_timeout
+        self.mining_service = mining_service
+        self.capacity_timeout = capacity_timeout
+        self.rejected_count = 0
+        self.saturated = False
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, transaction: Dict[str, Any]) -> bool:
+        """
+        Met une transaction en file et rend la main immédiatement.
+        Bloque au plus submit_timeout secondes si la file est pleine ; retourne False si rejetée,
+        immédiatement tant que la blockchain est saturée.
+        """
+        # Horodatage de l'événement, pas de son ingestion
+        transaction.setdefault('timestamp', datetime.utcnow().isoformat())
+        self._ensure_worker()
+        if self.saturated and len(self.blockchain.pending_transactions) >= self.max_pending:
+            with self._lock:
+                self.rejected_count += 1
+            logger.error(f"Blockchain saturée, transaction rejetée: {transaction.get('type')}")
+            return False
+        try:
+            self._queue.put(transaction, timeout=self.submit_timeout)
+        except queue.Full:
+            with self._lock:
+                self.rejected_count += 1
+            logger.error(f"File d'ingestion pleine, transaction rejetée: {transaction.get('type')}")
+            return False
+        return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Attend que toutes les transactions en file soient ingérées"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def get_status(self) -> Dict[str, Any]:
+        """État de la file (supervision)"""
+        return {
+            'queued': self._queue.qsize(),
+            'capacity': self._queue.maxsize,
+            'rejected': self.rejected_count,
+            'saturated': self.saturated,
+            'pending_transactions': len(self.blockchain.pending_transactions),
+            'max_pending': self.max_pending
+        }
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            with self._lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(
+                        target=self._run, name='blockchain-ingestor', daemon=True
+                    )
+                    self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.FLUSH_INTERVAL
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                if self._wait_for_capacity():
+                    self.blockchain.add_transactions(batch)
+                else:
+                    with self._lock:
+                        self.rejected_count += len(batch)
+                    logger.error(f"Aucun minage en {self.capacity_timeout}s, {len(batch)} transactions rejetées")
+            except Exception as e:
+                logger.error(f"Erreur lors de l'ingestion de {len(batch)} transactions: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _wait_for_capacity(self) -> bool:
+        """
+        Suspend l'ingestion tant que trop de transactions attendent d'être minées, en demandant
+        un minage. Retourne False si la capacité n'est pas revenue avant capacity_timeout.
+        """
+        deadline = time.monotonic() + self.capacity_timeout
+        warned = False
+        while len(self.blockchain.pending_transactions) >= self.max_pending:
+            if not warned:
+                logger.warning(
+                    f"{self.max_pending} transactions en attente de minage, ingestion suspendue"
+                )
+                warned = True
+            if time.monotonic() >= deadline:
+                self.saturated = True
+                return False
+            if self.mining_service is not None:
+                # Un job encore en file est réutilisé : pas de demandes en double
+                self.mining_service.submit(self.MINER_ADDRESS)
+            time.sleep(min(0.5, max(0.0, deadline - time.monotonic())))
+        self.saturated = False
+        return True
@@ -0,0 +1,260 @@
+# utils/widget_engine.py
+"""Moteur de données des widgets du dashboard : registre des sources, cache par portée, invalidation au commit"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Any, Dict, Optional
+
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from database import db
+from utils.cache import TTLCache
+
+WidgetSource = namedtuple('WidgetSource', 'name handler tables')
+
+EMPTY_CHART = {'labels': [], 'datasets': [], 'type': 'chart'}
+
+# Colonnes mises à jour en continu (connexion, présence) : sans effet sur les données des widgets
+IGNORED_COLUMNS = {'last_login', 'last_ip', 'is_online', 'last_seen', 'updated_at'}
+
+DEFAULT_TTL = 300
+
+
+def get_date_range(time_filter, start_date=None, end_date=None):
+    """Calcule les dates selon le filtre"""
+    end = datetime.utcnow()
+
+    if time_filter == 'custom' and start_date and end_date:
+        try:
+            start = datetime.fromisoformat(start_date)
+            end = datetime.fromisoformat(end_date)
+            return start, end
+        except ValueError:
+            pass
+
+    if time_filter == 'today':
+        start = end.replace(hour=0, minute=0, second=0, microsecond=0)
+    elif time_filter == 'week':
+        start = end - timedelta(days=7)
+    elif time_filter == 'month':
+        start = end - timedelta(days=30)
+    elif time_filter == 'quarter':
+        start = end - timedelta(days=90)
+    elif time_filter == 'year':
+        start = end - timedelta(days=365)
+    else:
+        start = end - timedelta(days=7)
+
+    return start, end
+
+
+def is_global_user(user) -> bool:
+    """Admin et DRH voient toute l'entreprise"""
+    return user.is_admin or user.role == 'directeur_rh'
+
+
+class WidgetDataEngine:
+    """
+    Point d'entrée unique des données de widgets :
+    - registre des sources (@widget_engine.source('tickets', Ticket)) ;
+    - résultats mis en cache par (source, métrique, portée entreprise/département, tranche de dates),
+      pour DashboardWidget.refresh_interval secondes ;
+    - invalidation des sources dont une table a changé, au commit de la session.
+    Le cache est propre au processus : entre workers, la durée de vie borne le décalage.
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.sources: Dict[str, WidgetSource] = {}
+        self.cache = TTLCache(max_entries=max_entries)
+        self._listeners = []
+        self._listening = False
+
+    def init_app(self, app):
+        app.extensions['widget_engine'] = self
+        self._listen()
+
+    # ==================== REGISTRE ====================
+
+    def source(self, name: str, *models):
+        """Enregistre le calcul d'une source ; models : tables dont la modification l'invalide"""
+        tables = frozenset(model.__tablename__ for model in models)
+
+        def register(handler):
+            self.sources[name] = WidgetSource(name, handler, tables)
+            return handler
+        return register
+
+    # ==================== CALCUL ====================
+
+    def scope(self, user, department_id) -> tuple:
+        """Ce qui détermine le résultat d'un calcul en dehors de la métrique et des dates"""
+        return (
+            user.company_id,
+            int(department_id) if department_id else None,
+            is_global_user(user),
+            user.department_id,
+            bool(user.can_access_payroll)
+        )
+
+    @staticmethod
+    def date_bucket(time_filter, start: datetime, end: datetime) -> tuple:
+        """Plages glissantes regroupées par jour (le cache expire de toute façon) ; plages libres exactes"""
+        if time_filter == 'custom':
+            return ('custom', start.isoformat(), end.isoformat())
+        return (time_filter, end.date().isoformat())
+
+    def _plan(self, widget, user, time_filter, department_filter, start_date, end_date):
+        """Clé de cache, calcul et durée de vie d'un widget ; clé None : résultat immédiat (refus, source inconnue)"""
+        metric = widget.get_filters().get('metric', 'count')
+        department_id = department_filter or widget.department_id
+
+        # Vérifier les permissions
+        if department_id and not is_global_user(user):
+            if user.department_id != int(department_id):
+                return None, {'error': 'Accès non autorisé'}, 0
+
+        source = self.sources.get(widget.data_source)
+        if source is None:
+            return None, dict(EMPTY_CHART), 0
+
+        start, end = get_date_range(time_filter, start_date, end_date)
+        key = (source.name, metric, self.scope(user, department_id), self.date_bucket(time_filter, start, end))
+        compute = partial(source.handler, widget, user, metric, start, end, department_id)
+        return key, compute, widget.refresh_interval or DEFAULT_TTL
+
+    def _store(self, key, data, ttl):
+        if ttl > 0:
+            self.cache.set(key, data, ttl)
+        return data
+
+    def get_data(self, widget, user, time_filter: str = 'week', department_filter=None,
+                 start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, Any]:
+        """Données d'un widget, depuis le cache si une requête de même portée a déjà été calculée"""
+        key, compute, ttl = self._plan(widget, user, time_filter, department_filter, start_date, end_date)
+        if key is None:
+            return compute
+        data = self.cache.get(key)
+        if data is None:
+            data = self._store(key, compute(), ttl)
+        return data
+
+    def get_many(self, widgets, user, time_filter: str = 'week', department_filter=None,
+                 start_date: Optional[str] = None, end_date: Optional[str] = None,
+                 workers: int = 0) -> Dict[int, Dict[str, Any]]:
+        """
+        Données de plusieurs widgets pour les mêmes filtres : les widgets qui partagent
+        source, métrique et portée ne sont calculés qu'une fois, les autres calculs
+        indépendants sont répartis sur workers threads (0 : séquentiel).
+        Une source en erreur n'empêche pas de retourner les autres.
+        """
+        results = {}
+        keys = {}
+        found = {}
+        pending = {}
+        for widget in widgets:
+            key, compute, ttl = self._plan(widget, user, time_filter, department_filter, start_date, end_date)
+            if key is None:
+                results[widget.id] = compute
+                continue
+            keys[widget.id] = key
+            if key in found:
+                continue
+            if key in pending:
+                # Le widget le plus fréquemment rafraîchi fixe la durée de vie de l'entrée partagée
+                pending[key] = (pending[key][0], min(pending[key][1], ttl))
+                continue
+            data = self.cache.get(key)
+            if data is None:
+                pending[key] = (compute, ttl)
+            else:
+                found[key] = data
+
+        found.update(self._compute_all(pending, workers))
+        for widget_id, key in keys.items():
+            results[widget_id] = found[key]
+        return results
+
+    def _compute_all(self, pending, workers):
+        if not pending:
+            return {}
+        if workers <= 1 or len(pending) == 1:
+            return {key: self._compute(key, compute, ttl) for key, (compute, ttl) in pending.items()}
+
+        app = current_app._get_current_object()
+
+        def run(key, compute, ttl):
+            # Un contexte (donc une session) par thread
+            with app.app_context():
+                return self._compute(key, compute, ttl)
+
+        with ThreadPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+            futures = {key: executor.submit(run, key, compute, ttl) for key, (compute, ttl) in pending.items()}
+            return {key: future.result() for key, future in futures.items()}
+
+    def _compute(self, key, compute, ttl):
+        try:
+            return self._store(key, compute(), ttl)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.exception("Widget %s : calcul impossible", key[0])
+            return {'error': f'Erreur: {str(e)}'}
+
+    # ==================== INVALIDATION ====================
+
+    def add_listener(self, callback):
+        """callback(sources) après chaque invalidation (ex. DashboardFeed) ; doit rester rapide"""
+        self._listeners.append(callback)
+
+    def invalidate_tables(self, tables):
+        """Retire du cache les résultats des sources qui lisent l'une de ces tables"""
+        stale = {name for name, source in self.sources.items() if source.tables & tables}
+        if stale:
+            self.cache.invalidate(lambda key: key[0] in stale)
+            for callback in self._listeners:
+                callback(stale)
+        return stale
+
+    def _listen(self):
+        if self._listening:
+            return
+        self._listening = True
+        event.listen(Session, 'after_flush', self._collect_changes)
+        event.listen(Session, 'after_commit', self._apply_changes)
+        event.listen(Session, 'after_rollback', self._discard_changes)
+
+    @staticmethod
+    def _collect_changes(session, flush_context):
+        tables = session.info.setdefault('widget_changed_tables', set())
+        for obj in list(session.new) + list(session.deleted):
+            table = getattr(obj, '__tablename__', None)
+            if table:
+                tables.add(table)
+        for obj in session.dirty:
+            table = getattr(obj, '__tablename__', None)
+            if table and table not in tables and _has_relevant_changes(obj):
+                tables.add(table)
+
+    def _apply_changes(self, session):
+        tables = session.info.pop('widget_changed_tables', None)
+        if tables:
+            self.invalidate_tables(tables)
+
+    @staticmethod
+    def _discard_changes(session):
+        session.info.pop('widget_changed_tables', None)
+
+
+def _has_relevant_changes(obj) -> bool:
+    state = inspect(obj)
+    for attr in state.mapper.column_attrs:
+        if attr.key in IGNORED_COLUMNS:
+            continue
+        if state.attrs[attr.key].history.has_changes():
+            return True
+    return False
+
+
+widget_engine = WidgetDataEngine()